@@ -7,13 +7,15 @@ import time
 import gc
 import soundfile as sf
 import json
-from qwen_tts import Qwen3TTSModel
+from qwen_tts import Qwen3TTSModelRegistry, Qwen3TTSPipeline, Qwen3TTSPlacement, Qwen3TTSTalkerPrefixCache
 
 torch.set_num_threads(16)
 torch.set_float32_matmul_precision("high")
 
-DEVICE = "cuda:0"
-DTYPE = torch.bfloat16
+DEVICE = "cuda:0" if torch.cuda.is_available() else "cpu"
+DTYPE = torch.bfloat16 if torch.cuda.is_available() else torch.float32
+# GPU-less hosts: int8 talker / code predictor, everything pinned to the same 16 threads
+PLACEMENT = None if torch.cuda.is_available() else Qwen3TTSPlacement.cpu(num_threads=16)
 
 OUTPUT_DIR = "outputs"
 if not os.path.exists(OUTPUT_DIR):
@@ -21,13 +23,18 @@ if not os.path.exists(OUTPUT_DIR):
 
 print("Initializing Qwen3-TTS Cinematic Pro-Studio...")
 
+# Both checkpoints ship the same speech tokenizer: the registry keeps one copy of it
+MODEL_REGISTRY = Qwen3TTSModelRegistry()
+
 def load_model(ckpt):
     print(f"Loading {ckpt}...")
     attn_impl = "sdpa" if torch.cuda.is_available() else None
-    return Qwen3TTSModel.from_pretrained(ckpt, device_map=DEVICE, dtype=DTYPE, attn_implementation=attn_impl)
+    return MODEL_REGISTRY.load(ckpt, device_map=DEVICE, dtype=DTYPE, attn_implementation=attn_impl, placement=PLACEMENT)
 
 design_model = load_model("Qwen/Qwen3-TTS-12Hz-1.7B-VoiceDesign")
 base_model = load_model("Qwen/Qwen3-TTS-12Hz-1.7B-Base")
+# Segments of one character share the "Voice Identity" instruct head: reuse its talker prefill
+design_prefix_cache = Qwen3TTSTalkerPrefixCache(max_entries=16)
 print("All models loaded successfully.")
 
 LANGUAGES = ["Auto", "Chinese", "English", "Japanese", "Korean", "German", "French", "Russian", "Portuguese", "Spanish", "Italian"]
@@ -172,10 +179,19 @@ def generate_cinematic_pro(script, language, char_json, progress=gr.Progress(tra
     sr = 24000
     last_speaker = None
     
-    with torch.inference_mode():
-        for i, seg in enumerate(segments):
+    # Segment i+1 is generated while segment i is decoded and mixed
+    with torch.inference_mode(), Qwen3TTSPipeline(design_model) as pipeline:
+        futures = [
+            pipeline.submit_voice_design(
+                text=seg["text"],
+                language=language,
+                instruct=build_pro_instruct(seg["voice"], seg["emotion"], seg["is_solo"]),
+                prefix_cache=design_prefix_cache,
+            )
+            for seg in segments
+        ]
+        for i, (seg, future) in enumerate(zip(segments, futures)):
             speaker = seg["speaker"]
-            instruct = build_pro_instruct(seg["voice"], seg["emotion"], seg["is_solo"])
             
             progress((i/len(segments)), desc=f"{speaker} | {seg['emotion']}")
             
@@ -185,7 +201,7 @@ def generate_cinematic_pro(script, language, char_json, progress=gr.Progress(tra
                 gap = 0.1 if segments[i-1]["is_interrupted"] else 0.4
                 master.append(np.zeros(int(sr * gap), dtype=np.float32))
             
-            wavs, current_sr = design_model.generate_voice_design(text=seg["text"], language=language, instruct=instruct)
+            wavs, current_sr = future.result()
             sr = current_sr
             audio = wavs[0]
             
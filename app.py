@@ -7,14 +7,16 @@ import time
 import gc
 import soundfile as sf
 import threading
-from qwen_tts import Qwen3TTSModel
+from qwen_tts import Qwen3TTSModelRegistry, Qwen3TTSPipeline, Qwen3TTSPlacement, Qwen3TTSTalkerPrefixCache, VoiceClonePromptCache
 
 # ⚡ Performance & Stability
 torch.set_num_threads(16)
 torch.set_float32_matmul_precision('high')
 
-DEVICE = "cuda:0"
-DTYPE = torch.bfloat16
+DEVICE = "cuda:0" if torch.cuda.is_available() else "cpu"
+DTYPE = torch.bfloat16 if torch.cuda.is_available() else torch.float32
+# GPU-less hosts: int8 talker / code predictor, everything pinned to the same 16 threads
+PLACEMENT = None if torch.cuda.is_available() else Qwen3TTSPlacement.cpu(num_threads=16)
 
 # Ensure outputs directory exists
 OUTPUT_DIR = "outputs"
@@ -23,24 +25,36 @@ if not os.path.exists(OUTPUT_DIR):
 
 print(f"Initializing Qwen3-TTS Emotional-Lock Engine (16 CPU Threads)...")
 
+# Both checkpoints ship the same speech tokenizer: the registry keeps one copy of it
+MODEL_REGISTRY = Qwen3TTSModelRegistry()
+
 # Helper to load models
 def load_model(ckpt):
     print(f"Loading {ckpt}...")
     attn_impl = "sdpa" if torch.cuda.is_available() else None
-    model_wrapper = Qwen3TTSModel.from_pretrained(
+    model_wrapper = MODEL_REGISTRY.load(
         ckpt,
         device_map=DEVICE,
         dtype=DTYPE,
         attn_implementation=attn_impl,
+        placement=PLACEMENT,
     )
     return model_wrapper
 
 # Load models
 design_model = load_model("Qwen/Qwen3-TTS-12Hz-1.7B-VoiceDesign")
 base_model = load_model("Qwen/Qwen3-TTS-12Hz-1.7B-Base")
+# Repeat reference voices skip the speech tokenizer / speaker encoder
+base_model.prompt_cache = VoiceClonePromptCache(max_items=64, cache_dir=os.path.join(OUTPUT_DIR, "voice_cache"))
+# Segments share the "Voice Identity" instruct head: reuse its talker prefill
+design_prefix_cache = Qwen3TTSTalkerPrefixCache()
+base_prefix_cache = Qwen3TTSTalkerPrefixCache()
 
 print("All models loaded successfully.")
 
+# Segments rendered together in batched mode
+RENDER_BATCH_SIZE = 8
+
 LANGUAGES = ["Auto", "Chinese", "English", "Japanese", "Korean", "German", "French", "Russian", "Portuguese", "Spanish", "Italian"]
 
 def parse_universal_text(text):
@@ -105,10 +119,21 @@ def build_locked_instruct(base_identity, segment_directives):
         instruct += " Additional Tones: " + ", ".join(other_details)
     return instruct
 
-def generate_emotional_locked(text, language, base_identity, mode="design", ref_audio=None, progress=gr.Progress(track_tqdm=True)):
+def bucket_segments(segments, batch_size):
+    """
+    Groups segment indices into batches of similar text length,
+    so short lines do not wait on padding for long ones.
+    """
+    order = sorted(range(len(segments)), key=lambda i: len(segments[i]['text']))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+def generate_emotional_locked(text, language, base_identity, mode="design", ref_audio=None, batched=False, progress=gr.Progress(track_tqdm=True)):
     """
     Generates audio with Emotional Identity Lock.
     Voice character remains consistent while emotions shift per tag.
+    With batched=True, length buckets of segments are rendered in one pass each,
+    and every segment is previewed as soon as it finishes. The talker prefix
+    cache only serves single-segment calls, so it is used in sequential mode only.
     """
     if not text.strip():
         return None, None, "Error: Text is empty"
@@ -121,7 +146,7 @@ def generate_emotional_locked(text, language, base_identity, mode="design", ref_
         if not segments:
             return None, None, "Error: No text content found"
             
-        master_audio = []
+        rendered = [None] * len(segments)
         sr = 24000
         voice_prompt = None
         total_segments = len(segments)
@@ -132,34 +157,75 @@ def generate_emotional_locked(text, language, base_identity, mode="design", ref_
             voice_prompt = base_model.create_voice_clone_prompt(ref_audio=ref_audio, x_vector_only_mode=False)
 
         with torch.inference_mode():
-            for i, seg in enumerate(segments):
-                # 🔒 Emotional Identity Lock Prompt
-                instruct = build_locked_instruct(base_identity, seg['directives'])
-                
-                # Update Progress
-                progress((i / total_segments), desc=f"🎬 Rendering Segment {i+1}/{total_segments} | Emotion: {seg['directives'].get('mood', 'Neutral')}")
-                
-                if mode == "design":
-                    wavs, current_sr = design_model.generate_voice_design(
-                        text=seg['text'],
-                        language=language,
-                        instruct=instruct,
-                    )
-                else:
-                    wavs, current_sr = base_model.generate_voice_clone(
-                        text=seg['text'],
-                        language=language,
-                        instruct=instruct,
-                        voice_clone_prompt=voice_prompt,
-                    )
-                
-                sr = current_sr
-                segment_wav = wavs[0]
+            if batched:
+                done = 0
+                for bucket in bucket_segments(segments, RENDER_BATCH_SIZE):
+                    texts = [segments[i]['text'] for i in bucket]
+                    progress((done / total_segments), desc=f"🎬 Rendering {len(bucket)} Segments Together")
+
+                    if mode == "design":
+                        stream = design_model.stream_voice_design(
+                            text=texts,
+                            language=language,
+                            instruct=[build_locked_instruct(base_identity, segments[i]['directives']) for i in bucket],
+                            chunk_size=None,
+                        )
+                    else:
+                        stream = base_model.stream_voice_clone(
+                            text=texts,
+                            language=language,
+                            voice_clone_prompt=voice_prompt,
+                            chunk_size=None,
+                        )
+
+                    for j, segment_wav, current_sr in stream:
+                        i = bucket[j]
+                        sr = current_sr
+                        rendered[i] = segment_wav
+                        done += 1
+                        progress((done / total_segments), desc=f"✅ Segment {i+1}/{total_segments} | Emotion: {segments[i]['directives'].get('mood', 'Neutral')}")
+
+                        # Yield Live Preview
+                        yield (sr, segment_wav), None, f"Listening to Segment {i+1}/{total_segments} ({done} done)..."
+
+            else:
+                # ⏩ Segment i+1 is generated while segment i is decoded and previewed
+                with Qwen3TTSPipeline(design_model if mode == "design" else base_model) as pipeline:
+                    futures = []
+                    for seg in segments:
+                        # 🔒 Emotional Identity Lock Prompt
+                        instruct = build_locked_instruct(base_identity, seg['directives'])
+                        if mode == "design":
+                            futures.append(pipeline.submit_voice_design(
+                                text=seg['text'],
+                                language=language,
+                                instruct=instruct,
+                                prefix_cache=design_prefix_cache,
+                            ))
+                        else:
+                            futures.append(pipeline.submit_voice_clone(
+                                text=seg['text'],
+                                language=language,
+                                instruct=instruct,
+                                voice_clone_prompt=voice_prompt,
+                                prefix_cache=base_prefix_cache,
+                            ))
+
+                    for i, (seg, future) in enumerate(zip(segments, futures)):
+                        # Update Progress
+                        progress((i / total_segments), desc=f"🎬 Rendering Segment {i+1}/{total_segments} | Emotion: {seg['directives'].get('mood', 'Neutral')}")
+
+                        wavs, current_sr = future.result()
+                        sr = current_sr
+                        segment_wav = wavs[0]
+                        rendered[i] = segment_wav
+
+                        # Yield Live Preview
+                        yield (sr, segment_wav), None, f"Listening to Segment {i+1}/{total_segments}..."
+
+            master_audio = []
+            for seg, segment_wav in zip(segments, rendered):
                 master_audio.append(segment_wav)
-                
-                # Yield Live Preview
-                yield (sr, segment_wav), None, f"Listening to Segment {i+1}/{total_segments}..."
-                
                 if seg['pause_after']:
                     silence = np.zeros(int(sr * 0.8), dtype=np.float32)
                     master_audio.append(silence)
@@ -183,11 +249,11 @@ def generate_emotional_locked(text, language, base_identity, mode="design", ref_
         torch.cuda.empty_cache()
 
 # Gradio Wrappers
-def design_wrapper(text, language, identity):
-    yield from generate_emotional_locked(text, language, identity, mode="design")
+def design_wrapper(text, language, identity, batched):
+    yield from generate_emotional_locked(text, language, identity, mode="design", batched=batched)
 
-def clone_wrapper(text, language, identity, ref_audio):
-    yield from generate_emotional_locked(text, language, identity, mode="clone", ref_audio=ref_audio)
+def clone_wrapper(text, language, identity, ref_audio, batched):
+    yield from generate_emotional_locked(text, language, identity, mode="clone", ref_audio=ref_audio, batched=batched)
 
 # UI
 with gr.Blocks(theme=gr.themes.Soft(primary_hue="purple", secondary_hue="indigo")) as app:
@@ -208,6 +274,7 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="purple", secondary_hue="indigo"
                         value="A soft-spoken British woman with a gentle tone.",
                         placeholder="Define the consistent voice character here..."
                     )
+                    design_batched = gr.Checkbox(label="⚡ Batched Rendering (segments in parallel)", value=True)
                     design_btn = gr.Button("🎬 Render with Identity Lock", variant="primary")
                 with gr.Column(scale=3):
                     gr.Markdown("### 🔊 Live Stream")
@@ -226,14 +293,15 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="purple", secondary_hue="indigo"
                     clone_lang = gr.Dropdown(label="Language", choices=LANGUAGES, value="Auto")
                     clone_identity = gr.Textbox(label="Style Instructions", lines=2, value="Clear and expressive.")
                     clone_ref = gr.Audio(label="Reference Audio (Voice Identity)", type="filepath")
+                    clone_batched = gr.Checkbox(label="⚡ Batched Rendering (segments in parallel)", value=True)
                     clone_btn = gr.Button("🎧 Clone with Emotional Shifts", variant="primary")
                 with gr.Column(scale=3):
                     clone_live = gr.Audio(label="Current Segment", type="numpy", interactive=False)
                     clone_master = gr.Audio(label="Final Master", type="numpy", interactive=False)
                     clone_status = gr.Textbox(label="Studio Status", interactive=False)
 
-    design_btn.click(design_wrapper, [design_text, design_lang, design_identity], [design_live, design_master, design_status])
-    clone_btn.click(clone_wrapper, [clone_text, clone_lang, clone_identity, clone_ref], [clone_live, clone_master, clone_status])
+    design_btn.click(design_wrapper, [design_text, design_lang, design_identity, design_batched], [design_live, design_master, design_status])
+    clone_btn.click(clone_wrapper, [clone_text, clone_lang, clone_identity, clone_ref, clone_batched], [clone_live, clone_master, clone_status])
 
 if __name__ == "__main__":
     app.launch(server_name="127.0.0.1", server_port=8000)
\ No newline at end of file
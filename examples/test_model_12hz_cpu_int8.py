@@ -0,0 +1,100 @@
+# coding=utf-8
+# Copyright 2026 The Alibaba Qwen team.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+CPU inference with int8 talker / code predictor, compared against the float32 CPU path.
+
+For every text and seed both models generate codes from the same seed. The script reports the wall-clock time and
+real-time factor of each path, and how far the int8 codes agree with the float32 ones:
+  - prefix: frames generated before the first differing frame, relative to the float32 length
+  - codes:  fraction of equal codes over the frames both paths generated
+"""
+import os
+import time
+
+import soundfile as sf
+import torch
+
+from qwen_tts import Qwen3TTSModel, Qwen3TTSPlacement
+
+
+def load(model_path: str, quantize, num_threads: int) -> Qwen3TTSModel:
+    return Qwen3TTSModel.from_pretrained(
+        model_path,
+        device_map="cpu",
+        dtype=torch.float32,
+        placement=Qwen3TTSPlacement.cpu(num_threads=num_threads, quantize=quantize),
+    )
+
+
+def generate_codes(tts: Qwen3TTSModel, text: str, speaker: str, language: str, seed: int, **kwargs):
+    torch.manual_seed(seed)
+    t0 = time.time()
+    codes = tts.generate_custom_voice_codes(text=text, speaker=speaker, language=language, **kwargs)[0]
+    return codes, time.time() - t0
+
+
+def agreement(ref: torch.Tensor, out: torch.Tensor):
+    n = min(ref.shape[0], out.shape[0])
+    same_frames = (ref[:n] == out[:n]).all(dim=-1)
+    diverged = (~same_frames).nonzero()
+    prefix = int(diverged[0]) if len(diverged) else n
+    codes = (ref[:n] == out[:n]).float().mean().item() if n else 1.0
+    return prefix / max(ref.shape[0], 1), codes
+
+
+def main():
+    MODEL_PATH = "Qwen/Qwen3-TTS-12Hz-1.7B-CustomVoice/"
+    OUT_DIR = "qwen3_tts_test_cpu_int8_output_wav"
+    NUM_THREADS = os.cpu_count()
+    SEEDS = [0, 1, 2]
+    CASES = [
+        ("Vivian", "Chinese", "其实我真的有发现，我是一个特别善于观察别人情绪的人。"),
+        ("Ryan", "English", "She said she would be here by noon."),
+    ]
+    os.makedirs(OUT_DIR, exist_ok=True)
+
+    tts_fp32 = load(MODEL_PATH, quantize=None, num_threads=NUM_THREADS)
+    tts_int8 = load(MODEL_PATH, quantize="int8", num_threads=NUM_THREADS)
+    speech_tokenizer = tts_fp32.model.speech_tokenizer
+    frame_rate = speech_tokenizer.get_output_sample_rate() / speech_tokenizer.get_decode_upsample_rate()
+
+    totals = {"fp32": [0.0, 0], "int8": [0.0, 0]}
+    for case_idx, (speaker, language, text) in enumerate(CASES):
+        for seed in SEEDS:
+            codes_fp32, t_fp32 = generate_codes(tts_fp32, text, speaker, language, seed)
+            codes_int8, t_int8 = generate_codes(tts_int8, text, speaker, language, seed)
+            totals["fp32"][0] += t_fp32
+            totals["fp32"][1] += codes_fp32.shape[0]
+            totals["int8"][0] += t_int8
+            totals["int8"][1] += codes_int8.shape[0]
+            prefix, codes = agreement(codes_fp32, codes_int8)
+            print(
+                f"[case {case_idx} seed {seed}] fp32 {t_fp32:.2f}s / {codes_fp32.shape[0]} frames, "
+                f"int8 {t_int8:.2f}s / {codes_int8.shape[0]} frames, prefix agreement {prefix:.3f}, "
+                f"code agreement {codes:.3f}"
+            )
+
+            for name, codes_out in (("fp32", codes_fp32), ("int8", codes_int8)):
+                wavs, sr = tts_fp32.decode_codes([codes_out])
+                sf.write(os.path.join(OUT_DIR, f"case{case_idx}_seed{seed}_{name}.wav"), wavs[0], sr)
+
+    for name, (seconds, frames) in totals.items():
+        audio_seconds = frames / frame_rate
+        print(f"[{name}] talker time {seconds:.2f}s for {audio_seconds:.2f}s of audio, RTF {seconds / max(audio_seconds, 1e-6):.3f}")
+
+
+if __name__ == "__main__":
+    main()
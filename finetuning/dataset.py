@@ -13,21 +13,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Any, List, Tuple, Union
+from typing import Any, List, Union
 
-import librosa
-import numpy as np
 import torch
 from qwen_tts.core.models.configuration_qwen3_tts import Qwen3TTSConfig
 from qwen_tts.core.models.modeling_qwen3_tts import mel_spectrogram
+from qwen_tts.inference.qwen3_tts_audio import normalize_audio_inputs
 from torch.utils.data import Dataset
 
-AudioLike = Union[
-    str,                     # wav path, URL, base64
-    np.ndarray,              # waveform (requires sr)
-    Tuple[np.ndarray, int],  # (waveform, sr)
-]
-
 MaybeList = Union[Any, List[Any]]
 
 class TTSDataset(Dataset):
@@ -40,54 +33,6 @@ class TTSDataset(Dataset):
     def __len__(self):
         return len(self.data_list)
     
-    def _load_audio_to_np(self, x: str) -> Tuple[np.ndarray, int]:
-        
-        audio, sr = librosa.load(x, sr=None, mono=True)
-
-        if audio.ndim > 1:
-            audio = np.mean(audio, axis=-1)
-
-        return audio.astype(np.float32), int(sr)
-
-    def _normalize_audio_inputs(self, audios: Union[AudioLike, List[AudioLike]]) -> List[Tuple[np.ndarray, int]]:
-        """
-        Normalize audio inputs into a list of (waveform, sr).
-
-        Supported forms:
-          - str: wav path / URL / base64 audio string
-          - np.ndarray: waveform (NOT allowed alone here because sr is unknown)
-          - (np.ndarray, sr): waveform + sampling rate
-          - list of the above
-
-        Args:
-            audios:
-                Audio input(s).
-
-        Returns:
-            List[Tuple[np.ndarray, int]]:
-                List of (float32 waveform, original sr).
-
-        Raises:
-            ValueError: If a numpy waveform is provided without sr.
-        """
-        if isinstance(audios, list):
-            items = audios
-        else:
-            items = [audios]
-
-        out: List[Tuple[np.ndarray, int]] = []
-        for a in items:
-            if isinstance(a, str):
-                out.append(self._load_audio_to_np(a))
-            elif isinstance(a, tuple) and len(a) == 2 and isinstance(a[0], np.ndarray):
-                out.append((a[0].astype(np.float32), int(a[1])))
-            elif isinstance(a, np.ndarray):
-                raise ValueError("For numpy waveform input, pass a tuple (audio, sr).")
-            else:
-                raise TypeError(f"Unsupported audio input type: {type(a)}")
-        return out
-
-    
     def _build_assistant_text(self, text: str) -> str:
         return f"<|im_start|>assistant\n{text}<|im_end|>\n<|im_start|>assistant\n"
     
@@ -132,7 +77,7 @@ class TTSDataset(Dataset):
         audio_codes = torch.tensor(audio_codes, dtype=torch.long)
 
         ref_audio_list = self._ensure_list(ref_audio_path)
-        normalized = self._normalize_audio_inputs(ref_audio_list)
+        normalized = normalize_audio_inputs(ref_audio_list)
         wav,sr = normalized[0]
 
         ref_mel = self.extract_mels(audio=wav, sr=sr)
@@ -18,7 +18,13 @@
 qwen_tts: Qwen-TTS package.
 """
 
-from .inference.qwen3_tts_model import Qwen3TTSModel, VoiceClonePromptItem
+from .core.models import Qwen3TTSTalkerPrefixCache
+from .inference.qwen3_tts_engine import Qwen3TTSEngine
+from .inference.qwen3_tts_model import Qwen3TTSModel, VoiceClonePromptCache, VoiceClonePromptItem
+from .inference.qwen3_tts_pipeline import Qwen3TTSDecodeWorker, Qwen3TTSPipeline
+from .inference.qwen3_tts_placement import Qwen3TTSPlacement, Qwen3TTSStagePlacement
+from .inference.qwen3_tts_registry import Qwen3TTSModelRegistry
 from .inference.qwen3_tts_tokenizer import Qwen3TTSTokenizer
+from .inference.qwen3_tts_voice_bank import Qwen3TTSVoiceBank
 
 __all__ = ["__version__"]
\ No newline at end of file
@@ -20,14 +20,13 @@ A gradio demo for Qwen3 TTS models.
 import argparse
 import os
 import tempfile
-from dataclasses import asdict
 from typing import Any, Dict, List, Optional, Tuple
 
 import gradio as gr
 import numpy as np
 import torch
 
-from .. import Qwen3TTSModel, VoiceClonePromptItem
+from .. import Qwen3TTSModel, Qwen3TTSVoiceBank, VoiceClonePromptItem
 
 
 def _title_case_display(s: str) -> str:
@@ -164,6 +163,16 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--subtalker-temperature", type=float, default=None, help="Subtalker temperature (optional, only for tokenizer v2)."
     )
+    parser.add_argument(
+        "--subtalker-fused",
+        action="store_true",
+        help="Use the fused subtalker decode loop instead of a nested generate() per frame (only for tokenizer v2).",
+    )
+    parser.add_argument(
+        "--compile-decode",
+        action="store_true",
+        help="Decode the talker with static caches and torch.compile (first request is slow while compiling).",
+    )
 
     return parser
 
@@ -185,6 +194,8 @@ def _collect_gen_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
         "subtalker_top_k": args.subtalker_top_k,
         "subtalker_top_p": args.subtalker_top_p,
         "subtalker_temperature": args.subtalker_temperature,
+        "subtalker_fused": True if args.subtalker_fused else None,
+        "compile_decode": True if args.compile_decode else None,
     }
     return {k: v for k, v in mapping.items() if v is not None}
 
@@ -513,16 +524,24 @@ Upload a previously saved voice file, then synthesize new text.
                                 ref_text=(ref_txt.strip() if ref_txt else None),
                                 x_vector_only_mode=bool(use_xvec),
                             )
-                            payload = {
-                                "items": [asdict(it) for it in items],
-                            }
-                            fd, out_path = tempfile.mkstemp(prefix="voice_clone_prompt_", suffix=".pt")
+                            fd, out_path = tempfile.mkstemp(prefix="voice_clone_prompt_", suffix=".qvb")
                             os.close(fd)
-                            torch.save(payload, out_path)
+                            Qwen3TTSVoiceBank.write(out_path, items)
                             return out_path, "Finished. (生成完成)"
                         except Exception as e:
                             return None, f"{type(e).__name__}: {e}"
 
+                    def _generate_from_items(items: List[VoiceClonePromptItem], text: str, lang_disp: str):
+                        language = lang_map.get(lang_disp, "Auto")
+                        kwargs = _gen_common_kwargs()
+                        wavs, sr = tts.generate_voice_clone(
+                            text=text.strip(),
+                            language=language,
+                            voice_clone_prompt=items,
+                            **kwargs,
+                        )
+                        return _wav_to_gradio_audio(wavs[0], sr), "Finished. (生成完成)"
+
                     def load_prompt_and_gen(file_obj, text: str, lang_disp: str):
                         try:
                             if file_obj is None:
@@ -531,6 +550,11 @@ Upload a previously saved voice file, then synthesize new text.
                                 return None, "Target text is required (必须填写待合成文本)."
 
                             path = getattr(file_obj, "name", None) or getattr(file_obj, "path", None) or str(file_obj)
+                            if Qwen3TTSVoiceBank.is_voice_bank(path):
+                                items = Qwen3TTSVoiceBank(path).get_items(device=tts.device)
+                                return _generate_from_items(items, text, lang_disp)
+
+                            # voice files saved before the voice bank format
                             payload = torch.load(path, map_location="cpu", weights_only=True)
                             if not isinstance(payload, dict) or "items" not in payload:
                                 return None, "Invalid file format (文件格式不正确)."
@@ -562,15 +586,7 @@ Upload a previously saved voice file, then synthesize new text.
                                     )
                                 )
 
-                            language = lang_map.get(lang_disp, "Auto")
-                            kwargs = _gen_common_kwargs()
-                            wavs, sr = tts.generate_voice_clone(
-                                text=text.strip(),
-                                language=language,
-                                voice_clone_prompt=items,
-                                **kwargs,
-                            )
-                            return _wav_to_gradio_audio(wavs[0], sr), "Finished. (生成完成)"
+                            return _generate_from_items(items, text, lang_disp)
                         except Exception as e:
                             return None, (
                                 f"Failed to read or use voice file. Check file format/content.\n"
@@ -0,0 +1,176 @@
+# coding=utf-8
+# Copyright 2026 The Qwen team, Alibaba Group and the HuggingFace Inc. team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Modeling helpers shared by the Qwen3TTS talker and the 12Hz tokenizer decoder."""
+
+from typing import Callable, Optional
+
+import torch
+from torch import nn
+from transformers.modeling_utils import ALL_ATTENTION_FUNCTIONS
+from transformers.utils.import_utils import is_torch_greater_or_equal
+
+# `enable_gqa` of `scaled_dot_product_attention`
+_sdpa_supports_gqa = is_torch_greater_or_equal("2.5", accept_dev=True)
+
+
+class GroupedQueryAttentionMixin:
+    """Adds `set_gqa_attention` to a `PreTrainedModel` whose attention layers use `select_attention_interface`."""
+
+    def set_gqa_attention(self, enabled: bool = True):
+        r"""
+        Run the `eager` / `sdpa` attention of this model without repeating keys and values to every query head, so a
+        decode step reads the KV cache once per key/value head instead of once per query head. Other attention
+        implementations are left as they are.
+
+        Args:
+            enabled (`bool`, *optional*, defaults to `True`):
+                Use the grouped-query path, or go back to the stock attention functions.
+
+        Returns:
+            The model itself.
+        """
+        for module in self.modules():
+            if hasattr(module, "num_key_value_groups"):
+                module.gqa_attention = enabled
+        return self
+
+
+def grouped_query_attention_forward(
+    module: nn.Module,
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    attention_mask: Optional[torch.Tensor],
+    scaling: float,
+    dropout: float = 0.0,
+    **kwargs,
+):
+    """
+    Same result as `eager_attention_forward`, but keys and values are not repeated to every query head: the query
+    heads sharing a key/value head are stacked along the sequence dim, (batch, num_attention_heads, q_len, head_dim)
+    -> (batch, num_key_value_heads, n_rep * q_len, head_dim), and attend to that head with one matmul.
+    """
+    batch, num_heads, q_len, head_dim = query.shape
+    num_key_value_heads = key.shape[1]
+    n_rep = num_heads // num_key_value_heads
+    query = query.reshape(batch, num_key_value_heads, n_rep * q_len, head_dim)
+
+    attn_weights = torch.matmul(query, key.transpose(2, 3)).view(batch, num_heads, q_len, -1) * scaling
+    if attention_mask is not None:
+        causal_mask = attention_mask[:, :, :, : key.shape[-2]]
+        attn_weights = attn_weights + causal_mask
+
+    attn_weights = nn.functional.softmax(attn_weights, dim=-1, dtype=torch.float32).to(query.dtype)
+    attn_weights = nn.functional.dropout(attn_weights, p=dropout, training=module.training)
+    attn_output = torch.matmul(attn_weights.view(batch, num_key_value_heads, n_rep * q_len, -1), value)
+    attn_output = attn_output.view(batch, num_heads, q_len, head_dim).transpose(1, 2).contiguous()
+
+    return attn_output, attn_weights
+
+
+def grouped_query_sdpa_attention_forward(
+    module: nn.Module,
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    attention_mask: Optional[torch.Tensor],
+    scaling: float,
+    dropout: float = 0.0,
+    **kwargs,
+):
+    """
+    `sdpa` attention with `enable_gqa=True` whatever the mask, where the stock `sdpa` integration repeats keys and
+    values as soon as a mask is given. Falls back to it on torch < 2.5.
+    """
+    if not _sdpa_supports_gqa:
+        return ALL_ATTENTION_FUNCTIONS["sdpa"](
+            module, query, key, value, attention_mask, dropout=dropout, scaling=scaling, **kwargs
+        )
+    if attention_mask is not None:
+        attention_mask = attention_mask[:, :, :, : key.shape[-2]]
+    is_causal = query.shape[2] > 1 and attention_mask is None and getattr(module, "is_causal", True)
+    attn_output = nn.functional.scaled_dot_product_attention(
+        query,
+        key,
+        value,
+        attn_mask=attention_mask,
+        dropout_p=dropout,
+        scale=scaling,
+        is_causal=is_causal,
+        enable_gqa=True,
+    )
+    return attn_output.transpose(1, 2).contiguous(), None
+
+
+def select_attention_interface(module: nn.Module, eager_attention_forward: Callable) -> Callable:
+    """
+    Attention function of `module`, honouring its `gqa_attention` switch for `eager` and `sdpa`.
+    `eager_attention_forward` is the stock eager attention of the calling model.
+    """
+    attn_implementation = module.config._attn_implementation
+    if getattr(module, "gqa_attention", False) and attn_implementation in ("eager", "sdpa"):
+        if attn_implementation == "eager":
+            return grouped_query_attention_forward
+        return grouped_query_sdpa_attention_forward
+    if attn_implementation != "eager":
+        return ALL_ATTENTION_FUNCTIONS[attn_implementation]
+    return eager_attention_forward
+
+
+def reserve_rope_positions(rotary_emb: nn.Module, num_positions: int) -> None:
+    """
+    Make the cos / sin table of `rotary_emb` cover the positions below `num_positions`, a bound the caller knows on
+    the host (a sequence or cache length), at least doubling the table when it has to grow.
+    """
+    if num_positions > rotary_emb.rope_table_size:
+        rotary_emb.rope_table_size = max(num_positions, 2 * rotary_emb.rope_table_size)
+
+
+def rope_cos_sin_table(rotary_emb: nn.Module, device: torch.device, dtype: torch.dtype):
+    """
+    cos / sin of the positions below `rotary_emb.rope_table_size` for `rotary_emb`, attention scaling applied, in
+    `dtype` on `device`. Built once and reused until `inv_freq` is replaced, moved or updated in place, or the table
+    is grown by `reserve_rope_positions`, so a step gathers its rows instead of recomputing the trigonometry.
+
+    `rope_table_size` starts at `max_position_embeddings` of the rotary config.
+
+    Returns:
+        `tuple(torch.Tensor, torch.Tensor)`: cos and sin, each of shape `(rope_table_size, dim)`.
+    """
+    inv_freq = rotary_emb.inv_freq
+    version = 0 if inv_freq.is_inference() else inv_freq._version
+    key = (device, dtype, inv_freq.device, inv_freq.data_ptr(), version, rotary_emb.rope_table_size)
+    cached = rotary_emb._cos_sin_table
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+    device_type = device.type if device.type != "mps" else "cpu"
+    with torch.no_grad(), torch.autocast(device_type=device_type, enabled=False):  # Force float32
+        positions = torch.arange(rotary_emb.rope_table_size, device=device, dtype=torch.float32)
+        freqs = torch.outer(positions, inv_freq.to(device).float())
+        emb = torch.cat((freqs, freqs), dim=-1)
+        cos = (emb.cos() * rotary_emb.attention_scaling).to(dtype)
+        sin = (emb.sin() * rotary_emb.attention_scaling).to(dtype)
+    rotary_emb._cos_sin_table = (key, cos, sin)
+    return cos, sin
+
+
+def use_rope_cos_sin_table(rotary_emb: nn.Module) -> bool:
+    # dynamic / longrope frequencies depend on the sequence length; compiled and traced graphs keep the trigonometry
+    return (
+        "dynamic" not in rotary_emb.rope_type
+        and rotary_emb.rope_type != "longrope"
+        and not torch.compiler.is_compiling()
+        and not torch.jit.is_tracing()
+    )
@@ -14,5 +14,5 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from .configuration_qwen3_tts import Qwen3TTSConfig
-from .modeling_qwen3_tts import Qwen3TTSForConditionalGeneration
+from .modeling_qwen3_tts import Qwen3TTSForConditionalGeneration, Qwen3TTSTalkerPrefixCache
 from .processing_qwen3_tts import Qwen3TTSProcessor
\ No newline at end of file
@@ -15,9 +15,12 @@
 """PyTorch Qwen3TTS model."""
 
 import json
+import math
 import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Callable, Optional
+from typing import Callable, Optional, Union
 
 import huggingface_hub
 import torch
@@ -26,8 +29,8 @@ from librosa.filters import mel as librosa_mel_fn
 from torch import nn
 from torch.nn import functional as F
 from transformers.activations import ACT2FN
-from transformers.cache_utils import Cache, DynamicCache
-from transformers.generation import GenerationMixin
+from transformers.cache_utils import Cache, DynamicCache, StaticCache
+from transformers.generation import CompileConfig, GenerationMixin
 from transformers.integrations import use_kernel_forward_from_hub
 from transformers.masking_utils import (create_causal_mask,
                                         create_sliding_window_causal_mask)
@@ -44,6 +47,9 @@ from transformers.utils import can_return_tuple, logging
 from transformers.utils.hub import cached_file
 
 from ...inference.qwen3_tts_tokenizer import Qwen3TTSTokenizer
+from ..modeling_utils import (GroupedQueryAttentionMixin, reserve_rope_positions,
+                              rope_cos_sin_table, select_attention_interface,
+                              use_rope_cos_sin_table)
 from .configuration_qwen3_tts import (Qwen3TTSConfig,
                                       Qwen3TTSSpeakerEncoderConfig,
                                       Qwen3TTSTalkerCodePredictorConfig,
@@ -112,15 +118,15 @@ class Res2NetBlock(torch.nn.Module):
         )
         self.scale = scale
 
-    def forward(self, hidden_states):
+    def forward(self, hidden_states, lengths=None):
         outputs = []
         for i, hidden_part in enumerate(torch.chunk(hidden_states, self.scale, dim=1)):
             if i == 0:
                 output_part = hidden_part
             elif i == 1:
-                output_part = self.blocks[i - 1](hidden_part)
+                output_part = self.blocks[i - 1](hidden_part, lengths)
             else:
-                output_part = self.blocks[i - 1](hidden_part + output_part)
+                output_part = self.blocks[i - 1](hidden_part + output_part, lengths)
             outputs.append(output_part)
         output = torch.cat(outputs, dim=1)
         return output
@@ -147,8 +153,14 @@ class SqueezeExcitationBlock(nn.Module):
         )
         self.sigmoid = nn.Sigmoid()
 
-    def forward(self, hidden_states):
-        hidden_states_mean = hidden_states.mean(dim=2, keepdim=True)
+    def forward(self, hidden_states, lengths=None):
+        if lengths is None:
+            hidden_states_mean = hidden_states.mean(dim=2, keepdim=True)
+        else:
+            # padded batch: average over the valid frames of each item only
+            mask = (torch.arange(hidden_states.shape[-1], device=hidden_states.device) < lengths[:, None]).unsqueeze(1)
+            mask = mask.to(hidden_states.dtype)
+            hidden_states_mean = (hidden_states * mask).sum(dim=2, keepdim=True) / mask.sum(dim=2, keepdim=True)
 
         hidden_states_mean = self.relu(self.conv1(hidden_states_mean))
         hidden_states_mean = self.sigmoid(self.conv2(hidden_states_mean))
@@ -211,13 +223,14 @@ class AttentiveStatisticsPooling(nn.Module):
         std = torch.sqrt((m * (x - mean.unsqueeze(dim)).pow(2)).sum(dim).clamp(self.eps))
         return mean, std
 
-    def forward(self, hidden_states):
+    def forward(self, hidden_states, lengths=None):
         seq_length = hidden_states.shape[-1]
-        lengths = torch.ones(hidden_states.shape[0], device=hidden_states.device)
+        if lengths is None:
+            lengths = torch.ones(hidden_states.shape[0], device=hidden_states.device) * seq_length
 
         # Make binary mask of shape [N, 1, L]
         mask = self._length_to_mask(
-            lengths * seq_length, max_len=seq_length, dtype=hidden_states.dtype, device=hidden_states.device
+            lengths, max_len=seq_length, dtype=hidden_states.dtype, device=hidden_states.device
         )
         mask = mask.unsqueeze(1)
 
@@ -263,9 +276,25 @@ class TimeDelayNetBlock(nn.Module):
         )
         self.activation = nn.ReLU()
 
-    def forward(self, hidden_states: torch.Tensor):
+    def forward(self, hidden_states: torch.Tensor, lengths=None):
+        padding = self.conv.dilation[0] * (self.conv.kernel_size[0] - 1) // 2
+        if lengths is not None and padding > 0:
+            hidden_states = reflect_past_lengths(hidden_states, lengths, padding)
         return self.activation(self.conv(hidden_states))
 
+
+def reflect_past_lengths(hidden_states: torch.Tensor, lengths: torch.Tensor, padding: int) -> torch.Tensor:
+    """
+    Overwrite the `padding` frames after the end of every item of a right padded batch with the reflection of its
+    last frames, so a "same" convolution with reflect padding sees at each item's end what it sees on that item alone.
+    """
+    seq_length = hidden_states.shape[-1]
+    positions = torch.arange(seq_length, device=hidden_states.device)
+    lengths = lengths.to(hidden_states.device)[:, None]
+    reflected = (2 * lengths - 2 - positions).clamp(min=0)
+    index = torch.where(positions < lengths, positions, reflected)
+    return hidden_states.gather(2, index[:, None, :].expand_as(hidden_states))
+
 class SqueezeExcitationRes2NetBlock(nn.Module):
     """An implementation of building block in ECAPA-TDNN, i.e.,
     TDNN-Res2Net-TDNN-SqueezeExcitationBlock.
@@ -297,13 +326,13 @@ class SqueezeExcitationRes2NetBlock(nn.Module):
         )
         self.se_block = SqueezeExcitationBlock(out_channels, se_channels, out_channels)
 
-    def forward(self, hidden_state):
+    def forward(self, hidden_state, lengths=None):
         residual = hidden_state
 
-        hidden_state = self.tdnn1(hidden_state)
-        hidden_state = self.res2net_block(hidden_state)
-        hidden_state = self.tdnn2(hidden_state)
-        hidden_state = self.se_block(hidden_state)
+        hidden_state = self.tdnn1(hidden_state, lengths)
+        hidden_state = self.res2net_block(hidden_state, lengths)
+        hidden_state = self.tdnn2(hidden_state, lengths)
+        hidden_state = self.se_block(hidden_state, lengths)
 
         return hidden_state + residual
 
@@ -370,21 +399,30 @@ class Qwen3TTSSpeakerEncoder(torch.nn.Module):
             padding_mode="reflect",
         )
 
-    def forward(self, hidden_states):
+    def forward(self, hidden_states, lengths=None):
+        """
+        Args:
+            hidden_states (`torch.FloatTensor` of shape `(batch_size, num_frames, mel_dim)`):
+                Log-mel frames, right padded when the clips have different lengths.
+            lengths (`torch.LongTensor` of shape `(batch_size,)`, *optional*):
+                Number of valid frames of every clip. The convolutions see each clip's own reflection past its end
+                and padded frames are left out of the squeeze-excitation and pooling statistics, so every clip gets
+                the embedding it gets alone. None treats every frame as valid.
+        """
         # Minimize transpose for efficiency
         hidden_states = hidden_states.transpose(1, 2)
 
         hidden_states_list = []
         for layer in self.blocks:
-            hidden_states = layer(hidden_states)
+            hidden_states = layer(hidden_states, lengths)
             hidden_states_list.append(hidden_states)
 
         # Multi-layer feature aggregation
         hidden_states = torch.cat(hidden_states_list[1:], dim=1)
-        hidden_states = self.mfa(hidden_states)
+        hidden_states = self.mfa(hidden_states, lengths)
 
         # Attentive Statistical Pooling
-        hidden_states = self.asp(hidden_states)
+        hidden_states = self.asp(hidden_states, lengths)
 
         # Final linear transformation
         hidden_states = self.fc(hidden_states)
@@ -396,6 +434,34 @@ class Qwen3TTSSpeakerEncoder(torch.nn.Module):
 def dynamic_range_compression_torch(x, C=1, clip_val=1e-5):
     return torch.log(torch.clamp(x, min=clip_val) * C)
 
+_mel_filterbanks = {}
+
+
+def mel_filterbank(
+    sampling_rate: int,
+    n_fft: int,
+    num_mels: int,
+    win_size: int,
+    fmin: int,
+    fmax: int = None,
+    device: torch.device = None,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Slaney-normalized librosa mel filterbank and Hann window of `mel_spectrogram`, built once per parameter set and
+    device.
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: mel basis of shape (num_mels, n_fft // 2 + 1) and window of shape (win_size,).
+    """
+    key = (sampling_rate, n_fft, num_mels, win_size, fmin, fmax, str(torch.device(device or "cpu")))
+    cached = _mel_filterbanks.get(key)
+    if cached is None:
+        mel = librosa_mel_fn(sr=sampling_rate, n_fft=n_fft, n_mels=num_mels, fmin=fmin, fmax=fmax)
+        cached = (torch.from_numpy(mel).float().to(device), torch.hann_window(win_size).to(device))
+        _mel_filterbanks[key] = cached
+    return cached
+
+
 def mel_spectrogram(
     y: torch.Tensor,
     n_fft: int,
@@ -430,14 +496,7 @@ def mel_spectrogram(
     if torch.max(y) > 1.0:
         print(f"[WARNING] Max value of input waveform signal is {torch.max(y)}")
 
-    device = y.device
-
-    mel = librosa_mel_fn(
-        sr=sampling_rate, n_fft=n_fft, n_mels=num_mels, fmin=fmin, fmax=fmax
-    )
-
-    mel_basis = torch.from_numpy(mel).float().to(device)
-    hann_window = torch.hann_window(win_size).to(device)
+    mel_basis, hann_window = mel_filterbank(sampling_rate, n_fft, num_mels, win_size, fmin, fmax, y.device)
 
     padding = (n_fft - hop_size) // 2
     y = torch.nn.functional.pad(
@@ -464,7 +523,7 @@ def mel_spectrogram(
     return mel_spec
 
 
-class Qwen3TTSPreTrainedModel(PreTrainedModel):
+class Qwen3TTSPreTrainedModel(PreTrainedModel, GroupedQueryAttentionMixin):
     config_class = Qwen3TTSConfig
     base_model_prefix = "model"
     supports_gradient_checkpointing = True
@@ -496,7 +555,7 @@ class Qwen3TTSPreTrainedModel(PreTrainedModel):
                 module.bias.data.zero_()
 
 
-class Qwen3TTSTalkerTextPreTrainedModel(PreTrainedModel):
+class Qwen3TTSTalkerTextPreTrainedModel(PreTrainedModel, GroupedQueryAttentionMixin):
     base_model_prefix = "model"
     supports_gradient_checkpointing = True
     _no_split_modules = []
@@ -540,12 +599,20 @@ class Qwen3TTSTalkerRotaryEmbedding(nn.Module):
         inv_freq, self.attention_scaling = self.rope_init_fn(self.config, device)
         self.register_buffer("inv_freq", inv_freq, persistent=False)
         self.original_inv_freq = self.inv_freq
+        # (key, cos, sin), see `rope_cos_sin_table`
+        self._cos_sin_table = None
+        self.rope_table_size = config.max_position_embeddings
 
     @torch.no_grad()
     @dynamic_rope_update  # power user: used with advanced RoPE types (e.g. dynamic rope)
     def forward(self, x, position_ids):
         # In contrast to other models, Qwen3TTSThinkerText has different position ids for the grids
         # So we expand the inv_freq to shape (3, ...)
+        if use_rope_cos_sin_table(self):
+            cos, sin = rope_cos_sin_table(self, x.device, x.dtype)
+            position_ids = position_ids.to(x.device, torch.long)
+            return F.embedding(position_ids, cos), F.embedding(position_ids, sin)
+
         inv_freq_expanded = self.inv_freq[None, None, :, None].float().expand(3, position_ids.shape[1], -1, 1)
         position_ids_expanded = position_ids[:, :, None, :].float()  # shape (3, bs, 1, positions)
 
@@ -575,10 +642,18 @@ class Qwen3TTSRotaryEmbedding(nn.Module):
         inv_freq, self.attention_scaling = self.rope_init_fn(self.config, device)
         self.register_buffer("inv_freq", inv_freq, persistent=False)
         self.original_inv_freq = self.inv_freq
+        # (key, cos, sin), see `rope_cos_sin_table`
+        self._cos_sin_table = None
+        self.rope_table_size = config.max_position_embeddings
 
     @torch.no_grad()
     @dynamic_rope_update  # power user: used with advanced RoPE types (e.g. dynamic rope)
     def forward(self, x, position_ids):
+        if use_rope_cos_sin_table(self):
+            cos, sin = rope_cos_sin_table(self, x.device, x.dtype)
+            position_ids = position_ids.to(x.device, torch.long)
+            return F.embedding(position_ids, cos), F.embedding(position_ids, sin)
+
         inv_freq_expanded = self.inv_freq[None, :, None].float().expand(position_ids.shape[0], -1, 1).to(x.device)
         position_ids_expanded = position_ids[:, None, :].float()
 
@@ -612,6 +687,79 @@ class Qwen3TTSRMSNorm(nn.Module):
     def extra_repr(self):
         return f"{tuple(self.weight.shape)}, eps={self.variance_epsilon}"
 
+def sample_next_token(logits, do_sample=True, top_k=None, top_p=None, temperature=None):
+    r"""
+    Sample one token per row from `logits` of shape `(batch_size, vocab_size)`.
+
+    Applies temperature, top-k and top-p in the same order and with the same semantics as the HuggingFace logits
+    warpers used by `generate()`, but works in place on a float32 copy of the logits.
+
+    Returns:
+        `torch.LongTensor` of shape `(batch_size,)`.
+    """
+    scores = logits.to(dtype=torch.float32, copy=True)
+    if not do_sample:
+        return scores.argmax(dim=-1)
+    if temperature is not None and temperature != 1.0:
+        scores.div_(temperature)
+    if top_k is not None and top_k > 0:
+        top_k = min(top_k, scores.shape[-1])
+        kth_scores = torch.topk(scores, top_k)[0][..., -1, None]
+        scores.masked_fill_(scores < kth_scores, -float("inf"))
+    if top_p is not None and top_p < 1.0:
+        sorted_scores, sorted_indices = torch.sort(scores, descending=False)
+        cumulative_probs = sorted_scores.softmax(dim=-1).cumsum(dim=-1)
+        sorted_indices_to_remove = cumulative_probs <= (1 - top_p)
+        sorted_indices_to_remove[..., -1:] = False
+        scores.masked_fill_(sorted_indices_to_remove.scatter(1, sorted_indices, sorted_indices_to_remove), -float("inf"))
+    probs = scores.softmax(dim=-1)
+    return torch.multinomial(probs, num_samples=1).squeeze(1)
+
+
+def sample_codec_tokens(
+    logits,
+    seen_tokens,
+    num_generated,
+    eos_token_id,
+    suppress_mask=None,
+    min_new_tokens=0,
+    repetition_penalty=1.0,
+    do_sample=True,
+    top_k=None,
+    top_p=None,
+    temperature=None,
+):
+    r"""
+    Talker logits step of the row-wise decoding loops (`generate_shrinking`, `Qwen3TTSEngine`).
+
+    Applies the repetition penalty over `seen_tokens`, the suppressed tokens and `min_new_tokens` (EOS is masked for
+    rows that generated fewer tokens) like `generate()`, samples with [`sample_next_token`] and marks the sampled
+    tokens in `seen_tokens`.
+
+    Args:
+        logits (`torch.Tensor` of shape `(batch_size, vocab_size)`):
+            Codec head logits of the last position.
+        seen_tokens (`torch.BoolTensor` of shape `(batch_size, vocab_size)`):
+            Tokens generated so far by every row, updated in place.
+        num_generated (`int` or `torch.LongTensor` of shape `(batch_size,)`):
+            Tokens generated so far, for all rows or per row.
+
+    Returns:
+        `torch.LongTensor` of shape `(batch_size,)`.
+    """
+    logits = logits.float()
+    if repetition_penalty != 1.0:
+        penalized = torch.where(logits < 0, logits * repetition_penalty, logits / repetition_penalty)
+        logits = torch.where(seen_tokens, penalized, logits)
+    if suppress_mask is not None:
+        logits = logits.masked_fill(suppress_mask, -float("inf"))
+    too_short = torch.as_tensor(num_generated, device=logits.device) < min_new_tokens
+    logits[:, eos_token_id] = logits[:, eos_token_id].masked_fill(too_short, -float("inf"))
+    next_tokens = sample_next_token(logits, do_sample=do_sample, top_k=top_k, top_p=top_p, temperature=temperature)
+    seen_tokens[torch.arange(logits.shape[0], device=logits.device), next_tokens] = True
+    return next_tokens
+
+
 def rotate_half(x):
     """Rotates half the hidden dims of the input."""
     x1 = x[..., : x.shape[-1] // 2]
@@ -733,6 +881,7 @@ class Qwen3TTSTalkerAttention(nn.Module):
         self.layer_idx = layer_idx
         self.head_dim = getattr(config, "head_dim", config.hidden_size // config.num_attention_heads)
         self.num_key_value_groups = config.num_attention_heads // config.num_key_value_heads
+        self.gqa_attention = False
         self.scaling = self.head_dim**-0.5
         self.attention_dropout = config.attention_dropout
         self.is_causal = True
@@ -784,9 +933,7 @@ class Qwen3TTSTalkerAttention(nn.Module):
             cache_kwargs = {"sin": sin, "cos": cos, "cache_position": cache_position}
             key_states, value_states = past_key_values.update(key_states, value_states, self.layer_idx, cache_kwargs)
 
-        attention_interface: Callable = eager_attention_forward
-        if self.config._attn_implementation != "eager":
-            attention_interface = ALL_ATTENTION_FUNCTIONS[self.config._attn_implementation]
+        attention_interface: Callable = select_attention_interface(self, eager_attention_forward)
 
         attn_output, attn_weights = attention_interface(
             self,
@@ -891,6 +1038,7 @@ class Qwen3TTSAttention(nn.Module):
         self.layer_idx = layer_idx
         self.head_dim = getattr(config, "head_dim", config.hidden_size // config.num_attention_heads)
         self.num_key_value_groups = config.num_attention_heads // config.num_key_value_heads
+        self.gqa_attention = False
         self.scaling = self.head_dim**-0.5
         self.attention_dropout = config.attention_dropout
         self.is_causal = True
@@ -937,9 +1085,7 @@ class Qwen3TTSAttention(nn.Module):
             cache_kwargs = {"sin": sin, "cos": cos, "cache_position": cache_position}
             key_states, value_states = past_key_values.update(key_states, value_states, self.layer_idx, cache_kwargs)
 
-        attention_interface: Callable = eager_attention_forward
-        if self.config._attn_implementation != "eager":
-            attention_interface = ALL_ATTENTION_FUNCTIONS[self.config._attn_implementation]
+        attention_interface: Callable = select_attention_interface(self, eager_attention_forward)
 
         attn_output, attn_weights = attention_interface(
             self,
@@ -1012,6 +1158,49 @@ class Qwen3TTSDecoderLayer(GradientCheckpointingLayer):
         return outputs
 
 
+class Qwen3TTSMultiCodebookEmbedding(nn.ModuleList):
+    r"""
+    Embedding tables of consecutive codec groups, looked up for all groups with a single gather.
+
+    It is an `nn.ModuleList` of one `nn.Embedding` per group, so checkpoints and `embeddings[i](ids)` keep working
+    unchanged. Calling it with codes of shape `(..., num_groups)` returns the per-group embeddings of shape
+    `(..., num_groups, embedding_dim)`; fewer groups select the leading tables. Without gradients the concatenated
+    table is built once and reused until a weight is replaced, moved or updated in place; with gradients it is
+    concatenated on every call so they flow back to the per-group weights.
+    """
+
+    def __init__(self, num_groups: int, num_embeddings: int, embedding_dim: int):
+        super().__init__([nn.Embedding(num_embeddings, embedding_dim) for _ in range(num_groups)])
+        self.num_embeddings = num_embeddings
+        # (weights key, fused weight, group offsets)
+        self._fused = None
+
+    def fused_weight(self):
+        r"""
+        Returns:
+            `tuple(torch.FloatTensor, torch.LongTensor)`: the tables of all groups concatenated, with shape
+            `(num_groups * num_embeddings, embedding_dim)`, and the row offset of every group.
+        """
+        weights = [embedding.weight for embedding in self]
+        if torch.is_grad_enabled() and any(w.requires_grad for w in weights):
+            offsets = torch.arange(len(weights), device=weights[0].device) * self.num_embeddings
+            return torch.cat(weights, dim=0), offsets
+        # inference tensors (weights created under `torch.inference_mode`) carry no version counter
+        key = tuple((w.device, w.dtype, w.data_ptr(), 0 if w.is_inference() else w._version) for w in weights)
+        cached = self._fused
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+        with torch.no_grad():
+            fused = torch.cat(weights, dim=0)
+            offsets = torch.arange(len(weights), device=fused.device) * self.num_embeddings
+        self._fused = (key, fused, offsets)
+        return fused, offsets
+
+    def forward(self, codes: torch.LongTensor) -> torch.Tensor:
+        weight, offsets = self.fused_weight()
+        return F.embedding(codes + offsets[: codes.shape[-1]], weight)
+
+
 class Qwen3TTSTalkerCodePredictorModel(Qwen3TTSPreTrainedModel):
     config_class = Qwen3TTSTalkerCodePredictorConfig
     base_model_prefix = "talker.code_predictor.model"
@@ -1027,8 +1216,8 @@ class Qwen3TTSTalkerCodePredictorModel(Qwen3TTSPreTrainedModel):
         self.rotary_emb = Qwen3TTSRotaryEmbedding(config=config)
         self.gradient_checkpointing = False
         self.has_sliding_layers = "sliding_attention" in self.config.layer_types
-        self.codec_embedding = nn.ModuleList(
-            [nn.Embedding(config.vocab_size, embedding_dim) for _ in range(config.num_code_groups - 1)]
+        self.codec_embedding = Qwen3TTSMultiCodebookEmbedding(
+            config.num_code_groups - 1, config.vocab_size, embedding_dim
         )
 
         # Initialize weights and apply final processing
@@ -1087,6 +1276,7 @@ class Qwen3TTSTalkerCodePredictorModel(Qwen3TTSPreTrainedModel):
             cache_position = torch.arange(
                 past_seen_tokens, past_seen_tokens + inputs_embeds.shape[1], device=inputs_embeds.device
             )
+            reserve_rope_positions(self.rotary_emb, past_seen_tokens + inputs_embeds.shape[1])
 
         if position_ids is None:
             position_ids = cache_position.unsqueeze(0)
@@ -1318,6 +1508,67 @@ class Qwen3TTSTalkerCodePredictorModelForConditionalGeneration(Qwen3TTSPreTraine
         model_kwargs["generation_steps"] = outputs.generation_steps
         return model_kwargs
 
+    def fused_generate(
+        self,
+        inputs_embeds,
+        past_key_values=None,
+        do_sample=None,
+        top_k=None,
+        top_p=None,
+        temperature=None,
+    ):
+        r"""
+        Generate the `num_code_groups - 1` residual code groups of a frame with a plain decode loop instead of
+        `generate()`. Keys and values go to a preallocated `StaticCache` which is returned so the next frame can reuse
+        it; unset sampling arguments fall back to `self.generation_config`. The sampled tokens follow the same
+        distribution as `generate()` with the same arguments.
+
+        inputs_embeds (`torch.FloatTensor` of shape `(batch_size, 2, hidden_size)`):
+            Talker hidden state followed by the embedding of the first code group.
+        past_key_values (`StaticCache`, *optional*):
+            Cache returned by a previous call; reallocated when the batch size, dtype or device changed.
+
+        Returns:
+            `tuple(torch.LongTensor, StaticCache)`: the codes of shape `(batch_size, num_code_groups - 1)` and the
+            cache.
+        """
+        generation_config = self.generation_config
+        do_sample = do_sample if do_sample is not None else generation_config.do_sample
+        top_k = top_k if top_k is not None else generation_config.top_k
+        top_p = top_p if top_p is not None else generation_config.top_p
+        temperature = temperature if temperature is not None else generation_config.temperature
+
+        batch_size = inputs_embeds.shape[0]
+        num_steps = self.config.num_code_groups - 1
+        if past_key_values is not None and past_key_values.is_initialized:
+            keys = past_key_values.layers[0].keys
+            if (
+                keys.shape[0] != batch_size
+                or keys.dtype != inputs_embeds.dtype
+                or keys.device != inputs_embeds.device
+            ):
+                past_key_values = None
+        if past_key_values is None:
+            past_key_values = StaticCache(config=self.config, max_cache_len=self.config.num_code_groups)
+
+        sequences = torch.empty((batch_size, num_steps), dtype=torch.long, device=inputs_embeds.device)
+        cache_position = torch.arange(inputs_embeds.shape[1], device=inputs_embeds.device)
+        for step in range(num_steps):
+            if step > 0:
+                inputs_embeds = self.model.get_input_embeddings()[step - 1](sequences[:, step - 1 : step])
+            hidden_states = self.model(
+                inputs_embeds=self.small_to_mtp_projection(inputs_embeds),
+                past_key_values=past_key_values,
+                use_cache=True,
+                cache_position=cache_position,
+            ).last_hidden_state
+            logits = self.lm_head[step](hidden_states[:, -1])
+            sequences[:, step] = sample_next_token(
+                logits, do_sample=do_sample, top_k=top_k, top_p=top_p, temperature=temperature
+            )
+            cache_position = cache_position[-1:] + 1
+        return sequences, past_key_values
+
 
 @dataclass
 class Qwen3TTSTalkerOutputWithPast(ModelOutput):
@@ -1340,9 +1591,11 @@ class Qwen3TTSTalkerOutputWithPast(ModelOutput):
     hidden_states: Optional[tuple[torch.FloatTensor]] = None
     attentions: Optional[tuple[torch.FloatTensor]] = None
     past_hidden: Optional[torch.FloatTensor] = None
-    generation_step: Optional[int] = None
+    generation_step: Optional[torch.LongTensor] = None
     trailing_text_hidden: Optional[torch.FloatTensor] = None
     tts_pad_embed: Optional[torch.FloatTensor] = None
+    subtalker_cache: Optional[Cache] = None
+    rope_deltas: Optional[torch.LongTensor] = None
 
 
 class Qwen3TTSTalkerDecoderLayer(GradientCheckpointingLayer):
@@ -1494,6 +1747,10 @@ class Qwen3TTSTalkerModel(Qwen3TTSTalkerTextPreTrainedModel):
             cache_position = torch.arange(
                 past_seen_tokens, past_seen_tokens + inputs_embeds.shape[1], device=inputs_embeds.device
             )
+            reserve_rope_positions(self.rotary_emb, past_seen_tokens + inputs_embeds.shape[1])
+        elif isinstance(attention_mask, torch.Tensor):
+            # rope positions never pass the cache slot they are written to, and the mask spans every slot
+            reserve_rope_positions(self.rotary_emb, attention_mask.shape[-1])
 
         # the hard coded `3` is for temporal, height and width.
         if position_ids is None:
@@ -1581,7 +1838,6 @@ class Qwen3TTSTalkerForConditionalGeneration(Qwen3TTSTalkerTextPreTrainedModel,
             config=config.code_predictor_config,
             talker_config=config
         )
-        self.rope_deltas = None
 
         # Initialize weights and apply final processing
         self.post_init()
@@ -1616,14 +1872,15 @@ class Qwen3TTSTalkerForConditionalGeneration(Qwen3TTSTalkerTextPreTrainedModel,
         assert talker_hidden_states.shape[1] == self.config.hidden_size
         assert codec_ids.shape[1] == self.config.num_code_groups
 
-        sub_talker_inputs_embeds = [talker_hidden_states.unsqueeze(1)]
-
-        for i in range(self.config.num_code_groups - 1):
-            if i == 0:
-                sub_talker_inputs_embeds.append(self.get_input_embeddings()(codec_ids[:, :1]))
-            else:
-                sub_talker_inputs_embeds.append(self.code_predictor.get_input_embeddings()[i-1](codec_ids[:, i:i+1]))
-        sub_talker_inputs_embeds = torch.cat(sub_talker_inputs_embeds, dim=1)
+        # hidden state, then the embeddings of groups 0 .. num_code_groups - 2
+        sub_talker_inputs_embeds = torch.cat(
+            [
+                talker_hidden_states.unsqueeze(1),
+                self.get_input_embeddings()(codec_ids[:, :1]),
+                self.code_predictor.get_input_embeddings()(codec_ids[:, 1:-1]),
+            ],
+            dim=1,
+        )
         
         sub_talker_outputs = self.code_predictor.forward_finetune(inputs_embeds=sub_talker_inputs_embeds,
                                                                  labels=codec_ids[:, 1:])
@@ -1632,6 +1889,66 @@ class Qwen3TTSTalkerForConditionalGeneration(Qwen3TTSTalkerTextPreTrainedModel,
         sub_talker_loss = sub_talker_outputs.loss
         return sub_talker_logits, sub_talker_loss
 
+    def predict_codec_frame(
+        self,
+        input_ids,
+        past_hidden,
+        subtalker_dosample=None,
+        subtalker_top_p=None,
+        subtalker_top_k=None,
+        subtalker_temperature=None,
+        subtalker_fused=False,
+        subtalker_cache=None,
+    ):
+        r"""
+        Complete a codec frame: the talker sampled the first code group `input_ids`, the code predictor generates the
+        remaining `num_code_groups - 1` groups conditioned on the talker hidden state `past_hidden`.
+
+        With `subtalker_fused=True` the code predictor runs `fused_generate` on `subtalker_cache` instead of a nested
+        `generate()` call.
+
+        Returns:
+            `tuple(torch.LongTensor, torch.FloatTensor, Optional[Cache])`: the codec ids of the frame with shape
+            `(batch_size, num_code_groups)`, the summed codec embedding with shape `(batch_size, 1, hidden_size)`
+            that is fed back into the talker, and the code predictor cache to pass to the next call (`None` when not
+            fused).
+        """
+        last_id_hidden = self.get_input_embeddings()(input_ids)
+        # the code predictor may be placed on another device / dtype than the talker
+        predictor_device, predictor_dtype = self.code_predictor.device, self.code_predictor.dtype
+        predictor_inputs = torch.cat((past_hidden, last_id_hidden), dim=1).to(predictor_device, predictor_dtype)
+        if subtalker_fused:
+            sequences, subtalker_cache = self.code_predictor.fused_generate(
+                predictor_inputs,
+                past_key_values=subtalker_cache,
+                do_sample=subtalker_dosample,
+                top_k=subtalker_top_k,
+                top_p=subtalker_top_p,
+                temperature=subtalker_temperature,
+            )
+        else:
+            predictor_result = self.code_predictor.generate(
+                inputs_embeds=predictor_inputs,
+                max_new_tokens=self.config.num_code_groups - 1,
+                do_sample=subtalker_dosample,
+                top_p=subtalker_top_p,
+                top_k=subtalker_top_k,
+                temperature=subtalker_temperature,
+                output_hidden_states=True,
+                return_dict_in_generate=True,
+            )
+            sequences = predictor_result.sequences
+            subtalker_cache = None
+        codec_ids = torch.cat((input_ids, sequences.to(input_ids.device)), dim=-1)
+        codec_hiddens = torch.cat(
+            [
+                last_id_hidden,
+                self.code_predictor.get_input_embeddings()(sequences).to(last_id_hidden.device, last_id_hidden.dtype),
+            ],
+            dim=1,
+        )
+        return codec_ids, codec_hiddens.sum(1, keepdim=True), subtalker_cache
+
     @can_return_tuple
     def forward(
         self,
@@ -1653,6 +1970,13 @@ class Qwen3TTSTalkerForConditionalGeneration(Qwen3TTSTalkerTextPreTrainedModel,
         subtalker_top_p=None,
         subtalker_top_k=None,
         subtalker_temperature=None,
+        subtalker_fused=False,
+        subtalker_cache=None,
+        rope_position_table=None,
+        rope_deltas=None,
+        codec_streamer=None,
+        codec_recorder=None,
+        compiled_forward=None,
         **kwargs,
     ) -> CausalLMOutputWithPast:
         r"""
@@ -1660,51 +1984,79 @@ class Qwen3TTSTalkerForConditionalGeneration(Qwen3TTSTalkerTextPreTrainedModel,
             Labels for computing the masked language modeling loss. Indices should either be in `[0, ...,
             config.vocab_size]` or -100 (see `input_ids` docstring). Tokens with indices set to `-100` are ignored
             (masked), the loss is only computed for the tokens with labels in `[0, ..., config.vocab_size]`.
+        rope_deltas (`torch.LongTensor` of shape `(batch_size, 1)`, *optional*):
+            Offset between cache positions and rope positions of every row, computed at prefill and carried to the
+            decode steps through the generation kwargs (not stored on the module, so concurrent calls do not mix).
+        codec_recorder ([`Qwen3TTSTalkerOutputRecorder`], *optional*):
+            Filled by `_update_model_kwargs_for_generation` outside of the (possibly compiled) forward; unused here.
+        compiled_forward (`Callable`, *optional*):
+            `torch.compile`d call of this module that runs the decode steps (not the prefill), see
+            `Qwen3TTSForConditionalGeneration.generate(compile_decode=True)`.
         ```"""
-        # Prefill
-        if inputs_embeds is not None and inputs_embeds.shape[1] > 1:
-            generation_step = -1
+        if compiled_forward is not None and past_hidden is not None:
+            return compiled_forward(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=past_key_values,
+                inputs_embeds=inputs_embeds,
+                labels=labels,
+                use_cache=use_cache,
+                output_attentions=output_attentions,
+                output_hidden_states=output_hidden_states,
+                cache_position=cache_position,
+                past_hidden=past_hidden,
+                trailing_text_hidden=trailing_text_hidden,
+                tts_pad_embed=tts_pad_embed,
+                generation_step=generation_step,
+                subtalker_dosample=subtalker_dosample,
+                subtalker_top_p=subtalker_top_p,
+                subtalker_top_k=subtalker_top_k,
+                subtalker_temperature=subtalker_temperature,
+                subtalker_fused=subtalker_fused,
+                subtalker_cache=subtalker_cache,
+                rope_position_table=rope_position_table,
+                rope_deltas=rope_deltas,
+                codec_streamer=codec_streamer,
+                codec_recorder=codec_recorder,
+                **kwargs,
+            )
+        # Prefill (possibly only the part of the prompt that is not in a reused prefix cache)
+        if past_hidden is None:
+            generation_step = torch.full((), -1, dtype=torch.long, device=inputs_embeds.device)
             codec_ids = None
         # Generate
         else:
-            last_id_hidden = self.get_input_embeddings()(input_ids)
-            predictor_result = self.code_predictor.generate(
-                inputs_embeds=torch.cat((past_hidden, last_id_hidden), dim=1),
-                max_new_tokens=self.config.num_code_groups - 1,
-                do_sample=subtalker_dosample,
-                top_p=subtalker_top_p,
-                top_k=subtalker_top_k,
-                temperature=subtalker_temperature,
-                output_hidden_states=True,
-                return_dict_in_generate=True,
-            )
-            codec_ids = torch.cat((input_ids, predictor_result.sequences), dim=-1)
-            codec_hiddens = torch.cat(
-                [last_id_hidden]
-                + [self.code_predictor.get_input_embeddings()[i](predictor_result.sequences[..., i:i+1]) for i in range(self.config.num_code_groups - 1)],
-                dim=1,
+            codec_ids, inputs_embeds, subtalker_cache = self.predict_codec_frame(
+                input_ids,
+                past_hidden,
+                subtalker_dosample=subtalker_dosample,
+                subtalker_top_p=subtalker_top_p,
+                subtalker_top_k=subtalker_top_k,
+                subtalker_temperature=subtalker_temperature,
+                subtalker_fused=subtalker_fused,
+                subtalker_cache=subtalker_cache,
             )
-            inputs_embeds = codec_hiddens.sum(1, keepdim=True)
-
-            if generation_step < trailing_text_hidden.shape[1]:
-                inputs_embeds = inputs_embeds + trailing_text_hidden[:, generation_step].unsqueeze(1)
-            else:
-                inputs_embeds = inputs_embeds + tts_pad_embed
-        if attention_mask is not None:
-            if (
-                cache_position is None
-                or (cache_position is not None and cache_position[0] == 0)
-                or self.rope_deltas is None
-            ):
+            if codec_streamer is not None:
+                codec_streamer.put(codec_ids, past_hidden)
+
+            # select on device so that the step does not depend on python-side values
+            text_len = trailing_text_hidden.shape[1]
+            text_hidden = trailing_text_hidden.index_select(1, generation_step.clamp(max=text_len - 1).view(1))
+            inputs_embeds = inputs_embeds + torch.where(generation_step < text_len, text_hidden, tts_pad_embed)
+        if rope_position_table is not None:
+            position_ids = rope_position_table[:, :, cache_position]
+        elif attention_mask is not None:
+            if cache_position is None or past_hidden is None or rope_deltas is None:
                 delta0 = (1 - attention_mask).sum(dim=-1).unsqueeze(1)
                 position_ids, rope_deltas = self.get_rope_index(
                     attention_mask,
                 )
                 rope_deltas = rope_deltas - delta0
-                self.rope_deltas = rope_deltas
+                position_ids = position_ids[:, :, -inputs_embeds.shape[1]:]
             else:
                 batch_size, seq_length = input_ids.shape
-                delta = cache_position[0] + self.rope_deltas if cache_position is not None else 0
+                delta = cache_position[0] + rope_deltas if cache_position is not None else 0
                 position_ids = torch.arange(seq_length, device=input_ids.device)
                 position_ids = position_ids.view(1, -1).expand(batch_size, -1)
                 position_ids = position_ids.add(delta)
@@ -1737,10 +2089,12 @@ class Qwen3TTSTalkerForConditionalGeneration(Qwen3TTSTalkerTextPreTrainedModel,
             past_key_values=outputs.past_key_values,
             hidden_states=(outputs.hidden_states, codec_ids),
             attentions=outputs.attentions,
-            past_hidden=hidden_states[:, -1:, :],
+            past_hidden=hidden_states[:, -1:, :].contiguous(),
             generation_step=generation_step + 1,
             trailing_text_hidden=trailing_text_hidden,
             tts_pad_embed=tts_pad_embed,
+            subtalker_cache=subtalker_cache,
+            rope_deltas=rope_deltas,
         )
 
     def get_rope_index(
@@ -1799,7 +2153,32 @@ class Qwen3TTSTalkerForConditionalGeneration(Qwen3TTSTalkerTextPreTrainedModel,
 
         return position_ids, mrope_position_deltas
 
+    def get_rope_position_table(self, attention_mask: torch.Tensor, max_length: int) -> torch.Tensor:
+        """
+        Precompute the 3D rope positions of every cache slot for a left padded prompt, so that decode steps only
+        index the table with `cache_position` instead of tracking `rope_deltas`.
+
+        Args:
+            attention_mask (`torch.Tensor` of shape `(batch_size, sequence_length)`):
+                Prompt attention mask, 0 on the left padding.
+            max_length (`int`):
+                Number of cache slots, prompt included.
+
+        Returns:
+            `torch.Tensor` of shape `(3, batch_size, max_length)`.
+        """
+        position_ids, rope_deltas = self.get_rope_index(attention_mask)
+        rope_deltas = rope_deltas - (1 - attention_mask).sum(dim=-1).unsqueeze(1)
+        decode_positions = torch.arange(
+            attention_mask.shape[1], max_length, device=attention_mask.device
+        ).view(1, -1).add(rope_deltas)
+        return torch.cat([position_ids, decode_positions.unsqueeze(0).expand(3, -1, -1)], dim=-1)
+
     def _update_model_kwargs_for_generation(self, outputs, model_kwargs, is_encoder_decoder=False, num_new_tokens=1):
+        codec_recorder = model_kwargs.get("codec_recorder")
+        if codec_recorder is not None and outputs.hidden_states[-1] is not None:
+            # the frame of this step was predicted from the hidden state the step received as `past_hidden`
+            codec_recorder.put(outputs.hidden_states[-1], model_kwargs["past_hidden"])
         model_kwargs = super()._update_model_kwargs_for_generation(
             outputs, model_kwargs, is_encoder_decoder, num_new_tokens
         )
@@ -1807,8 +2186,344 @@ class Qwen3TTSTalkerForConditionalGeneration(Qwen3TTSTalkerTextPreTrainedModel,
         model_kwargs["generation_step"] = outputs.generation_step
         model_kwargs["trailing_text_hidden"] = outputs.trailing_text_hidden
         model_kwargs["tts_pad_embed"] = outputs.tts_pad_embed
+        model_kwargs["subtalker_cache"] = outputs.subtalker_cache
+        model_kwargs["rope_deltas"] = outputs.rope_deltas
         return model_kwargs
 
+    @torch.no_grad()
+    def generate_shrinking(
+        self,
+        inputs_embeds: torch.Tensor,
+        attention_mask: torch.Tensor,
+        trailing_text_hidden: torch.Tensor,
+        tts_pad_embed: torch.Tensor,
+        codec_recorder: "Qwen3TTSTalkerOutputRecorder",
+        max_new_tokens: int,
+        min_new_tokens: int = 2,
+        do_sample: bool = True,
+        top_k: Optional[int] = None,
+        top_p: Optional[float] = None,
+        temperature: Optional[float] = None,
+        repetition_penalty: float = 1.0,
+        eos_token_id: Optional[int] = None,
+        suppress_tokens: Optional[list[int]] = None,
+        subtalker_dosample: bool = True,
+        subtalker_top_k: Optional[int] = None,
+        subtalker_top_p: Optional[float] = None,
+        subtalker_temperature: Optional[float] = None,
+        subtalker_fused: bool = False,
+    ):
+        r"""
+        Batched decoding loop that drops every row from the batch as soon as it samples EOS.
+
+        `generate()` keeps finished rows in the batch (fed with padding) until the longest row stops. Here the KV cache
+        rows, attention mask, `rope_deltas`, trailing text and repetition state of finished rows are removed at once,
+        and cache columns that became padding for all remaining rows are cut, so the cost of a batch follows the sum
+        of the row lengths. Logits processing matches `generate()` (repetition penalty, suppressed tokens,
+        `min_new_tokens`, then temperature / top-k / top-p); greedy results are identical, sampled ones draw from the
+        same distribution but consume the random stream differently once the batch shrinks.
+
+        Frames are written to `codec_recorder` with the row indices of the original batch.
+        """
+        device = inputs_embeds.device
+        batch_size = inputs_embeds.shape[0]
+        eos_token_id = eos_token_id if eos_token_id is not None else self.config.codec_eos_token_id
+        suppress_mask = torch.zeros(self.config.vocab_size, dtype=torch.bool, device=device)
+        if suppress_tokens:
+            suppress_mask[suppress_tokens] = True
+
+        past_hidden, past_key_values, rope_deltas = self.prefill_rows(inputs_embeds, attention_mask)
+        rows = torch.arange(batch_size, device=device)
+        seen_tokens = torch.zeros(batch_size, self.config.vocab_size, dtype=torch.bool, device=device)
+        subtalker_cache = None
+
+        for step in range(max_new_tokens):
+            next_tokens = sample_codec_tokens(
+                self.codec_head(past_hidden[:, -1, :]),
+                seen_tokens,
+                step,
+                eos_token_id,
+                suppress_mask=suppress_mask,
+                min_new_tokens=min_new_tokens,
+                repetition_penalty=repetition_penalty,
+                do_sample=do_sample,
+                top_k=top_k,
+                top_p=top_p,
+                temperature=temperature,
+            )
+            # the last allowed token never gets a frame, exactly like `generate()`
+            if step + 1 == max_new_tokens:
+                break
+
+            keep = (next_tokens != eos_token_id).nonzero().squeeze(1)
+            if keep.numel() == 0:
+                break
+            if keep.numel() < len(rows):
+                attention_mask, rope_deltas = self.select_rows(keep, past_key_values, attention_mask, rope_deltas)
+                rows, next_tokens, past_hidden = rows[keep], next_tokens[keep], past_hidden[keep]
+                seen_tokens, trailing_text_hidden = seen_tokens[keep], trailing_text_hidden[keep]
+
+            codec_ids, inputs_embeds, subtalker_cache = self.predict_codec_frame(
+                next_tokens.unsqueeze(1),
+                past_hidden,
+                subtalker_dosample=subtalker_dosample,
+                subtalker_top_p=subtalker_top_p,
+                subtalker_top_k=subtalker_top_k,
+                subtalker_temperature=subtalker_temperature,
+                subtalker_fused=subtalker_fused,
+                subtalker_cache=subtalker_cache,
+            )
+            codec_recorder.put(codec_ids, past_hidden, rows=rows)
+            if step < trailing_text_hidden.shape[1]:
+                inputs_embeds = inputs_embeds + trailing_text_hidden[:, step : step + 1]
+            else:
+                inputs_embeds = inputs_embeds + tts_pad_embed
+            past_hidden, attention_mask = self.decode_rows(inputs_embeds, attention_mask, rope_deltas, past_key_values)
+
+    def get_suppress_tokens(self) -> list[int]:
+        r"""Codec ids that are never sampled: the last 1024 ids of the vocabulary (control tokens) except EOS."""
+        return [
+            i
+            for i in range(self.config.vocab_size - 1024, self.config.vocab_size)
+            if i != self.config.codec_eos_token_id
+        ]
+
+    def prefill_rows(self, inputs_embeds: torch.Tensor, attention_mask: torch.Tensor):
+        r"""
+        Prefill of the row-wise decoding loops (`generate_shrinking`, `Qwen3TTSEngine`): run a left-padded prompt batch
+        into a new dynamic cache.
+
+        Returns:
+            `tuple`: `(past_hidden, past_key_values, rope_deltas)`, with `past_hidden` of shape
+            `(batch_size, 1, hidden_size)` and `rope_deltas` the offset between cache and rope positions of every row.
+        """
+        position_ids, rope_deltas = self.get_rope_index(attention_mask)
+        rope_deltas = rope_deltas - (1 - attention_mask).sum(dim=-1).unsqueeze(1)
+        past_key_values = DynamicCache(config=self.config)
+        outputs = self.model(
+            inputs_embeds=inputs_embeds,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=past_key_values,
+            use_cache=True,
+        )
+        return outputs.last_hidden_state[:, -1:, :], past_key_values, rope_deltas
+
+    def decode_rows(
+        self,
+        inputs_embeds: torch.Tensor,
+        attention_mask: torch.Tensor,
+        rope_deltas: torch.Tensor,
+        past_key_values: Cache,
+    ):
+        r"""
+        One decode step of the row-wise decoding loops, appending one position to every row of the cache.
+
+        Returns:
+            `tuple`: `(past_hidden, attention_mask)`, the mask grown by one column.
+        """
+        cache_length = attention_mask.shape[1]
+        position_ids = (rope_deltas + cache_length).view(1, -1, 1).expand(3, -1, -1)
+        attention_mask = torch.cat([attention_mask, attention_mask.new_ones(attention_mask.shape[0], 1)], dim=1)
+        outputs = self.model(
+            inputs_embeds=inputs_embeds,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=past_key_values,
+            use_cache=True,
+            cache_position=torch.tensor([cache_length], device=inputs_embeds.device),
+        )
+        return outputs.last_hidden_state[:, -1:, :], attention_mask
+
+    @staticmethod
+    def select_rows(
+        index: torch.Tensor,
+        past_key_values: Cache,
+        attention_mask: torch.Tensor,
+        rope_deltas: torch.Tensor,
+    ):
+        r"""
+        Keep rows `index` of a row-wise decoding state and cut the cache columns that are left padding for every
+        remaining row. The cache is updated in place; other per-row tensors are left to the caller.
+
+        Returns:
+            `tuple`: `(attention_mask, rope_deltas)` of the remaining rows.
+        """
+        past_key_values.batch_select_indices(index)
+        attention_mask, rope_deltas = attention_mask[index], rope_deltas[index]
+        num_pads = int((attention_mask.sum(dim=0) == 0).long().cumprod(dim=0).sum())
+        if num_pads > 0:
+            for layer in past_key_values.layers:
+                layer.keys = layer.keys[:, :, num_pads:]
+                layer.values = layer.values[:, :, num_pads:]
+            attention_mask = attention_mask[:, num_pads:]
+            rope_deltas = rope_deltas + num_pads
+        return attention_mask, rope_deltas
+
+
+class Qwen3TTSTalkerOutputRecorder:
+    r"""
+    Collects the codec frames of a talker `generate` call, and the last-layer hidden state each frame was predicted
+    from, into buffers allocated for `max_steps` frames.
+
+    This replaces `output_hidden_states=True`, which keeps the hidden states of every layer of every step alive until
+    generation ends only to recover these two values; memory now grows with the number of steps alone.
+
+    Args:
+        max_steps (`int`):
+            Number of frames to allocate for. The buffers grow if more frames are recorded.
+        record_hidden (`bool`, *optional*, defaults to `True`):
+            Also keep the talker hidden states.
+        batch_size (`int`, *optional*):
+            Number of rows of the buffers. Required when frames are recorded for a subset of the rows (`rows=`),
+            otherwise taken from the first frame.
+    """
+
+    def __init__(self, max_steps: int, record_hidden: bool = True, batch_size: Optional[int] = None):
+        self.max_steps = max(int(max_steps), 1)
+        self.record_hidden = record_hidden
+        self.batch_size = batch_size
+        self.num_steps = 0
+        self.codec_ids = None
+        self.hidden_states = None
+        self.lengths = None
+
+    def _grow(self, buffer: torch.Tensor) -> torch.Tensor:
+        grown = buffer.new_empty(buffer.shape[0], 2 * buffer.shape[1], *buffer.shape[2:])
+        grown[:, : buffer.shape[1]] = buffer
+        return grown
+
+    def put(
+        self,
+        codec_ids: torch.Tensor,
+        talker_hidden: Optional[torch.Tensor] = None,
+        rows: Optional[torch.Tensor] = None,
+    ):
+        r"""
+        Record the `(batch_size, num_code_groups)` frame of one step and the `(batch_size, 1, hidden_size)` hidden
+        state it was predicted from. With `rows`, the frame only covers those rows of the batch; `lengths` keeps
+        the number of frames recorded for every row.
+        """
+        if self.codec_ids is None:
+            batch_size = self.batch_size if self.batch_size is not None else codec_ids.shape[0]
+            self.codec_ids = codec_ids.new_empty(batch_size, self.max_steps, codec_ids.shape[1])
+            if self.record_hidden:
+                self.hidden_states = talker_hidden.new_empty(batch_size, self.max_steps, talker_hidden.shape[-1])
+            self.lengths = torch.zeros(batch_size, dtype=torch.long, device=codec_ids.device)
+        if self.num_steps == self.codec_ids.shape[1]:
+            self.codec_ids = self._grow(self.codec_ids)
+            if self.record_hidden:
+                self.hidden_states = self._grow(self.hidden_states)
+        rows = slice(None) if rows is None else rows
+        self.codec_ids[rows, self.num_steps] = codec_ids
+        if self.record_hidden:
+            self.hidden_states[rows, self.num_steps] = talker_hidden[:, -1]
+        self.lengths[rows] = self.num_steps + 1
+        self.num_steps += 1
+
+    def get(self):
+        r"""
+        Returns:
+            `tuple`: the `(batch_size, num_steps, num_code_groups)` codec ids and the
+            `(batch_size, num_steps, hidden_size)` hidden states (`None` when `record_hidden=False`).
+        """
+        if self.codec_ids is None:
+            return None, None
+        hidden_states = self.hidden_states[:, : self.num_steps] if self.record_hidden else None
+        return self.codec_ids[:, : self.num_steps], hidden_states
+
+
+class Qwen3TTSTalkerPrefixCache:
+    r"""
+    Talker KV states of recent prompts, reused by later prompts that start with the same embeddings.
+
+    After a single-sample [`~Qwen3TTSForConditionalGeneration.generate`] call the KV state of its prompt (instruct,
+    role, codec tags / speaker and text) is kept. The next call looks for the stored prompt sharing the longest
+    common prefix with its own prompt, starts from a copy of that part of the cache and only prefills the rest. Scripts
+    rendered segment by segment with the same voice instruct therefore skip most of the prefill.
+
+    Entries are kept in LRU order; the cache is safe to share between threads.
+
+    Args:
+        max_entries (`int`, *optional*, defaults to 8):
+            Number of prompts kept.
+        min_prefix_length (`int`, *optional*, defaults to 4):
+            Shorter matches are ignored.
+    """
+
+    def __init__(self, max_entries: int = 8, min_prefix_length: int = 4):
+        self.max_entries = max_entries
+        self.min_prefix_length = min_prefix_length
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _common_prefix_length(a: torch.Tensor, b: torch.Tensor) -> int:
+        length = min(a.shape[0], b.shape[0])
+        if length == 0 or a.dtype != b.dtype or a.device != b.device:
+            return 0
+        equal = (a[:length] == b[:length]).all(dim=-1)
+        return length if bool(equal.all()) else int(equal.int().argmin())
+
+    def fork(self, prompt_embeds: torch.Tensor, past_key_values: Cache) -> int:
+        r"""
+        Write the KV state of the longest cached prefix of `prompt_embeds` (`(prompt_length, hidden_size)`) into the
+        empty `past_key_values`. At least the last prompt position is left to prefill.
+
+        Returns:
+            `int`: number of prompt positions now in `past_key_values`.
+        """
+        best_length, best_layers = 0, None
+        with self._lock:
+            for entry_id, (embeds, layers) in self._entries.items():
+                length = min(self._common_prefix_length(embeds, prompt_embeds), prompt_embeds.shape[0] - 1)
+                if length > best_length:
+                    best_id, best_length, best_layers = entry_id, length, layers
+            if best_layers is not None:
+                self._entries.move_to_end(best_id)
+        if best_length < self.min_prefix_length:
+            return 0
+        cache_position = torch.arange(best_length, device=prompt_embeds.device)
+        for layer_idx, (keys, values) in enumerate(best_layers):
+            past_key_values.update(
+                keys[:, :, :best_length], values[:, :, :best_length], layer_idx, {"cache_position": cache_position}
+            )
+        return best_length
+
+    def put(self, prompt_embeds: torch.Tensor, past_key_values: Cache) -> None:
+        r"""
+        Store the KV state of the first `prompt_embeds.shape[0]` positions of `past_key_values` (batch size 1).
+        """
+        prompt_length = prompt_embeds.shape[0]
+        if prompt_length < self.min_prefix_length or any(
+            layer.keys is None or layer.keys.shape[-2] < prompt_length for layer in past_key_values.layers
+        ):
+            return
+        layers = [
+            (layer.keys[:, :, :prompt_length].clone(), layer.values[:, :, :prompt_length].clone())
+            for layer in past_key_values.layers
+        ]
+        with self._lock:
+            # drop entries that are prefixes of (or equal to) the new prompt, they are superseded
+            for entry_id in [
+                entry_id
+                for entry_id, (embeds, _) in self._entries.items()
+                if self._common_prefix_length(embeds, prompt_embeds) == embeds.shape[0]
+            ]:
+                del self._entries[entry_id]
+            self._entries[self._next_id] = (prompt_embeds.detach().clone(), layers)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class Qwen3TTSForConditionalGeneration(Qwen3TTSPreTrainedModel, GenerationMixin):
     config_class = Qwen3TTSConfig
@@ -1838,6 +2553,9 @@ class Qwen3TTSForConditionalGeneration(Qwen3TTSPreTrainedModel, GenerationMixin)
         self.tts_model_size = self.config.tts_model_size
         self.tts_model_type = self.config.tts_model_type
 
+        # (weights key, embeds), replaced as a whole so concurrent generate calls never see a torn update
+        self._special_text_embeds = None
+
         self.post_init()
     
     def load_speech_tokenizer(self, speech_tokenizer):
@@ -1940,18 +2658,60 @@ class Qwen3TTSForConditionalGeneration(Qwen3TTSPreTrainedModel, GenerationMixin)
     @torch.inference_mode()
     def extract_speaker_embedding(self, audio, sr):
         assert sr == 24000, "Only support 24kHz audio"
-        mels = mel_spectrogram(
-            torch.from_numpy(audio).unsqueeze(0), 
-            n_fft=1024, 
-            num_mels=128, 
+        mels = self._speaker_mels(audio)
+        encoder_param = next(self.speaker_encoder.parameters())
+        speaker_embedding = self.speaker_encoder(mels.to(encoder_param.device).to(encoder_param.dtype))[0]
+        return speaker_embedding
+
+    @torch.inference_mode()
+    def extract_speaker_embeddings(self, audios: list, sr: int, batch_size: int = 16) -> list[torch.Tensor]:
+        r"""
+        Batched `extract_speaker_embedding`.
+
+        Clips are sorted by length and run through the speaker encoder `batch_size` at a time, right padded to the
+        longest clip of their batch and masked by their real lengths, so each embedding matches the one
+        `extract_speaker_embedding` returns up to float rounding.
+
+        Args:
+            audios (`list[np.ndarray]`):
+                Mono float waveforms.
+            sr (`int`):
+                Sampling rate of every clip, must be 24000.
+            batch_size (`int`, *optional*, defaults to 16):
+                Clips per speaker encoder call.
+
+        Returns:
+            `list[torch.Tensor]`: one embedding of shape `(enc_dim,)` per clip, in input order.
+        """
+        assert sr == 24000, "Only support 24kHz audio"
+        mels = [self._speaker_mels(audio)[0] for audio in audios]
+        order = sorted(range(len(mels)), key=lambda i: mels[i].shape[0])
+        encoder_param = next(self.speaker_encoder.parameters())
+        embeddings = [None] * len(mels)
+        for start in range(0, len(order), batch_size):
+            index = order[start : start + batch_size]
+            lengths = torch.tensor([mels[i].shape[0] for i in index])
+            batch = torch.nn.utils.rnn.pad_sequence(
+                [mels[i] for i in index], batch_first=True, padding_value=math.log(1e-5)
+            )
+            batch = batch.to(encoder_param.device).to(encoder_param.dtype)
+            batch_embeddings = self.speaker_encoder(batch, lengths.to(encoder_param.device))
+            for i, embedding in zip(index, batch_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+
+    @staticmethod
+    def _speaker_mels(audio) -> torch.Tensor:
+        return mel_spectrogram(
+            torch.from_numpy(audio).unsqueeze(0),
+            n_fft=1024,
+            num_mels=128,
             sampling_rate=24000,
-            hop_size=256, 
-            win_size=1024, 
-            fmin=0, 
-            fmax=12000
+            hop_size=256,
+            win_size=1024,
+            fmin=0,
+            fmax=12000,
         ).transpose(1, 2)
-        speaker_embedding = self.speaker_encoder(mels.to(self.device).to(self.dtype))[0]
-        return speaker_embedding
     
     @torch.inference_mode()
     def generate_speaker_prompt(
@@ -1980,13 +2740,17 @@ class Qwen3TTSForConditionalGeneration(Qwen3TTSPreTrainedModel, GenerationMixin)
                                                             dim=-1)))
         text_embed = torch.cat([text_embed, tts_eos_embed], dim=1)
         # codec embed (codec bos + codec) 1 T2 D
-        codec_embed = []
-        for i in range(self.talker.config.num_code_groups):
-            if i == 0:
-                codec_embed.append(self.talker.get_input_embeddings()(ref_code[:, :1]))
-            else:
-                codec_embed.append(self.talker.code_predictor.get_input_embeddings()[i-1](ref_code[:, i:i+1]))
-        codec_embed = torch.cat(codec_embed, dim=1).sum(1).unsqueeze(0)
+        predictor_embed = self.talker.code_predictor.get_input_embeddings()
+        codec_embed = torch.cat(
+            [
+                self.talker.get_input_embeddings()(ref_code[:, :1]),
+                predictor_embed(ref_code[:, 1:].to(self.talker.code_predictor.device)).to(
+                    self.talker.device, self.talker.dtype
+                ),
+            ],
+            dim=1,
+        )
+        codec_embed = codec_embed.sum(1).unsqueeze(0)
         codec_embed = torch.cat([self.talker.get_input_embeddings()(
                                     torch.tensor(
                                         [[
@@ -2018,6 +2782,264 @@ class Qwen3TTSForConditionalGeneration(Qwen3TTSPreTrainedModel, GenerationMixin)
                 text_embed = torch.cat([text_embed] + [tts_pad_embed] * (codec_lens - text_lens), dim=1)
                 return text_embed + codec_embed, tts_pad_embed
 
+    def get_codec_tag_ids(self, language: str, speaker: Optional[str] = None) -> list[int]:
+        r"""
+        Codec think / language tag ids that open the codec prefill of one sample. Dialect speakers override the
+        language tag when `language` is `"chinese"` or `"auto"`.
+        """
+        assert language is not None
+
+        if language.lower() == "auto":
+            language_id = None
+        else:
+            if language.lower() not in self.config.talker_config.codec_language_id:
+                raise NotImplementedError(f"Language {language} not implemented")
+            else:
+                language_id = self.config.talker_config.codec_language_id[language.lower()]
+
+        if (language.lower() in ["chinese", "auto"] and \
+               speaker != "" and speaker is not None and \
+                 self.config.talker_config.spk_is_dialect[speaker.lower()] != False):
+            dialect = self.config.talker_config.spk_is_dialect[speaker.lower()]
+            language_id = self.config.talker_config.codec_language_id[dialect]
+
+        if language_id is None:
+            return [
+                self.config.talker_config.codec_nothink_id,
+                self.config.talker_config.codec_think_bos_id,
+                self.config.talker_config.codec_think_eos_id,
+            ]
+        return [
+            self.config.talker_config.codec_think_id,
+            self.config.talker_config.codec_think_bos_id,
+            language_id,
+            self.config.talker_config.codec_think_eos_id,
+        ]
+
+    def get_special_text_embeds(self):
+        r"""
+        Projected `tts_bos`, `tts_eos` and `tts_pad` text embeddings, each of shape `(1, 1, hidden_size)`.
+
+        They only depend on the weights, so they are computed once and reused until the text embedding or the text
+        projection parameters are replaced, moved or updated in place.
+        """
+        params = [self.talker.get_text_embeddings().weight, *self.talker.text_projection.parameters()]
+        # inference tensors (weights created under `torch.inference_mode`) carry no version counter
+        key = tuple((p.device, p.dtype, p.data_ptr(), 0 if p.is_inference() else p._version) for p in params)
+        cached = self._special_text_embeds
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with torch.no_grad():
+            special_ids = torch.tensor(
+                [[self.config.tts_bos_token_id, self.config.tts_eos_token_id, self.config.tts_pad_token_id]],
+                device=self.talker.device,
+            )
+            embeds = self.talker.text_projection(self.talker.get_text_embeddings()(special_ids)).chunk(3, dim=1)
+        self._special_text_embeds = (key, embeds)
+        return embeds
+
+    def build_talker_prefill(
+        self,
+        input_ids: list[torch.Tensor],
+        instruct_ids: Optional[list[torch.Tensor]] = None,
+        ref_ids: Optional[list[torch.Tensor]] = None,
+        voice_clone_prompt: Optional[dict] = None,
+        languages: Optional[list[str]] = None,
+        speakers: Optional[list[str]] = None,
+        non_streaming_mode: Union[bool, list[bool]] = False,
+    ):
+        r"""
+        Build the left-padded talker prefill of a batch (instruct, role, codec tags / speaker, and the text or ICL
+        prompt) together with the right-padded text embeddings that are fed step by step during decoding.
+        `non_streaming_mode` may be given per sample.
+
+        Every prefill and trailing position is the sum of a text row and a codec row. The rows of the whole batch are
+        gathered into two tables (all text tokens go through the embedding and `text_projection` in a single call,
+        all codec ids through one embedding lookup) and the left-padded batch is produced by indexing them, instead
+        of building and concatenating many small tensors per sample. ICL voice clone samples still build their
+        reference prompt with [`~Qwen3TTSForConditionalGeneration.generate_icl_prompt`].
+
+        Returns:
+            `tuple`: `(talker_input_embeds, talker_attention_mask, trailing_text_hiddens, tts_pad_embed)`.
+        """
+        talker_config = self.config.talker_config
+        device = self.talker.device
+        batch_size = len(input_ids)
+        tts_bos_embed, tts_eos_embed, tts_pad_embed = self.get_special_text_embeds()
+        if speakers is None:
+            speakers = [None] * batch_size
+        if isinstance(non_streaming_mode, bool):
+            non_streaming_mode = [non_streaming_mode] * batch_size
+
+        voice_clone_spk_embeds = None
+        if voice_clone_prompt is not None:
+            voice_clone_spk_embeds = self.generate_speaker_prompt(voice_clone_prompt)
+
+        # text table: [zero, tts_bos, tts_eos, tts_pad, icl rows..., projected text tokens...]
+        # codec table: [zero, speaker embeddings..., codec embeddings...]
+        TEXT_ZERO, TEXT_BOS, TEXT_EOS, TEXT_PAD = 0, 1, 2, 3
+        icl_rows = []
+        icl_spans = {}
+        num_icl_rows = 0
+        for index in range(batch_size):
+            if voice_clone_prompt is not None and voice_clone_prompt["ref_code"] is not None and voice_clone_prompt["icl_mode"][index]:
+                icl_input_embed, trailing_text_hidden = self.generate_icl_prompt(
+                    text_id=input_ids[index][:, 3:-5],
+                    ref_id=ref_ids[index][:, 3:-2],
+                    ref_code=voice_clone_prompt["ref_code"][index].to(device),
+                    tts_pad_embed=tts_pad_embed,
+                    tts_eos_embed=tts_eos_embed,
+                    non_streaming_mode=non_streaming_mode[index],
+                )
+                start = 4 + num_icl_rows
+                icl_rows += [icl_input_embed, trailing_text_hidden]
+                num_icl_rows += icl_input_embed.shape[1] + trailing_text_hidden.shape[1]
+                icl_spans[index] = (start, icl_input_embed.shape[1], trailing_text_hidden.shape[1])
+        text_base = 4 + num_icl_rows
+        num_spk = batch_size if voice_clone_spk_embeds is not None else 0
+        codec_base = 1 + num_spk
+
+        text_chunks, codec_ids = [], []
+
+        def _add_text(ids):
+            nonlocal text_base
+            text_chunks.append(ids)
+            start = text_base
+            text_base += ids.shape[1]
+            return list(range(start, text_base))
+
+        def _add_codec(ids):
+            start = codec_base + len(codec_ids)
+            codec_ids.extend(ids)
+            return list(range(start, start + len(ids)))
+
+        prefill_text, prefill_codec, trailing_text = [], [], []
+        for index, (input_id, language, speaker) in enumerate(zip(input_ids, languages, speakers)):
+            row_text, row_codec = [], []
+            if instruct_ids is not None and instruct_ids[index] is not None:
+                instruct_rows = _add_text(instruct_ids[index])
+                row_text += instruct_rows
+                row_codec += [0] * len(instruct_rows)
+
+            if voice_clone_spk_embeds is None:
+                if speaker == "" or speaker == None:
+                    speaker_row = None
+                else:
+                    if speaker.lower() not in talker_config.spk_id:
+                        raise NotImplementedError(f"Speaker {speaker} not implemented")
+                    speaker_row = _add_codec([talker_config.spk_id[speaker.lower()]])
+            else:
+                if voice_clone_prompt["x_vector_only_mode"][index] or voice_clone_prompt["icl_mode"][index]:
+                    speaker_row = [1 + index]
+                else:
+                    speaker_row = None
+
+            tag_rows = _add_codec(self.get_codec_tag_ids(language, speaker))
+            pad_bos_rows = _add_codec([talker_config.codec_pad_id, talker_config.codec_bos_id])
+            codec_rows = tag_rows + (speaker_row or []) + pad_bos_rows
+
+            if index in icl_spans:
+                text_rows = _add_text(input_id[:, :3])
+            else:
+                text_rows = _add_text(input_id[:, :-5])
+
+            # <|im_start|>assistant\n, then tts_pad * (n - 2) + tts_bos over the codec tags / speaker / pad
+            row_text += text_rows[:3] + [TEXT_PAD] * (len(codec_rows) - 2) + [TEXT_BOS]
+            row_codec += [0, 0, 0] + codec_rows[:-1]
+
+            if index in icl_spans:
+                start, num_prefill, num_trailing = icl_spans[index]
+                row_text += list(range(start, start + num_prefill))
+                row_codec += [0] * num_prefill
+                row_trailing = list(range(start + num_prefill, start + num_prefill + num_trailing))
+            elif non_streaming_mode[index]:
+                body = text_rows[3:]
+                row_text += body + [TEXT_EOS, TEXT_PAD]
+                row_codec += _add_codec([talker_config.codec_pad_id] * (len(body) + 1)) + [codec_rows[-1]]
+                row_trailing = [TEXT_PAD]
+            else:
+                row_text += text_rows[3:4]
+                row_codec += codec_rows[-1:]
+                row_trailing = text_rows[4:] + [TEXT_EOS]
+            prefill_text.append(row_text)
+            prefill_codec.append(row_codec)
+            trailing_text.append(row_trailing)
+
+        hidden_size = tts_pad_embed.shape[-1]
+        zero = torch.zeros(1, hidden_size, device=device, dtype=tts_pad_embed.dtype)
+        projected_text = self.talker.text_projection(
+            self.talker.get_text_embeddings()(torch.cat(text_chunks, dim=-1))
+        )
+        text_table = torch.cat(
+            [zero.unsqueeze(0), tts_bos_embed, tts_eos_embed, tts_pad_embed, *icl_rows, projected_text], dim=1
+        )[0]
+        codec_table = [zero]
+        if voice_clone_spk_embeds is not None:
+            codec_table += [e.view(1, -1) for e in voice_clone_spk_embeds]
+        codec_table.append(
+            self.talker.get_input_embeddings()(torch.tensor(codec_ids, device=device, dtype=input_ids[0].dtype))
+        )
+        codec_table = torch.cat(codec_table, dim=0)
+
+        # left pad the prefill with zero rows, right pad the trailing text with tts_pad
+        prefill_lengths = [len(row) for row in prefill_text]
+        max_len = max(prefill_lengths)
+        max_trailing = max(len(row) for row in trailing_text)
+        text_index = torch.tensor(
+            [[TEXT_ZERO] * (max_len - len(row)) + row for row in prefill_text], device=device
+        )
+        codec_index = torch.tensor(
+            [[0] * (max_len - len(row)) + row for row in prefill_codec], device=device
+        )
+        trailing_index = torch.tensor(
+            [row + [TEXT_PAD] * (max_trailing - len(row)) for row in trailing_text], device=device
+        )
+        talker_input_embeds = text_table[text_index] + codec_table[codec_index]
+        trailing_text_hiddens = text_table[trailing_index]
+        talker_attention_mask = (
+            torch.arange(max_len).expand(batch_size, -1)
+            >= (max_len - torch.tensor(prefill_lengths)).unsqueeze(1)
+        ).long().to(device)
+
+        return talker_input_embeds, talker_attention_mask, trailing_text_hiddens, tts_pad_embed
+
+    def prepare_static_decode(self, talker_attention_mask, max_new_tokens, subtalker_fused=False):
+        r"""
+        Allocate the fixed-size caches and the rope position table used by `generate(static_decode=True)`.
+
+        Returns:
+            `dict`: talker generate kwargs (`past_key_values`, `rope_position_table` and, when `subtalker_fused`,
+            `subtalker_cache`).
+        """
+        batch_size, seq_len = talker_attention_mask.shape
+        max_cache_len = seq_len + max_new_tokens
+        talker_config = self.config.talker_config
+        predictor_config = talker_config.code_predictor_config
+
+        past_key_values = StaticCache(config=talker_config, max_cache_len=max_cache_len)
+        past_key_values.early_initialization(
+            batch_size,
+            talker_config.num_key_value_heads,
+            talker_config.head_dim,
+            self.talker.dtype,
+            self.talker.device,
+        )
+        static_kwargs = {
+            "past_key_values": past_key_values,
+            "rope_position_table": self.talker.get_rope_position_table(talker_attention_mask, max_cache_len),
+        }
+        if subtalker_fused:
+            subtalker_cache = StaticCache(config=predictor_config, max_cache_len=predictor_config.num_code_groups)
+            subtalker_cache.early_initialization(
+                batch_size,
+                predictor_config.num_key_value_heads,
+                predictor_config.head_dim,
+                self.talker.code_predictor.dtype,
+                self.talker.code_predictor.device,
+            )
+            static_kwargs["subtalker_cache"] = subtalker_cache
+        return static_kwargs
+
     @torch.no_grad()
     def generate(
         self,
@@ -2037,10 +3059,32 @@ class Qwen3TTSForConditionalGeneration(Qwen3TTSPreTrainedModel, GenerationMixin)
         subtalker_top_k: int = 50,
         subtalker_top_p: float = 1.0,
         subtalker_temperature: float = 0.9,
+        subtalker_fused: bool = False,
         eos_token_id: Optional[int] = None,
         repetition_penalty: float = 1.05,
+        static_decode: bool = False,
+        compile_decode: bool = False,
+        prefix_cache: Optional[Qwen3TTSTalkerPrefixCache] = None,
+        shrink_finished: bool = False,
+        codec_streamer=None,
         **kwargs,
     ):
+        r"""
+        static_decode (`bool`, *optional*, defaults to `False`):
+            Decode the talker into preallocated static caches with a precomputed rope position table, so that every
+            decode step has the same shapes and can be captured by `torch.compile` / CUDA graphs.
+        compile_decode (`bool`, *optional*, defaults to `False`):
+            Compile the talker decode step (on any device). Implies `static_decode` and `subtalker_fused`.
+        prefix_cache ([`Qwen3TTSTalkerPrefixCache`], *optional*):
+            Reuse the talker KV state of earlier prompts sharing a prefix with this one (single sample only).
+        shrink_finished (`bool`, *optional*, defaults to `False`):
+            Drop rows from the talker batch as soon as they finish, see
+            [`~Qwen3TTSTalkerForConditionalGeneration.generate_shrinking`]. Only used for batches of more than one
+            sample decoded with a dynamic cache and without `codec_streamer`.
+        """
+        if compile_decode:
+            static_decode = True
+            subtalker_fused = True
         talker_kwargs = {
             "max_new_tokens": max_new_tokens,
             "min_new_tokens": 2,
@@ -2052,239 +3096,78 @@ class Qwen3TTSForConditionalGeneration(Qwen3TTSPreTrainedModel, GenerationMixin)
             "subtalker_top_k": subtalker_top_k,
             "subtalker_top_p": subtalker_top_p,
             "subtalker_temperature": subtalker_temperature,
+            "subtalker_fused": subtalker_fused,
             "eos_token_id": eos_token_id
             if eos_token_id is not None
             else self.config.talker_config.codec_eos_token_id,
             "repetition_penalty": repetition_penalty,
-            "suppress_tokens": [
-                i
-                for i in range(self.config.talker_config.vocab_size - 1024, self.config.talker_config.vocab_size)
-                if i not in (self.config.talker_config.codec_eos_token_id,)
-            ],
-            "output_hidden_states": getattr(kwargs, "output_hidden_states", True),
-            "return_dict_in_generate": getattr(kwargs, "return_dict_in_generate", True)
+            "suppress_tokens": self.talker.get_suppress_tokens(),
+            "return_dict_in_generate": True,
         }
         
-        talker_input_embeds = [[] for _ in range(len(input_ids))]
-
-        voice_clone_spk_embeds = None
-        # voice clone speaker prompt generate
-        if voice_clone_prompt is not None:
-            voice_clone_spk_embeds = self.generate_speaker_prompt(voice_clone_prompt)
-        
-        # instruct text prompt generate
-        if instruct_ids is not None:
-            for index, instruct_id in enumerate(instruct_ids):
-                if instruct_id is not None:
-                    talker_input_embeds[index].append(self.talker.text_projection(
-                                                  self.talker.get_text_embeddings()(instruct_id)))
-
-        # tts text prompt generate
-        trailing_text_hiddens = []
-        if speakers is None:
-            speakers = [None] * len(input_ids)
-        for index, (input_id, language, speaker) in enumerate(zip(input_ids, languages, speakers)):
-            if voice_clone_spk_embeds is None:
-                if speaker == "" or speaker == None: # Instruct create speaker
-                    speaker_embed = None
-                else:
-                    if speaker.lower() not in self.config.talker_config.spk_id:
-                        raise NotImplementedError(f"Speaker {speaker} not implemented")
-                    else:
-                        spk_id = self.config.talker_config.spk_id[speaker.lower()]
-                        speaker_embed = self.talker.get_input_embeddings()(
-                                            torch.tensor(
-                                                spk_id,
-                                                device=self.talker.device,
-                                                dtype=input_id.dtype,
-                                            )
-                                        )
-            else:
-                if voice_clone_prompt["x_vector_only_mode"][index] or voice_clone_prompt["icl_mode"][index]:
-                    speaker_embed = voice_clone_spk_embeds[index]
-                else:
-                    speaker_embed = None
-
-            assert language is not None
-
-            if language.lower() == "auto":
-                language_id = None
-            else:
-                if language.lower() not in self.config.talker_config.codec_language_id:
-                    raise NotImplementedError(f"Language {language} not implemented")
-                else:
-                    language_id = self.config.talker_config.codec_language_id[language.lower()]
-            
-            if (language.lower() in ["chinese", "auto"] and \
-                   speaker != "" and speaker is not None and \
-                     self.config.talker_config.spk_is_dialect[speaker.lower()] != False):
-                dialect = self.config.talker_config.spk_is_dialect[speaker.lower()]
-                language_id = self.config.talker_config.codec_language_id[dialect]
-            
-            tts_bos_embed, tts_eos_embed, tts_pad_embed = self.talker.text_projection(
-                self.talker.get_text_embeddings()(
-                    torch.tensor(
-                        [[self.config.tts_bos_token_id, self.config.tts_eos_token_id, self.config.tts_pad_token_id]],
-                        device=self.talker.device,
-                        dtype=input_id.dtype,
-                    )
-                )
-            ).chunk(3, dim=1)  # 3 * [1 1 d]
-            
-            # codec: tag and speaker
-            if language_id is None:
-                codec_prefill_list = [[
-                                        self.config.talker_config.codec_nothink_id,
-                                        self.config.talker_config.codec_think_bos_id,
-                                        self.config.talker_config.codec_think_eos_id,
-                                    ]]
-            else:
-                codec_prefill_list = [[
-                                        self.config.talker_config.codec_think_id,
-                                        self.config.talker_config.codec_think_bos_id,
-                                        language_id,
-                                        self.config.talker_config.codec_think_eos_id,
-                                    ]]
-
-            codec_input_emebdding_0 = self.talker.get_input_embeddings()(
-                                                    torch.tensor(
-                                                        codec_prefill_list,
-                                                        device=self.talker.device,
-                                                        dtype=input_id.dtype,
-                                                    )
-                                                )
-            codec_input_emebdding_1 = self.talker.get_input_embeddings()(
-                                                    torch.tensor(
-                                                        [[
-                                                            self.config.talker_config.codec_pad_id,
-                                                            self.config.talker_config.codec_bos_id,
-                                                        ]],
-                                                        device=self.talker.device,
-                                                        dtype=input_id.dtype,
-                                                    )
-                                                )
-            if speaker_embed is None:
-                codec_input_emebdding = torch.cat([codec_input_emebdding_0,
-                                                   codec_input_emebdding_1], dim=1)
-            else:
-                codec_input_emebdding = torch.cat([codec_input_emebdding_0,
-                                                   speaker_embed.view(1, 1, -1),
-                                                   codec_input_emebdding_1], dim=1)
-
-            # '<|im_start|>assistant\n我叫通义千问，是阿里云的开源大模型。<|im_end|>\n<|im_start|>assistant\n'
-
-            # <|im_start|>assistant\n
-            _talker_input_embed_role = self.talker.text_projection(
-                                        self.talker.get_text_embeddings()(input_id[:, :3])
-                                        )
-
-            # tts_pad * 4 + tts_bos
-            _talker_input_embed = torch.cat((tts_pad_embed.expand(-1, codec_input_emebdding.shape[1] - 2, -1),
-                                            tts_bos_embed,
-                                            ), dim=1) + codec_input_emebdding[:, :-1]
-
-            talker_input_embed = torch.cat((_talker_input_embed_role, _talker_input_embed), dim=1)
+        talker_input_embeds, talker_attention_mask, trailing_text_hiddens, tts_pad_embed = self.build_talker_prefill(
+            input_ids=input_ids,
+            instruct_ids=instruct_ids,
+            ref_ids=ref_ids,
+            voice_clone_prompt=voice_clone_prompt,
+            languages=languages,
+            speakers=speakers,
+            non_streaming_mode=non_streaming_mode,
+        )
+        codec_recorder = Qwen3TTSTalkerOutputRecorder(max_new_tokens, batch_size=talker_input_embeds.shape[0])
+        talker_kwargs["codec_recorder"] = codec_recorder
 
-            if voice_clone_prompt is not None and voice_clone_prompt["ref_code"] is not None and voice_clone_prompt["icl_mode"][index]:
-                icl_input_embed, trailing_text_hidden = self.generate_icl_prompt(
-                    text_id=input_id[:, 3:-5],
-                    ref_id=ref_ids[index][:, 3:-2],
-                    ref_code=voice_clone_prompt["ref_code"][index].to(self.talker.device),
-                    tts_pad_embed=tts_pad_embed,
-                    tts_eos_embed=tts_eos_embed,
-                    non_streaming_mode=non_streaming_mode,
-                )
-                talker_input_embed = torch.cat([talker_input_embed, icl_input_embed], dim=1)
+        if static_decode:
+            talker_kwargs.update(
+                self.prepare_static_decode(talker_attention_mask, max_new_tokens, subtalker_fused=subtalker_fused)
+            )
+            if compile_decode and self.talker.device.type == "cuda":
+                talker_kwargs["compile_config"] = CompileConfig(fullgraph=False, mode="reduce-overhead")
             else:
-                #  tts_text_first_token
-                talker_input_embed = torch.cat([talker_input_embed, 
-                                                self.talker.text_projection(self.talker.get_text_embeddings()(input_id[:, 3:4])) + codec_input_emebdding[:, -1:]], 
-                                                dim=1)
-                if non_streaming_mode:
-                    talker_input_embed = talker_input_embed[:, :-1] # 去掉原本放进去的text
-                    talker_input_embed = torch.cat([talker_input_embed,
-                                                    torch.cat((self.talker.text_projection(
-                                                        self.talker.get_text_embeddings()(input_id[:, 3:-5])
-                                                    ), tts_eos_embed), dim=1) + self.talker.get_input_embeddings()(
-                                                        torch.tensor(
-                                                            [[
-                                                                self.config.talker_config.codec_pad_id,
-                                                            ] * (input_id[:, 3:-5].shape[1] + 1)],
-                                                            device=self.talker.device,
-                                                            dtype=input_id.dtype,
-                                                        )
-                                                    ), 
-                                                    tts_pad_embed + self.talker.get_input_embeddings()(
-                                                        torch.tensor(
-                                                            [[
-                                                                self.config.talker_config.codec_bos_id,
-                                                            ]],
-                                                            device=self.talker.device,
-                                                            dtype=input_id.dtype,
-                                                        )
-                                                    ) 
-                                                    ], dim=1)
-                    trailing_text_hidden = tts_pad_embed
-                else:
-                    # 叫通义千问，是阿里云的开源大模型。
-                    trailing_text_hidden = torch.cat((self.talker.text_projection(
-                                                        self.talker.get_text_embeddings()(input_id[:, 4:-5])
-                                                    ), tts_eos_embed), dim=1)
-            talker_input_embeds[index].append(talker_input_embed)
-            trailing_text_hiddens.append(trailing_text_hidden)
-        
-        for index, talker_input_embed in enumerate(talker_input_embeds):
-            talker_input_embeds[index] = torch.cat([item for item in talker_input_embed if item is not None], dim=1)
-
-        # for batch inferquence
-        original_lengths = torch.tensor([t.shape[1] for t in talker_input_embeds])
-        # left padding for talker input embeds
-        sequences = [t.squeeze(0) for t in talker_input_embeds]
-        sequences_reversed = [t.flip(dims=[0]) for t in sequences]
-        padded_reversed = torch.nn.utils.rnn.pad_sequence(
-            sequences_reversed,
-            batch_first=True,
-            padding_value=0.0
-        )
-        talker_input_embeds = padded_reversed.flip(dims=[1])
-        # generate mask
-        batch_size, max_len = talker_input_embeds.shape[0], talker_input_embeds.shape[1]
-        indices = torch.arange(max_len).expand(batch_size, -1)
-        num_pads = max_len - original_lengths
-        talker_attention_mask = (indices >= num_pads.unsqueeze(1)).long().to(talker_input_embeds.device)
-        # padding trailing text hiddens
-        pad_embedding_vector = tts_pad_embed.squeeze()
-        sequences_to_pad = [t.squeeze(0) for t in trailing_text_hiddens]
-        trailing_text_original_lengths = [s.shape[0] for s in sequences_to_pad]
-        padded_hiddens = torch.nn.utils.rnn.pad_sequence(
-            sequences_to_pad,
-            batch_first=True,
-            padding_value=0.0
-        )
-        arange_tensor = torch.arange(max(trailing_text_original_lengths), 
-                                     device=padded_hiddens.device).expand(len(trailing_text_original_lengths), -1)
-        lengths_tensor = torch.tensor(trailing_text_original_lengths, device=padded_hiddens.device).unsqueeze(1)
-        padding_mask = arange_tensor >= lengths_tensor
-        padded_hiddens[padding_mask] = pad_embedding_vector
-        trailing_text_hiddens = padded_hiddens
+                # `generate` only compiles the decode step on CUDA; elsewhere the talker forward hands its decode
+                # steps to a compiled copy of itself
+                talker_kwargs["disable_compile"] = True
+                if compile_decode:
+                    talker_kwargs["compiled_forward"] = self.talker.get_compiled_call(CompileConfig(fullgraph=False))
+
+        use_prefix_cache = prefix_cache is not None and talker_input_embeds.shape[0] == 1
+        if use_prefix_cache:
+            if "past_key_values" not in talker_kwargs:
+                talker_kwargs["past_key_values"] = DynamicCache(config=self.config.talker_config)
+            prefix_cache.fork(talker_input_embeds[0], talker_kwargs["past_key_values"])
 
         # forward
-        talker_result = self.talker.generate(
-            inputs_embeds=talker_input_embeds,
-            attention_mask=talker_attention_mask,
-            trailing_text_hidden=trailing_text_hiddens,
-            tts_pad_embed=tts_pad_embed,
-            **talker_kwargs,
-        )
+        if shrink_finished and not static_decode and codec_streamer is None and talker_input_embeds.shape[0] > 1:
+            talker_kwargs.pop("return_dict_in_generate")
+            self.talker.generate_shrinking(
+                inputs_embeds=talker_input_embeds,
+                attention_mask=talker_attention_mask,
+                trailing_text_hidden=trailing_text_hiddens,
+                tts_pad_embed=tts_pad_embed,
+                **talker_kwargs,
+            )
+        else:
+            talker_result = self.talker.generate(
+                inputs_embeds=talker_input_embeds,
+                attention_mask=talker_attention_mask,
+                trailing_text_hidden=trailing_text_hiddens,
+                tts_pad_embed=tts_pad_embed,
+                codec_streamer=codec_streamer,
+                **talker_kwargs,
+            )
+            if use_prefix_cache:
+                prefix_cache.put(talker_input_embeds[0], talker_result.past_key_values)
 
-        talker_codes = torch.stack([hid[-1] for hid in talker_result.hidden_states if hid[-1] is not None], dim=1)
-        talker_hidden_states = torch.cat([hid[0][-1][:, -1:] for hid in talker_result.hidden_states], dim=1)[:, :-1]
+        talker_codes, talker_hidden_states = codec_recorder.get()
         
         first_codebook = talker_codes[:, :, 0]
         is_stop_token = (first_codebook ==  self.config.talker_config.codec_eos_token_id)
         stop_indices = torch.argmax(is_stop_token.int(), dim=1)
         has_stop_token = is_stop_token.any(dim=1)
-        effective_lengths = torch.where(has_stop_token, stop_indices, talker_codes.shape[1])
+        # rows dropped early by `shrink_finished` have fewer recorded frames than the buffer holds
+        effective_lengths = torch.minimum(
+            torch.where(has_stop_token, stop_indices, talker_codes.shape[1]), codec_recorder.lengths
+        )
         
         talker_codes_list = [talker_codes[i, :length, ] for i, length in enumerate(effective_lengths)]
         talker_hidden_states_list = [talker_hidden_states[i, :length, :] for i, length in enumerate(effective_lengths)]
@@ -2293,6 +3176,7 @@ class Qwen3TTSForConditionalGeneration(Qwen3TTSPreTrainedModel, GenerationMixin)
 
 __all__ = [
     "Qwen3TTSForConditionalGeneration",
+    "Qwen3TTSTalkerPrefixCache",
     "Qwen3TTSTalkerForConditionalGeneration",
     "Qwen3TTSPreTrainedModel",
     "Qwen3TTSTalkerModel",
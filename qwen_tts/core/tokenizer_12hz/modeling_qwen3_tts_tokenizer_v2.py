@@ -14,8 +14,7 @@
 # limitations under the License.
 """PyTorch Qwen3TTSTokenizerV2 model."""
 
-import math
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Callable, Optional, Union, List
 
 import numpy as np
@@ -41,6 +40,13 @@ from transformers.utils import ModelOutput, auto_docstring, logging
 from transformers.utils.deprecation import deprecate_kwarg
 from transformers.utils.generic import check_model_inputs
 
+from ..modeling_utils import (
+    GroupedQueryAttentionMixin,
+    reserve_rope_positions,
+    rope_cos_sin_table,
+    select_attention_interface,
+    use_rope_cos_sin_table,
+)
 from .configuration_qwen3_tts_tokenizer_v2 import (
     Qwen3TTSTokenizerV2Config,
     Qwen3TTSTokenizerV2DecoderConfig,
@@ -48,7 +54,6 @@ from .configuration_qwen3_tts_tokenizer_v2 import (
 
 logger = logging.get_logger(__name__)
 
-
 @dataclass
 @auto_docstring
 class Qwen3TTSTokenizerV2EncoderOutput(ModelOutput):
@@ -72,6 +77,22 @@ class Qwen3TTSTokenizerV2DecoderOutput(ModelOutput):
     audio_values: List[torch.FloatTensor] = None
 
 
+@dataclass
+class Qwen3TTSTokenizerV2DecoderState:
+    r"""
+    Streaming state carried between calls of [`Qwen3TTSTokenizerV2Decoder.decode_step`].
+
+    conv_buffers (`dict`):
+        Per causal (transposed) convolution: the trailing input frames needed as left padding of the next call, or
+        the not yet completed overlap of the transposed convolution output.
+    past_key_values (`Cache`, *optional*):
+        KV cache of the sliding-window `pre_transformer`.
+    """
+
+    conv_buffers: dict = field(default_factory=dict)
+    past_key_values: Optional[Cache] = None
+
+
 def rotate_half(x):
     """Rotates half the hidden dims of the input."""
     x1 = x[..., : x.shape[-1] // 2]
@@ -145,7 +166,7 @@ def eager_attention_forward(
 
 
 @auto_docstring
-class Qwen3TTSTokenizerV2DecoderPreTrainedModel(PreTrainedModel):
+class Qwen3TTSTokenizerV2DecoderPreTrainedModel(PreTrainedModel, GroupedQueryAttentionMixin):
     config: Qwen3TTSTokenizerV2DecoderConfig
     base_model_prefix = "model"
     supports_gradient_checkpointing = True
@@ -182,15 +203,30 @@ class Qwen3TTSTokenizerV2CausalConvNet(nn.Module):
 
     def _get_extra_padding_for_conv1d(self, hidden_state: torch.Tensor) -> int:
         length = hidden_state.shape[-1]
-        n_frames = (length - self.kernel_size + self.padding) / self.stride + 1
-        ideal_length = (math.ceil(n_frames) - 1) * self.stride + (self.kernel_size - self.padding)
+        # ceil((length - kernel_size + padding) / stride) in integer arithmetic, which stays symbolic under tracing
+        n_frames = -((self.kernel_size - self.padding - length) // self.stride)
+        ideal_length = n_frames * self.stride + (self.kernel_size - self.padding)
         return ideal_length - length
 
-    def forward(self, hidden_state):
+    def forward(self, hidden_state, state: Optional[Qwen3TTSTokenizerV2DecoderState] = None):
+        if state is not None:
+            return self._forward_streaming(hidden_state, state)
         extra_padding = self._get_extra_padding_for_conv1d(hidden_state)
         hidden_state = F.pad(hidden_state, (self.padding, extra_padding), mode="constant", value=0)
         return self.conv(hidden_state).contiguous()
 
+    def _forward_streaming(self, hidden_state, state: Qwen3TTSTokenizerV2DecoderState):
+        if self.stride != 1:
+            raise NotImplementedError("Streaming is only implemented for stride 1 causal convolutions")
+        if self.padding == 0:
+            return self.conv(hidden_state).contiguous()
+        buffer = state.conv_buffers.get(self)
+        if buffer is None:
+            buffer = hidden_state.new_zeros(hidden_state.shape[0], hidden_state.shape[1], self.padding)
+        hidden_state = torch.cat([buffer, hidden_state], dim=-1)
+        state.conv_buffers[self] = hidden_state[..., -self.padding :]
+        return self.conv(hidden_state).contiguous()
+
 
 class Qwen3TTSTokenizerV2CausalTransConvNet(nn.Module):
     def __init__(self, in_channels, out_channels, kernel_size, stride=1):
@@ -201,9 +237,21 @@ class Qwen3TTSTokenizerV2CausalTransConvNet(nn.Module):
         self.left_pad = 0
         self.right_pad = int(pad)
 
-    def forward(self, hidden_state):
+    def forward(self, hidden_state, state: Optional[Qwen3TTSTokenizerV2DecoderState] = None):
         hidden_state = self.conv(hidden_state)
         if self.right_pad > 0:
+            if state is not None:
+                # The last `right_pad` outputs still miss the contribution of the next frames: keep them (without
+                # the bias, which is added again by the next call) and add them to the head of the next output.
+                overlap = state.conv_buffers.get(self)
+                if overlap is not None:
+                    hidden_state = torch.cat(
+                        [hidden_state[..., : self.right_pad] + overlap, hidden_state[..., self.right_pad :]], dim=-1
+                    )
+                tail = hidden_state[..., hidden_state.shape[-1] - self.right_pad :]
+                if self.conv.bias is not None:
+                    tail = tail - self.conv.bias[None, :, None]
+                state.conv_buffers[self] = tail
             hidden_state = hidden_state[..., : hidden_state.shape[-1] - self.right_pad]
         return hidden_state.contiguous()
 
@@ -224,10 +272,10 @@ class Qwen3TTSTokenizerV2ConvNeXtBlock(nn.Module):
         self.pwconv2 = nn.Linear(4 * dim, dim)
         self.gamma = nn.Parameter(1e-6 * torch.ones(dim))
 
-    def forward(self, hidden_states):
+    def forward(self, hidden_states, state: Optional[Qwen3TTSTokenizerV2DecoderState] = None):
         input = hidden_states
 
-        hidden_states = self.dwconv(hidden_states)
+        hidden_states = self.dwconv(hidden_states, state)
         hidden_states = hidden_states.permute(0, 2, 1)
         hidden_states = self.norm(hidden_states)
         hidden_states = self.pwconv1(hidden_states)
@@ -262,10 +310,18 @@ class Qwen3TTSTokenizerV2DecoderRotatoryEmbedding(nn.Module):
         inv_freq, self.attention_scaling = self.rope_init_fn(self.config, device)
         self.register_buffer("inv_freq", inv_freq, persistent=False)
         self.original_inv_freq = self.inv_freq
+        # (key, cos, sin), see `rope_cos_sin_table`
+        self._cos_sin_table = None
+        self.rope_table_size = config.max_position_embeddings
 
     @torch.no_grad()
     @dynamic_rope_update  # power user: used with advanced RoPE types (e.g. dynamic rope)
     def forward(self, x, position_ids):
+        if use_rope_cos_sin_table(self):
+            cos, sin = rope_cos_sin_table(self, x.device, x.dtype)
+            position_ids = position_ids.to(x.device, torch.long)
+            return F.embedding(position_ids, cos), F.embedding(position_ids, sin)
+
         inv_freq_expanded = self.inv_freq[None, :, None].float().expand(position_ids.shape[0], -1, 1).to(x.device)
         position_ids_expanded = position_ids[:, None, :].float()
 
@@ -288,6 +344,7 @@ class Qwen3TTSTokenizerV2DecoderAttention(nn.Module):
         self.layer_idx = layer_idx
         self.head_dim = getattr(config, "head_dim", config.hidden_size // config.num_attention_heads)
         self.num_key_value_groups = config.num_attention_heads // config.num_key_value_heads
+        self.gqa_attention = False
         self.scaling = self.head_dim**-0.5
         self.attention_dropout = config.attention_dropout
         self.is_causal = True
@@ -333,9 +390,7 @@ class Qwen3TTSTokenizerV2DecoderAttention(nn.Module):
             cache_kwargs = {"sin": sin, "cos": cos, "cache_position": cache_position}
             key_states, value_states = past_key_values.update(key_states, value_states, self.layer_idx, cache_kwargs)
 
-        attention_interface: Callable = eager_attention_forward
-        if self.config._attn_implementation != "eager":
-            attention_interface = ALL_ATTENTION_FUNCTIONS[self.config._attn_implementation]
+        attention_interface: Callable = select_attention_interface(self, eager_attention_forward)
 
         attn_output, attn_weights = attention_interface(
             self,
@@ -527,6 +582,7 @@ class Qwen3TTSTokenizerV2DecoderTransformerModel(Qwen3TTSTokenizerV2DecoderPreTr
             cache_position = torch.arange(
                 past_seen_tokens, past_seen_tokens + inputs_embeds.shape[1], device=inputs_embeds.device
             )
+            reserve_rope_positions(self.rotary_emb, past_seen_tokens + inputs_embeds.shape[1])
 
         if position_ids is None:
             position_ids = cache_position.unsqueeze(0)
@@ -625,13 +681,13 @@ class Qwen3TTSTokenizerV2DecoderDecoderResidualUnit(nn.Module):
         self.act2 = SnakeBeta(dim)
         self.conv2 = Qwen3TTSTokenizerV2CausalConvNet(dim, dim, kernel_size=1)
 
-    def forward(self, hidden_state):
+    def forward(self, hidden_state, state: Optional[Qwen3TTSTokenizerV2DecoderState] = None):
         residual = hidden_state
 
         hidden_state = self.act1(hidden_state)
-        hidden_state = self.conv1(hidden_state)
+        hidden_state = self.conv1(hidden_state, state)
         hidden_state = self.act2(hidden_state)
-        hidden_state = self.conv2(hidden_state)
+        hidden_state = self.conv2(hidden_state, state)
         return hidden_state + residual
 
 
@@ -652,9 +708,9 @@ class Qwen3TTSTokenizerV2DecoderDecoderBlock(Qwen3TTSTokenizerV2DecoderPreTraine
 
         self.block = nn.ModuleList(block)
 
-    def forward(self, hidden):
+    def forward(self, hidden, state: Optional[Qwen3TTSTokenizerV2DecoderState] = None):
         for block in self.block:
-            hidden = block(hidden)
+            hidden = block(hidden) if isinstance(block, SnakeBeta) else block(hidden, state)
         return hidden
 
 
@@ -811,10 +867,41 @@ class SplitResidualVectorQuantizer(nn.Module):
             q_dropout=q_dropout,
             **kwargs,
         )
+        # filled by `fold()`; not persistent, checkpoints keep the original codebooks
+        self.register_buffer("folded_codebook", None, persistent=False)
+        self.register_buffer("folded_offsets", None, persistent=False)
+
+    @torch.no_grad()
+    def fold(self) -> None:
+        """Precompute the projected codebook of every quantizer into one table for inference.
+
+        The projections after the codebook lookup are linear, so each quantizer's contribution to the output is a
+        row of `output_proj(project_out(codebook))`. Those rows are concatenated over all quantizers, and `decode`
+        turns into a single gather with per-quantizer offsets and a sum. Call it again after changing the weights,
+        or `unfold()` to go back to the per-quantizer path.
+        """
+        tables = []
+        for rvq in (self.rvq_first, self.rvq_rest):
+            for layer in rvq.vq.layers:
+                codebook = layer._codebook
+                embedding = codebook.embedding_sum / codebook.cluster_usage.clamp(min=codebook.epsilon)[:, None]
+                embedding = layer.project_out(embedding)
+                # output_proj is a 1x1 convolution over (batch, dim, frames)
+                tables.append(rvq.output_proj(embedding.t().unsqueeze(0))[0].t())
+        sizes = torch.tensor([0] + [t.shape[0] for t in tables[:-1]], device=tables[0].device)
+        self.folded_codebook = torch.cat(tables, dim=0).contiguous()
+        self.folded_offsets = torch.cumsum(sizes, dim=0)
+
+    def unfold(self) -> None:
+        self.folded_codebook = None
+        self.folded_offsets = None
 
     def decode(self, codes: torch.Tensor) -> torch.Tensor:
         """Decode the given codes to the quantized representation."""
         # codes is [B, K, T], with T frames, K nb of codebooks.
+        if self.folded_codebook is not None and not self.training:
+            indices = codes + self.folded_offsets[: codes.shape[1], None]
+            return F.embedding(indices, self.folded_codebook).sum(dim=1).transpose(1, 2)
         quantized = self.rvq_first.decode(codes[:, : self.n_q_semantic])
         if codes.shape[1] > self.n_q_semantic:
             quantized += self.rvq_rest.decode(codes[:, self.n_q_semantic :])
@@ -873,7 +960,9 @@ class Qwen3TTSTokenizerV2Decoder(Qwen3TTSTokenizerV2DecoderPreTrainedModel):
         hidden = self.quantizer.decode(codes)
         hidden = self.pre_conv(hidden).transpose(1, 2)
 
-        hidden = self.pre_transformer(inputs_embeds=hidden).last_hidden_state
+        # the mask builders of `transformers` do not trace, so the exported graph gets its masks spelled out
+        attention_mask = self._export_attention_masks(hidden) if torch.onnx.is_in_onnx_export() else None
+        hidden = self.pre_transformer(inputs_embeds=hidden, attention_mask=attention_mask).last_hidden_state
         hidden = hidden.permute(0, 2, 1)
         for blocks in self.upsample:
             for block in blocks:
@@ -883,17 +972,140 @@ class Qwen3TTSTokenizerV2Decoder(Qwen3TTSTokenizerV2DecoderPreTrainedModel):
             wav = block(wav)
         return wav.clamp(min=-1, max=1)
 
+    def decode_step(
+        self, codes: torch.Tensor, state: Optional[Qwen3TTSTokenizerV2DecoderState] = None
+    ) -> tuple[torch.Tensor, Qwen3TTSTokenizerV2DecoderState]:
+        r"""
+        Decode only the new frames `codes` of a stream, continuing from `state`.
+
+        Every causal convolution keeps the input frames it needs as left padding, the transposed convolutions keep
+        their pending output overlap and the `pre_transformer` keeps its sliding-window KV cache, so each call costs
+        the same no matter how long the stream already is. Concatenating the outputs of consecutive calls gives the
+        same waveform as a single `forward` over all frames.
+
+        Args:
+            codes (`torch.LongTensor` of shape `(batch_size, num_quantizers, num_new_frames)`):
+                New codes of the stream.
+            state ([`Qwen3TTSTokenizerV2DecoderState`], *optional*):
+                State returned by the previous call. `None` starts a new stream.
+
+        Returns:
+            `tuple(torch.FloatTensor, Qwen3TTSTokenizerV2DecoderState)`: the waveform of the new frames with shape
+            `(batch_size, 1, num_new_frames * total_upsample)` and the updated state.
+        """
+        if codes.shape[1] != self.config.num_quantizers:
+            raise ValueError(f"Expected {self.config.num_quantizers} layer of codes, got {codes.shape[1]}")
+        if state is None:
+            state = Qwen3TTSTokenizerV2DecoderState()
+        if state.past_key_values is None:
+            state.past_key_values = DynamicCache(config=self.config)
+
+        hidden = self.quantizer.decode(codes)
+        hidden = self.pre_conv(hidden, state).transpose(1, 2)
+
+        hidden = self.pre_transformer(
+            inputs_embeds=hidden, past_key_values=state.past_key_values, use_cache=True
+        ).last_hidden_state
+        hidden = hidden.permute(0, 2, 1)
+        for blocks in self.upsample:
+            for block in blocks:
+                hidden = block(hidden, state)
+        wav = hidden
+        for block in self.decoder:
+            wav = block(wav) if isinstance(block, SnakeBeta) else block(wav, state)
+        return wav.clamp(min=-1, max=1), state
+
+    def chunked_decode(self, codes, chunk_size=300, left_context_size=25):
+        return _chunked_decode(self, codes, self.total_upsample, chunk_size, left_context_size)
+
+    def _export_attention_masks(self, hidden: torch.Tensor) -> dict:
+        # additive masks of a pre_transformer call without cache or padding, shape (1, 1, T, T)
+        positions = torch.arange(hidden.shape[1], device=hidden.device)
+        distance = positions[:, None] - positions[None, :]
+        min_value = torch.finfo(hidden.dtype).min
+        causal = distance >= 0
+        sliding = causal & (distance < self.config.sliding_window)
+        zeros = torch.zeros(distance.shape, dtype=hidden.dtype, device=hidden.device)
+        return {
+            "full_attention": zeros.masked_fill(~causal, min_value)[None, None],
+            "sliding_attention": zeros.masked_fill(~sliding, min_value)[None, None],
+        }
+
+    def export_onnx(self, path: str, opset_version: int = 17) -> str:
+        r"""
+        Export `forward` to an ONNX graph with dynamic batch and frame axes, to be run by
+        [`Qwen3TTSTokenizerV2OnnxDecoder`].
+
+        The pre-transformer is traced with eager attention and explicit sliding-window masks, the result matches
+        `forward` for any number of frames. `decode_step` (streaming) is not part of the graph.
+
+        Args:
+            path (`str`):
+                Output `.onnx` file.
+            opset_version (`int`, *optional*, defaults to 17):
+                ONNX opset of the exported graph.
+
+        Returns:
+            `str`: `path`.
+        """
+        codes = torch.zeros(
+            (1, self.config.num_quantizers, 2 * self.config.sliding_window), dtype=torch.long, device=self.device
+        )
+        attn_implementation = self.pre_transformer.config._attn_implementation
+        self.pre_transformer.config._attn_implementation = "eager"
+        try:
+            with torch.no_grad():
+                torch.onnx.export(
+                    self,
+                    (codes,),
+                    path,
+                    input_names=["codes"],
+                    output_names=["wav"],
+                    dynamic_axes={"codes": {0: "batch", 2: "frames"}, "wav": {0: "batch", 2: "samples"}},
+                    opset_version=opset_version,
+                    dynamo=False,
+                )
+        finally:
+            self.pre_transformer.config._attn_implementation = attn_implementation
+        return path
+
+
+class Qwen3TTSTokenizerV2OnnxDecoder:
+    """
+    Drop-in replacement of [`Qwen3TTSTokenizerV2Decoder`] for `forward` / `chunked_decode` that runs the graph
+    written by `Qwen3TTSTokenizerV2Decoder.export_onnx` with ONNX Runtime on the CPU.
+    """
+
+    def __init__(self, path: str, total_upsample: int, num_threads: Optional[int] = None, providers=None):
+        import onnxruntime
+
+        option = onnxruntime.SessionOptions()
+        option.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            option.intra_op_num_threads = num_threads
+        providers = providers or ["CPUExecutionProvider"]
+        self.ort_session = onnxruntime.InferenceSession(path, sess_options=option, providers=providers)
+        self.total_upsample = total_upsample
+
+    def __call__(self, codes: torch.Tensor) -> torch.Tensor:
+        wav = self.ort_session.run(None, {"codes": codes.detach().cpu().numpy()})[0]
+        return torch.from_numpy(wav)
+
     def chunked_decode(self, codes, chunk_size=300, left_context_size=25):
-        wavs = []
-        start_index = 0
-        while start_index < codes.shape[-1]:
-            end_index = min(start_index + chunk_size, codes.shape[-1])
-            context_size = left_context_size if start_index - left_context_size > 0 else start_index
-            codes_chunk = codes[..., start_index - context_size : end_index]
-            wav_chunk = self(codes_chunk)
-            wavs.append(wav_chunk[..., context_size * self.total_upsample :])
-            start_index = end_index
-        return torch.cat(wavs, dim=-1)
+        return _chunked_decode(self, codes, self.total_upsample, chunk_size, left_context_size)
+
+
+def _chunked_decode(decode_fn, codes, total_upsample, chunk_size, left_context_size):
+    wavs = []
+    start_index = 0
+    while start_index < codes.shape[-1]:
+        end_index = min(start_index + chunk_size, codes.shape[-1])
+        context_size = left_context_size if start_index - left_context_size > 0 else start_index
+        codes_chunk = codes[..., start_index - context_size : end_index]
+        wav_chunk = decode_fn(codes_chunk)
+        wavs.append(wav_chunk[..., context_size * total_upsample :])
+        start_index = end_index
+    return torch.cat(wavs, dim=-1)
 
 
 class Qwen3TTSTokenizerV2Encoder(MimiModel):
@@ -940,6 +1152,8 @@ class Qwen3TTSTokenizerV2Model(Qwen3TTSTokenizerV2PreTrainedModel):
 
         self.encoder = Qwen3TTSTokenizerV2Encoder._from_config(self.config.encoder_config)
         self.decoder = Qwen3TTSTokenizerV2Decoder._from_config(self.config.decoder_config)
+        # set by `load_onnx_decoder`, `decode` then runs through ONNX Runtime instead of `self.decoder`
+        self.onnx_decoder: Optional[Qwen3TTSTokenizerV2OnnxDecoder] = None
 
         self.post_init()
     
@@ -957,6 +1171,18 @@ class Qwen3TTSTokenizerV2Model(Qwen3TTSTokenizerV2PreTrainedModel):
     
     def get_decode_upsample_rate(self):
         return self.decode_upsample_rate
+
+    def export_onnx_decoder(self, path: str, opset_version: int = 17) -> str:
+        return self.decoder.export_onnx(path, opset_version=opset_version)
+
+    def load_onnx_decoder(self, path: Optional[str], num_threads: Optional[int] = None, providers=None):
+        """Decode through the ONNX graph at `path` from now on, or through `self.decoder` again with `path=None`."""
+        if path is None:
+            self.onnx_decoder = None
+        else:
+            self.onnx_decoder = Qwen3TTSTokenizerV2OnnxDecoder(
+                path, self.decoder.total_upsample, num_threads=num_threads, providers=providers
+            )
     
     def encode(
         self,
@@ -1012,7 +1238,8 @@ class Qwen3TTSTokenizerV2Model(Qwen3TTSTokenizerV2PreTrainedModel):
         audio_lengths = (audio_codes[..., 0] > -1).sum(1) * self.decode_upsample_rate
 
         audio_codes = torch.clamp(audio_codes, min=0)
-        audio_values = self.decoder.chunked_decode(audio_codes.transpose(1, 2)).squeeze(1)
+        decoder = self.onnx_decoder if self.onnx_decoder is not None else self.decoder
+        audio_values = decoder.chunked_decode(audio_codes.transpose(1, 2)).squeeze(1)
 
         audio_values = [a[:l] for a, l in zip(audio_values, audio_lengths)]
 
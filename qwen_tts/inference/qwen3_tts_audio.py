@@ -0,0 +1,283 @@
+# coding=utf-8
+# Copyright 2026 The Alibaba Qwen team.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Audio front end shared by `Qwen3TTSModel`, `Qwen3TTSTokenizer` and the finetuning dataset: decoding of paths, URLs
+and base64 strings to mono float32 waveforms, and resampling.
+"""
+import base64
+import functools
+import io
+import os
+import struct
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import librosa
+import numpy as np
+import soundfile as sf
+import torch
+import torchaudio
+
+AudioLike = Union[
+    str,                     # wav path, URL, base64
+    np.ndarray,              # waveform (requires sr)
+    Tuple[np.ndarray, int],  # (waveform, sr)
+]
+
+# WAV sample formats read through a memory map: (format tag, bits per sample) -> little-endian dtype
+_WAV_MEMMAP_DTYPES = {
+    (1, 16): np.dtype("<i2"),   # PCM 16-bit
+    (3, 32): np.dtype("<f4"),   # IEEE float 32-bit
+}
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def is_probably_base64(s: str) -> bool:
+    if s.startswith("data:audio"):
+        return True
+    # Heuristic: no filesystem path separators and long enough.
+    if ("/" not in s and "\\" not in s) and len(s) > 256:
+        return True
+    return False
+
+
+def is_url(s: str) -> bool:
+    try:
+        u = urlparse(s)
+        return u.scheme in ("http", "https") and bool(u.netloc)
+    except Exception:
+        return False
+
+
+def decode_base64_audio(b64: str) -> bytes:
+    # Accept both "data:audio/wav;base64,...." and raw base64
+    if "," in b64 and b64.strip().startswith("data:"):
+        b64 = b64.split(",", 1)[1]
+    return base64.b64decode(b64)
+
+
+def to_mono_float32(audio: np.ndarray) -> np.ndarray:
+    """Average the channels of a `(frames, channels)` waveform and cast to float32, without copying a float32 mono one."""
+    if audio.ndim > 1:
+        audio = np.mean(audio, axis=-1)
+    return np.asarray(audio, dtype=np.float32)
+
+
+def _memmap_wav(path: str) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    Map the samples of a 16-bit PCM or 32-bit float WAV file instead of reading them.
+
+    Returns None for anything else (other sample formats, RF64, malformed headers), which is then left to soundfile.
+    A float32 mono file comes back as a copy-on-write view of the file.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if chunk_id == b"fmt ":
+                body = f.read(chunk_size)
+                if len(body) < 16:
+                    return None
+                tag, channels, sr, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack("<H", body[24:26])[0]
+                fmt = (tag, channels, sr, bits)
+                f.seek(chunk_size & 1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    if fmt is None:
+        return None
+    tag, channels, sr, bits = fmt
+    dtype = _WAV_MEMMAP_DTYPES.get((tag, bits))
+    if dtype is None or channels < 1:
+        return None
+    # streamed writers leave the data size unset, so never trust it past the end of the file
+    data_size = min(chunk_size, file_size - offset)
+    frames = data_size // (dtype.itemsize * channels)
+    if frames == 0:
+        return None
+
+    samples = np.memmap(path, dtype=dtype, mode="c", offset=offset, shape=(frames, channels))
+    if dtype.kind == "i":
+        # same normalization as libsndfile's float reads
+        audio = samples.astype(np.float32) * np.float32(1.0 / 0x8000)
+    else:
+        audio = samples
+    if channels == 1:
+        return audio.reshape(frames), int(sr)
+    return to_mono_float32(audio), int(sr)
+
+
+def read_audio(x: str) -> Tuple[np.ndarray, int]:
+    """
+    Decode a wav path, URL or base64 audio string (raw or data URL).
+
+    Local 16-bit PCM / 32-bit float WAV files are memory mapped; other files go through soundfile, and through
+    librosa for containers libsndfile cannot read.
+
+    Returns:
+        Tuple[np.ndarray, int]:
+            1-D float32 waveform and its sampling rate.
+    """
+    if is_url(x):
+        with urllib.request.urlopen(x) as resp:
+            audio_bytes = resp.read()
+        with io.BytesIO(audio_bytes) as f:
+            audio, sr = sf.read(f, dtype="float32", always_2d=False)
+    elif is_probably_base64(x):
+        with io.BytesIO(decode_base64_audio(x)) as f:
+            audio, sr = sf.read(f, dtype="float32", always_2d=False)
+    else:
+        mapped = _memmap_wav(x)
+        if mapped is not None:
+            return mapped
+        try:
+            audio, sr = sf.read(x, dtype="float32", always_2d=False)
+        except RuntimeError:
+            audio, sr = librosa.load(x, sr=None, mono=True)
+    return to_mono_float32(audio), int(sr)
+
+
+def normalize_audio_inputs(
+    audios: Union[AudioLike, List[AudioLike]],
+    sr: Optional[int] = None,
+) -> List[Tuple[np.ndarray, int]]:
+    """
+    Normalize audio inputs into a list of (waveform, sr).
+
+    Supported forms:
+      - str: wav path / URL / base64 audio string
+      - (np.ndarray, sr): waveform + sampling rate
+      - np.ndarray: waveform, only together with `sr`
+      - list of the above
+
+    Args:
+        audios:
+            Audio input(s).
+        sr (Optional[int]):
+            Sampling rate of bare numpy waveforms.
+
+    Returns:
+        List[Tuple[np.ndarray, int]]:
+            List of (mono float32 waveform, original sr). Float32 mono waveforms are passed through without a copy.
+
+    Raises:
+        ValueError: If a numpy waveform is provided without sr.
+        TypeError: If the input type is not supported.
+    """
+    items = audios if isinstance(audios, list) else [audios]
+
+    out: List[Tuple[np.ndarray, int]] = []
+    for a in items:
+        if isinstance(a, str):
+            out.append(read_audio(a))
+        elif isinstance(a, tuple) and len(a) == 2 and isinstance(a[0], np.ndarray):
+            out.append((to_mono_float32(a[0]), int(a[1])))
+        elif isinstance(a, np.ndarray):
+            if sr is None:
+                raise ValueError("For numpy waveform input, pass a tuple (audio, sr).")
+            out.append((to_mono_float32(a), int(sr)))
+        else:
+            raise TypeError(f"Unsupported audio input type: {type(a)}")
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def get_resampler(orig_sr: int, target_sr: int) -> torchaudio.transforms.Resample:
+    """
+    Polyphase windowed-sinc resampler from `orig_sr` to `target_sr`, with its filter bank built once per rate pair.
+
+    Uses the Kaiser window settings that match librosa's "kaiser_best".
+    """
+    return torchaudio.transforms.Resample(
+        orig_freq=orig_sr,
+        new_freq=target_sr,
+        resampling_method="sinc_interp_kaiser",
+        lowpass_filter_width=64,
+        rolloff=0.9475937167399596,
+        beta=14.769656459379492,
+    )
+
+
+def resample_audio_batch(audios: List[np.ndarray], orig_sr: int, target_sr: int) -> List[np.ndarray]:
+    """
+    Resample 1-D waveforms sharing one sampling rate with a single call of the cached resampler.
+
+    Shorter waveforms are zero padded to the longest one, which is what the resampler pads every edge with, so each
+    result matches resampling that waveform alone.
+
+    Returns:
+        List[np.ndarray]:
+            float32 waveforms at `target_sr`, `ceil(len * target_sr / orig_sr)` samples each.
+    """
+    audios = [to_mono_float32(a) for a in audios]
+    if int(orig_sr) == int(target_sr):
+        return audios
+    # the resampler cannot take zero-length inputs; they stay empty
+    out = [np.zeros(0, dtype=np.float32) for _ in audios]
+    nonempty = [i for i, a in enumerate(audios) if a.shape[0]]
+    if not nonempty:
+        return out
+    lengths = [audios[i].shape[0] for i in nonempty]
+    batch = np.zeros((len(nonempty), max(lengths)), dtype=np.float32)
+    for row, i in enumerate(nonempty):
+        batch[row, : audios[i].shape[0]] = audios[i]
+    with torch.inference_mode():
+        resampled = get_resampler(int(orig_sr), int(target_sr))(torch.from_numpy(batch)).numpy()
+    for row, (i, n) in enumerate(zip(nonempty, lengths)):
+        out[i] = resampled[row, : -(-n * int(target_sr) // int(orig_sr))]
+    return out
+
+
+def resample_audio(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Resample one 1-D waveform, see `resample_audio_batch`."""
+    return resample_audio_batch([audio], orig_sr, target_sr)[0]
+
+
+def load_audios(
+    audios: Union[AudioLike, List[AudioLike]],
+    target_sr: int,
+    sr: Optional[int] = None,
+) -> List[np.ndarray]:
+    """
+    `normalize_audio_inputs`, then resample every waveform to `target_sr`, one batched call per source rate.
+
+    Returns:
+        List[np.ndarray]:
+            float32 waveforms at `target_sr`, in input order.
+    """
+    normalized = normalize_audio_inputs(audios, sr=sr)
+    by_rate: Dict[int, List[int]] = defaultdict(list)
+    for i, (_, rate) in enumerate(normalized):
+        by_rate[rate].append(i)
+    out: List[Optional[np.ndarray]] = [None] * len(normalized)
+    for rate, index in by_rate.items():
+        for i, wav in zip(index, resample_audio_batch([normalized[i][0] for i in index], rate, target_sr)):
+            out[i] = wav
+    return out
@@ -0,0 +1,511 @@
+# coding=utf-8
+# Copyright 2026 The Alibaba Qwen team.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Union
+
+import torch
+from transformers.cache_utils import DynamicCache
+
+from ..core.models.modeling_qwen3_tts import Qwen3TTSTalkerForConditionalGeneration, sample_codec_tokens
+from .qwen3_tts_model import AudioLike, Qwen3TTSModel, VoiceClonePromptItem
+from .qwen3_tts_pipeline import Qwen3TTSDecodeWorker
+
+
+@dataclass
+class _EngineRequest:
+    generate_inputs: Dict[str, Any]
+    non_streaming_mode: bool
+    max_new_tokens: int
+    future: Future
+    ref_code: Optional[torch.Tensor] = None
+    codes: List[torch.Tensor] = field(default_factory=list)
+    num_generated: int = 0
+
+
+def _merge_generate_inputs(requests: List[_EngineRequest]) -> Dict[str, Any]:
+    """Batch the single-sample `generate_inputs` of `requests` into the inputs of one `build_talker_prefill` call."""
+    merged: Dict[str, Any] = {}
+    for key in ("input_ids", "instruct_ids", "ref_ids", "languages", "speakers"):
+        values = [request.generate_inputs.get(key) for request in requests]
+        if any(v is not None for v in values):
+            merged[key] = [v[0] if v is not None else None for v in values]
+    prompts = [request.generate_inputs.get("voice_clone_prompt") for request in requests]
+    if any(p is not None for p in prompts):
+        merged["voice_clone_prompt"] = {
+            key: [p[key][0] if p[key] is not None else None for p in prompts]
+            for key in ("ref_code", "ref_spk_embedding", "x_vector_only_mode", "icl_mode")
+        }
+    return merged
+
+
+class _SlotBatch:
+    """
+    Decoding state of the requests that currently occupy engine slots.
+
+    All per-slot tensors share the batch dimension. Prompts are left padded to a common cache length, so merging two
+    batches only pads the shorter cache on the left and shifts its `rope_deltas` by the number of added pads.
+    """
+
+    def __init__(
+        self,
+        requests: List[_EngineRequest],
+        past_key_values: DynamicCache,
+        attention_mask: torch.Tensor,
+        rope_deltas: torch.Tensor,
+        past_hidden: torch.Tensor,
+        input_ids: torch.Tensor,
+        generation_step: torch.Tensor,
+        trailing_text_hidden: torch.Tensor,
+        seen_tokens: torch.Tensor,
+    ):
+        self.requests = requests
+        self.past_key_values = past_key_values
+        self.attention_mask = attention_mask
+        self.rope_deltas = rope_deltas
+        self.past_hidden = past_hidden
+        self.input_ids = input_ids
+        self.generation_step = generation_step
+        self.trailing_text_hidden = trailing_text_hidden
+        self.seen_tokens = seen_tokens
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    @staticmethod
+    def _left_pad(x: torch.Tensor, num_pads: int, dim: int) -> torch.Tensor:
+        if num_pads == 0:
+            return x
+        shape = list(x.shape)
+        shape[dim] = num_pads
+        return torch.cat([x.new_zeros(shape), x], dim=dim)
+
+    def _pad_to(self, seq_len: int, text_len: int, tts_pad_embed: torch.Tensor) -> None:
+        num_pads = seq_len - self.attention_mask.shape[1]
+        if num_pads > 0:
+            for layer in self.past_key_values.layers:
+                layer.keys = self._left_pad(layer.keys, num_pads, dim=2)
+                layer.values = self._left_pad(layer.values, num_pads, dim=2)
+            self.attention_mask = self._left_pad(self.attention_mask, num_pads, dim=1)
+            self.rope_deltas = self.rope_deltas - num_pads
+        num_text_pads = text_len - self.trailing_text_hidden.shape[1]
+        if num_text_pads > 0:
+            self.trailing_text_hidden = torch.cat(
+                [
+                    self.trailing_text_hidden,
+                    tts_pad_embed.expand(len(self), num_text_pads, -1).to(self.trailing_text_hidden.dtype),
+                ],
+                dim=1,
+            )
+
+    def merge(self, other: "_SlotBatch", tts_pad_embed: torch.Tensor) -> None:
+        seq_len = max(self.attention_mask.shape[1], other.attention_mask.shape[1])
+        text_len = max(self.trailing_text_hidden.shape[1], other.trailing_text_hidden.shape[1])
+        self._pad_to(seq_len, text_len, tts_pad_embed)
+        other._pad_to(seq_len, text_len, tts_pad_embed)
+        for layer, other_layer in zip(self.past_key_values.layers, other.past_key_values.layers):
+            layer.keys = torch.cat([layer.keys, other_layer.keys], dim=0)
+            layer.values = torch.cat([layer.values, other_layer.values], dim=0)
+        self.requests = self.requests + other.requests
+        for name in (
+            "attention_mask",
+            "rope_deltas",
+            "past_hidden",
+            "input_ids",
+            "generation_step",
+            "trailing_text_hidden",
+            "seen_tokens",
+        ):
+            setattr(self, name, torch.cat([getattr(self, name), getattr(other, name)], dim=0))
+
+    def select(self, indices: List[int]) -> None:
+        index = torch.tensor(indices, device=self.attention_mask.device)
+        self.attention_mask, self.rope_deltas = Qwen3TTSTalkerForConditionalGeneration.select_rows(
+            index, self.past_key_values, self.attention_mask, self.rope_deltas
+        )
+        self.requests = [self.requests[i] for i in indices]
+        for name in ("past_hidden", "input_ids", "generation_step", "trailing_text_hidden", "seen_tokens"):
+            setattr(self, name, getattr(self, name)[index])
+
+
+class Qwen3TTSEngine:
+    """
+    Continuous-batching scheduler on top of a loaded `Qwen3TTSModel`.
+
+    Requests are submitted from any thread and get a `concurrent.futures.Future` resolving to `(wav, sample_rate)`.
+    A background loop (see `start()`) or explicit `step()` calls drive the talker one frame at a time over a dynamic
+    batch: at every step waiting requests are prefilled and admitted into free slots, and slots whose request sampled
+    EOS (or reached its token budget) are retired and handed to a `Qwen3TTSDecodeWorker`, which decodes them and
+    resolves their futures while the talker keeps stepping the other slots. Every slot keeps its own KV cache rows,
+    `rope_deltas`, `generation_step` and trailing text, so requests of very different lengths share the GPU without
+    waiting for the longest one.
+
+    Sampling arguments are fixed per engine (same meaning as in `Qwen3TTSModel.generate_*`); only `max_new_tokens`
+    can be overridden per request.
+
+    Example:
+        engine = Qwen3TTSEngine(tts, max_batch_size=16).start()
+        future = engine.submit_voice_design("Hello!", instruct="A calm male voice.", language="English")
+        wav, sr = future.result()
+    """
+
+    def __init__(self, tts: Qwen3TTSModel, max_batch_size: int = 8, **kwargs):
+        """
+        Args:
+            tts (Qwen3TTSModel):
+                Loaded wrapper; its underlying model is shared, not copied.
+            max_batch_size (int):
+                Maximum number of requests decoded together.
+            **kwargs:
+                Generation arguments (do_sample, top_k, top_p, temperature, repetition_penalty, subtalker_*,
+                max_new_tokens, eos_token_id), merged with the model defaults like `Qwen3TTSModel.generate_*` does.
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be >= 1, got {max_batch_size}")
+        self.tts = tts
+        self.model = tts.model
+        self.talker = tts.model.talker
+        self.max_batch_size = max_batch_size
+
+        gen_kwargs = tts._merge_generate_kwargs(**kwargs)
+        talker_config = self.model.config.talker_config
+        self.max_new_tokens = int(gen_kwargs["max_new_tokens"])
+        self.do_sample = bool(gen_kwargs["do_sample"])
+        self.top_k = gen_kwargs["top_k"]
+        self.top_p = gen_kwargs["top_p"]
+        self.temperature = gen_kwargs["temperature"]
+        self.repetition_penalty = float(gen_kwargs["repetition_penalty"])
+        self.eos_token_id = gen_kwargs.get("eos_token_id") or talker_config.codec_eos_token_id
+        self.min_new_tokens = 2
+        self.subtalker_kwargs = dict(
+            subtalker_dosample=gen_kwargs["subtalker_dosample"],
+            subtalker_top_k=gen_kwargs["subtalker_top_k"],
+            subtalker_top_p=gen_kwargs["subtalker_top_p"],
+            subtalker_temperature=gen_kwargs["subtalker_temperature"],
+            subtalker_fused=gen_kwargs["subtalker_fused"],
+        )
+        self._subtalker_cache = None
+
+        self.suppress_mask = torch.zeros(talker_config.vocab_size, dtype=torch.bool, device=self.talker.device)
+        self.suppress_mask[self.talker.get_suppress_tokens()] = True
+
+        self._pending: Deque[_EngineRequest] = deque()
+        self._cond = threading.Condition()
+        self._batch: Optional[_SlotBatch] = None
+        self._tts_pad_embed: Optional[torch.Tensor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._decode_worker: Optional[Qwen3TTSDecodeWorker] = None
+
+    # ------------------------------------------------------------------ submission
+
+    def _submit(self, generate_inputs: Dict[str, Any], non_streaming_mode: bool, max_new_tokens: Optional[int]) -> Future:
+        if len(generate_inputs["input_ids"]) != 1:
+            raise ValueError("Engine requests take a single text; submit one request per text.")
+        ref_code = None
+        if generate_inputs.get("voice_clone_prompt") is not None:
+            ref_code = generate_inputs["voice_clone_prompt"]["ref_code"][0]
+        request = _EngineRequest(
+            generate_inputs=generate_inputs,
+            non_streaming_mode=non_streaming_mode,
+            max_new_tokens=int(max_new_tokens) if max_new_tokens is not None else self.max_new_tokens,
+            future=Future(),
+            ref_code=ref_code,
+        )
+        request.future.set_running_or_notify_cancel()
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def submit_voice_clone(
+        self,
+        text: str,
+        language: str = None,
+        ref_audio: Optional[AudioLike] = None,
+        ref_text: Optional[str] = None,
+        x_vector_only_mode: bool = False,
+        voice_clone_prompt: Optional[Union[Dict[str, Any], List[VoiceClonePromptItem]]] = None,
+        non_streaming_mode: bool = False,
+        max_new_tokens: Optional[int] = None,
+    ) -> Future:
+        """
+        Queue one voice-clone request. Arguments are the same as `Qwen3TTSModel.generate_voice_clone` for one text.
+
+        Returns:
+            Future:
+                Resolves to `(wav, sample_rate)`.
+        """
+        self.tts._check_model_type("base", "submit_voice_clone")
+        generate_inputs = self.tts._prepare_voice_clone_inputs(
+            text=text,
+            language=language,
+            ref_audio=ref_audio,
+            ref_text=ref_text,
+            x_vector_only_mode=x_vector_only_mode,
+            voice_clone_prompt=voice_clone_prompt,
+        )
+        return self._submit(generate_inputs, non_streaming_mode, max_new_tokens)
+
+    def submit_voice_design(
+        self,
+        text: str,
+        instruct: str,
+        language: str = None,
+        non_streaming_mode: bool = True,
+        max_new_tokens: Optional[int] = None,
+    ) -> Future:
+        """
+        Queue one voice-design request. Arguments are the same as `Qwen3TTSModel.generate_voice_design` for one text.
+
+        Returns:
+            Future:
+                Resolves to `(wav, sample_rate)`.
+        """
+        self.tts._check_model_type("voice_design", "submit_voice_design")
+        generate_inputs = self.tts._prepare_voice_design_inputs(text=text, instruct=instruct, language=language)
+        return self._submit(generate_inputs, non_streaming_mode, max_new_tokens)
+
+    def submit_custom_voice(
+        self,
+        text: str,
+        speaker: str,
+        language: str = None,
+        instruct: Optional[str] = None,
+        non_streaming_mode: bool = True,
+        max_new_tokens: Optional[int] = None,
+    ) -> Future:
+        """
+        Queue one custom-voice request. Arguments are the same as `Qwen3TTSModel.generate_custom_voice` for one text.
+
+        Returns:
+            Future:
+                Resolves to `(wav, sample_rate)`.
+        """
+        self.tts._check_model_type("custom_voice", "submit_custom_voice")
+        generate_inputs = self.tts._prepare_custom_voice_inputs(
+            text=text, speaker=speaker, language=language, instruct=instruct
+        )
+        return self._submit(generate_inputs, non_streaming_mode, max_new_tokens)
+
+    # ------------------------------------------------------------------ scheduling
+
+    def has_work(self) -> bool:
+        with self._cond:
+            return bool(self._pending) or self._batch is not None
+
+    @torch.no_grad()
+    def step(self) -> bool:
+        """
+        Admit waiting requests into free slots, run one talker step over all slots and retire finished requests.
+
+        Returns:
+            bool:
+                Whether requests are still pending or running.
+        """
+        try:
+            self._admit()
+            if self._batch is not None:
+                self._decode_step()
+        except BaseException as e:
+            self._fail_all(e)
+            raise
+        return self.has_work()
+
+    def run_until_complete(self) -> None:
+        """Drive `step()` on the calling thread until every submitted request is resolved."""
+        while self.step():
+            pass
+
+    def start(self) -> "Qwen3TTSEngine":
+        """Start the background scheduling loop. Returns `self`."""
+        if self._thread is not None:
+            return self
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="Qwen3TTSEngine", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the background loop after the requests already submitted have been served."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait and self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and self._batch is None and not self._stopping:
+                    self._cond.wait()
+                if self._stopping and not self._pending and self._batch is None:
+                    break
+            try:
+                self.step()
+            except BaseException:
+                # The failing requests have been resolved with the exception; keep serving new ones.
+                continue
+        # let `shutdown(wait=True)` return only once the retired requests are decoded
+        worker, self._decode_worker = self._decode_worker, None
+        if worker is not None:
+            worker.close()
+
+    def _fail_all(self, error: BaseException) -> None:
+        with self._cond:
+            requests = list(self._pending)
+            self._pending.clear()
+        if self._batch is not None:
+            requests += self._batch.requests
+            self._batch = None
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    # ------------------------------------------------------------------ decoding
+
+    def _sample(self, logits: torch.Tensor, seen_tokens: torch.Tensor, num_generated: torch.Tensor) -> torch.Tensor:
+        return sample_codec_tokens(
+            logits,
+            seen_tokens,
+            num_generated,
+            self.eos_token_id,
+            suppress_mask=self.suppress_mask,
+            min_new_tokens=self.min_new_tokens,
+            repetition_penalty=self.repetition_penalty,
+            do_sample=self.do_sample,
+            top_k=self.top_k,
+            top_p=self.top_p,
+            temperature=self.temperature,
+        )
+
+    def _admit(self) -> None:
+        with self._cond:
+            num_free = self.max_batch_size - (len(self._batch) if self._batch is not None else 0)
+            requests = [self._pending.popleft() for _ in range(min(num_free, len(self._pending)))]
+        if not requests:
+            return
+
+        inputs_embeds, attention_mask, trailing_text_hidden, self._tts_pad_embed = self.model.build_talker_prefill(
+            non_streaming_mode=[request.non_streaming_mode for request in requests],
+            **_merge_generate_inputs(requests),
+        )
+
+        past_hidden, past_key_values, rope_deltas = self.talker.prefill_rows(inputs_embeds, attention_mask)
+        logits = self.talker.codec_head(past_hidden[:, -1, :])
+
+        batch_size = len(requests)
+        seen_tokens = torch.zeros(batch_size, logits.shape[-1], dtype=torch.bool, device=logits.device)
+        num_generated = torch.zeros(batch_size, dtype=torch.long, device=logits.device)
+        next_tokens = self._sample(logits, seen_tokens, num_generated)
+
+        batch = _SlotBatch(
+            requests=requests,
+            past_key_values=past_key_values,
+            attention_mask=attention_mask,
+            rope_deltas=rope_deltas,
+            past_hidden=past_hidden,
+            input_ids=next_tokens.unsqueeze(1),
+            generation_step=torch.zeros(batch_size, dtype=torch.long, device=logits.device),
+            trailing_text_hidden=trailing_text_hidden,
+            seen_tokens=seen_tokens,
+        )
+        self._count_tokens(batch)
+        if self._batch is None:
+            self._batch = batch
+        else:
+            self._batch.merge(batch, self._tts_pad_embed)
+        self._retire()
+
+    def _count_tokens(self, batch: _SlotBatch) -> None:
+        # `seen_tokens` is updated by `sample_codec_tokens`
+        for request in batch.requests:
+            request.num_generated += 1
+
+    def _decode_step(self) -> None:
+        batch = self._batch
+        codec_ids, inputs_embeds, self._subtalker_cache = self.talker.predict_codec_frame(
+            batch.input_ids, batch.past_hidden, subtalker_cache=self._subtalker_cache, **self.subtalker_kwargs
+        )
+
+        text_len = batch.trailing_text_hidden.shape[1]
+        text_hidden = batch.trailing_text_hidden[
+            torch.arange(len(batch), device=inputs_embeds.device), batch.generation_step.clamp(max=text_len - 1)
+        ]
+        text_hidden = torch.where(
+            (batch.generation_step < text_len).unsqueeze(-1), text_hidden, self._tts_pad_embed.view(1, -1)
+        )
+        inputs_embeds = inputs_embeds + text_hidden.unsqueeze(1)
+
+        past_hidden, batch.attention_mask = self.talker.decode_rows(
+            inputs_embeds, batch.attention_mask, batch.rope_deltas, batch.past_key_values
+        )
+        logits = self.talker.codec_head(past_hidden[:, -1, :])
+
+        num_generated = torch.tensor([r.num_generated for r in batch.requests], device=logits.device)
+        next_tokens = self._sample(logits, batch.seen_tokens, num_generated)
+
+        for request, frame in zip(batch.requests, codec_ids):
+            request.codes.append(frame)
+        batch.past_hidden = past_hidden
+        batch.input_ids = next_tokens.unsqueeze(1)
+        batch.generation_step = batch.generation_step + 1
+        self._count_tokens(batch)
+        self._retire()
+
+    def _retire(self) -> None:
+        batch = self._batch
+        last_tokens = batch.input_ids[:, 0].tolist()
+        keep, done = [], []
+        for i, (request, token) in enumerate(zip(batch.requests, last_tokens)):
+            if token == self.eos_token_id or request.num_generated >= request.max_new_tokens:
+                done.append(request)
+            else:
+                keep.append(i)
+        if not done:
+            return
+        if keep:
+            batch.select(keep)
+        else:
+            self._batch = None
+
+        if self._decode_worker is None:
+            # a full batch retiring at once never waits for the decoder
+            self._decode_worker = Qwen3TTSDecodeWorker(self.tts, max_pending=self.max_batch_size)
+        for request in done:
+            try:
+                if request.codes:
+                    codes = torch.stack(request.codes, dim=0)
+                else:
+                    codes = batch.input_ids.new_zeros(0, self.talker.config.num_code_groups)
+                decoded = self._decode_worker.submit([codes], [request.ref_code])
+            except BaseException as e:
+                request.future.set_exception(e)
+                continue
+            decoded.add_done_callback(functools.partial(_resolve_decoded, request.future))
+
+
+def _resolve_decoded(future: Future, decoded: Future) -> None:
+    error = decoded.exception()
+    if error is not None:
+        future.set_exception(error)
+        return
+    wavs, fs = decoded.result()
+    future.set_result((wavs[0], fs))
@@ -13,26 +13,29 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import base64
-import io
-import urllib.request
+import hashlib
+import os
+import queue
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple, Union
-from urllib.parse import urlparse
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
-import librosa
 import numpy as np
-import soundfile as sf
 import torch
 from transformers import AutoConfig, AutoModel, AutoProcessor
 
 from ..core.models import Qwen3TTSConfig, Qwen3TTSForConditionalGeneration, Qwen3TTSProcessor
-
-AudioLike = Union[
-    str,                     # wav path, URL, base64
-    np.ndarray,              # waveform (requires sr)
-    Tuple[np.ndarray, int],  # (waveform, sr)
-]
+from .qwen3_tts_audio import (
+    AudioLike,
+    decode_base64_audio,
+    is_probably_base64,
+    is_url,
+    load_audios,
+    normalize_audio_inputs,
+)
+from .qwen3_tts_pipeline import Qwen3TTSDecodeWorker
+from .qwen3_tts_placement import Qwen3TTSPlacement
 
 MaybeList = Union[Any, List[Any]]
 
@@ -51,6 +54,134 @@ class VoiceClonePromptItem:
     ref_text: Optional[str] = None
 
 
+class VoiceClonePromptCache:
+    """
+    Content-addressed cache of `VoiceClonePromptItem`s, so repeated reference voices skip audio loading, the speech
+    tokenizer and the speaker encoder.
+
+    Two tiers are consulted in order:
+      - an in-memory LRU holding up to `max_items` prompts;
+      - an optional directory (`cache_dir`) with one `<key>.pt` file per prompt, shared across processes/restarts.
+
+    Keys are built by `Qwen3TTSModel` from a hash of the reference audio content, the reference text, the
+    x-vector-only flag and the model identity. Attach an instance with `tts.prompt_cache = VoiceClonePromptCache(...)`.
+    """
+
+    def __init__(self, max_items: int = 128, cache_dir: Optional[str] = None):
+        """
+        Args:
+            max_items (int):
+                Capacity of the in-memory tier; 0 disables it.
+            cache_dir (Optional[str]):
+                Directory of the on-disk tier; created if missing. None disables it.
+        """
+        self.max_items = max_items
+        self.cache_dir = cache_dir
+        self._items: "OrderedDict[str, VoiceClonePromptItem]" = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(audio_digest: str, ref_text: Optional[str], x_vector_only_mode: bool, namespace: str = "") -> str:
+        h = hashlib.sha256()
+        for part in (namespace, audio_digest, "" if ref_text is None else ref_text, str(bool(x_vector_only_mode))):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    def _remember(self, key: str, item: VoiceClonePromptItem) -> None:
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get(self, key: str) -> Optional[VoiceClonePromptItem]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                return item
+        if self.cache_dir is None or not os.path.exists(self._path(key)):
+            return None
+        try:
+            payload = torch.load(self._path(key), map_location="cpu", weights_only=True)
+        except Exception:
+            return None
+        item = VoiceClonePromptItem(**payload)
+        self._remember(key, item)
+        return item
+
+    def put(self, key: str, item: VoiceClonePromptItem) -> None:
+        self._remember(key, item)
+        if self.cache_dir is None:
+            return
+        payload = dict(
+            ref_code=None if item.ref_code is None else item.ref_code.detach().cpu(),
+            ref_spk_embedding=item.ref_spk_embedding.detach().cpu(),
+            x_vector_only_mode=item.x_vector_only_mode,
+            icl_mode=item.icl_mode,
+            ref_text=item.ref_text,
+        )
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        torch.save(payload, tmp_path)
+        os.replace(tmp_path, self._path(key))
+
+    def clear(self) -> None:
+        """Drop the in-memory tier (files in `cache_dir` are kept)."""
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class _StreamCancelled(Exception):
+    """Raised inside the generation thread once the consumer of a stream has gone away."""
+
+
+class _CodecFrameStreamer:
+    """
+    Receives talker codec frames from `Qwen3TTSForConditionalGeneration.generate(..., codec_streamer=...)`
+    and hands them to a consumer running in another thread.
+
+    `put()` is called by the talker with the `(batch, num_code_groups)` frame of every decoding step.
+    Iterating the streamer yields those frames until `end()` is called; an exception raised by the
+    producer is re-raised on the consumer side.
+    """
+
+    def __init__(self):
+        self.queue: "queue.Queue[Optional[torch.Tensor]]" = queue.Queue()
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+
+    def put(self, codec_ids: torch.Tensor, talker_hidden: Optional[torch.Tensor] = None) -> None:
+        if self.cancelled:
+            raise _StreamCancelled()
+        self.queue.put(codec_ids)
+
+    def end(self) -> None:
+        self.queue.put(None)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def __iter__(self) -> Iterator[torch.Tensor]:
+        while True:
+            codec_ids = self.queue.get()
+            if codec_ids is None:
+                break
+            yield codec_ids
+        if self.error is not None:
+            raise self.error
+
+
 class Qwen3TTSModel:
     """
     A HuggingFace-style wrapper for Qwen3 TTS models (CustomVoice/VoiceDesign/Base) that provides:
@@ -71,8 +202,12 @@ class Qwen3TTSModel:
         self.model = model
         self.processor = processor
         self.generate_defaults = generate_defaults or {}
+        self.prompt_cache: Optional[VoiceClonePromptCache] = None
+        # reference clips per speaker encoder call in `create_voice_clone_prompt`
+        self.speaker_batch_size = 16
 
-        self.device = getattr(model, "device", None)
+        # inputs go to the talker, which may sit on another device than the speech tokenizer / speaker encoder
+        self.device = getattr(model.talker, "device", None) if getattr(model, "talker", None) is not None else None
         if self.device is None:
             try:
                 self.device = next(model.parameters()).device
@@ -83,6 +218,7 @@ class Qwen3TTSModel:
     def from_pretrained(
         cls,
         pretrained_model_name_or_path: str,
+        placement: Optional[Qwen3TTSPlacement] = None,
         **kwargs,
     ) -> "Qwen3TTSModel":
         """
@@ -93,10 +229,14 @@ class Qwen3TTSModel:
           2) Loads the model via AutoModel.from_pretrained(...), forwarding `kwargs` unchanged.
           3) Loads the processor via AutoProcessor.from_pretrained(model_path).
           4) Loads optional `generate_config.json` from the model directory/repo snapshot if present.
+          5) Moves each stage to its device / dtype when a `placement` is given.
 
         Args:
             pretrained_model_name_or_path (str):
                 HuggingFace repo id or local directory of the model.
+            placement (Optional[Qwen3TTSPlacement]):
+                Per-stage device, dtype and thread count (talker, code predictor, speaker encoder, speech tokenizer
+                encoder / decoder), applied on top of the placement given by `kwargs`.
             **kwargs:
                 Forwarded as-is into `AutoModel.from_pretrained(...)`.
                 Typical examples: device_map="cuda:0", dtype=torch.bfloat16, attn_implementation="flash_attention_2".
@@ -114,6 +254,8 @@ class Qwen3TTSModel:
             raise TypeError(
                 f"AutoModel returned {type(model)}, expected Qwen3TTSForConditionalGeneration. "
             )
+        if placement is not None:
+            placement.apply(model)
 
         processor = AutoProcessor.from_pretrained(pretrained_model_name_or_path, fix_mistral_regex=True,)
 
@@ -185,83 +327,52 @@ class Qwen3TTSModel:
         if bad:
             raise ValueError(f"Unsupported speakers: {bad}. Supported: {sorted(supported)}")
 
-    def _is_probably_base64(self, s: str) -> bool:
-        if s.startswith("data:audio"):
-            return True
-        if ("/" not in s and "\\" not in s) and len(s) > 256:
-            return True
-        return False
-
-    def _is_url(self, s: str) -> bool:
-        try:
-            u = urlparse(s)
-            return u.scheme in ("http", "https") and bool(u.netloc)
-        except Exception:
-            return False
-
-    def _decode_base64_to_wav_bytes(self, b64: str) -> bytes:
-        if "," in b64 and b64.strip().startswith("data:"):
-            b64 = b64.split(",", 1)[1]
-        return base64.b64decode(b64)
-
-    def _load_audio_to_np(self, x: str) -> Tuple[np.ndarray, int]:
-        if self._is_url(x):
-            with urllib.request.urlopen(x) as resp:
-                audio_bytes = resp.read()
-            with io.BytesIO(audio_bytes) as f:
-                audio, sr = sf.read(f, dtype="float32", always_2d=False)
-        elif self._is_probably_base64(x):
-            wav_bytes = self._decode_base64_to_wav_bytes(x)
-            with io.BytesIO(wav_bytes) as f:
-                audio, sr = sf.read(f, dtype="float32", always_2d=False)
-        else:
-            audio, sr = librosa.load(x, sr=None, mono=True)
-
-        if audio.ndim > 1:
-            audio = np.mean(audio, axis=-1)
-
-        return audio.astype(np.float32), int(sr)
-
     def _normalize_audio_inputs(self, audios: Union[AudioLike, List[AudioLike]]) -> List[Tuple[np.ndarray, int]]:
         """
-        Normalize audio inputs into a list of (waveform, sr).
-
-        Supported forms:
-          - str: wav path / URL / base64 audio string
-          - (np.ndarray, sr): waveform + sampling rate
-          - list of the above
+        Normalize audio inputs into a list of (mono float32 waveform, original sr), see
+        `qwen3_tts_audio.normalize_audio_inputs`.
+        """
+        return normalize_audio_inputs(audios)
 
-        Args:
-            audios:
-                Audio input(s).
+    def _audio_digest(self, audio: AudioLike) -> str:
+        """
+        Hash the content of one audio input without decoding it.
 
-        Returns:
-            List[Tuple[np.ndarray, int]]:
-                List of (float32 waveform, original sr).
+        Local files are hashed by their bytes, base64 strings by their decoded bytes, waveforms by their samples and
+        sampling rate. URLs are hashed by the URL itself (the remote content is assumed immutable).
 
         Raises:
             ValueError: If a numpy waveform is provided without sr.
+            TypeError: If the input type is not supported.
         """
-        if isinstance(audios, list):
-            items = audios
-        else:
-            items = [audios]
-
-        out: List[Tuple[np.ndarray, int]] = []
-        for a in items:
-            if isinstance(a, str):
-                out.append(self._load_audio_to_np(a))
-            elif isinstance(a, tuple) and len(a) == 2 and isinstance(a[0], np.ndarray):
-                out.append((a[0].astype(np.float32), int(a[1])))
-            elif isinstance(a, np.ndarray):
-                raise ValueError("For numpy waveform input, pass a tuple (audio, sr).")
+        h = hashlib.sha256()
+        if isinstance(audio, str):
+            if is_url(audio):
+                h.update(b"url:" + audio.encode("utf-8"))
+            elif is_probably_base64(audio):
+                h.update(decode_base64_audio(audio))
             else:
-                raise TypeError(f"Unsupported audio input type: {type(a)}")
-        for i, a in enumerate(out):
-            if a[0].ndim > 1:
-                a[0] = np.mean(a[0], axis=-1).astype(np.float32)
-                out[i] = (a[0], a[1])
-        return out
+                with open(audio, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        h.update(block)
+        elif isinstance(audio, tuple) and len(audio) == 2 and isinstance(audio[0], np.ndarray):
+            h.update(f"sr:{int(audio[1])}:".encode("utf-8"))
+            h.update(np.ascontiguousarray(audio[0], dtype=np.float32).tobytes())
+        elif isinstance(audio, np.ndarray):
+            raise ValueError("For numpy waveform input, pass a tuple (audio, sr).")
+        else:
+            raise TypeError(f"Unsupported audio input type: {type(audio)}")
+        return h.hexdigest()
+
+    def _prompt_cache_namespace(self) -> str:
+        return "|".join(
+            str(x)
+            for x in (
+                getattr(self.model.config, "_name_or_path", ""),
+                self.model.tokenizer_type,
+                self.model.tts_model_size,
+            )
+        )
 
     def _ensure_list(self, x: MaybeList) -> List[Any]:
         return x if isinstance(x, list) else [x]
@@ -295,7 +406,13 @@ class Qwen3TTSModel:
         subtalker_top_k: Optional[int] = None,
         subtalker_top_p: Optional[float] = None,
         subtalker_temperature: Optional[float] = None,
+        subtalker_fused: Optional[bool] = None,
+        static_decode: Optional[bool] = None,
+        compile_decode: Optional[bool] = None,
+        shrink_finished: Optional[bool] = None,
         max_new_tokens: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        pipeline_decode: Optional[bool] = None,
         **kwargs,
     ) -> Dict[str, Any]:
         """
@@ -310,6 +427,22 @@ class Qwen3TTSModel:
             do_sample, top_k, top_p, temperature, repetition_penalty,
             subtalker_dosample, subtalker_top_k, subtalker_top_p, subtalker_temperature, max_new_tokens:
                 Common generation parameters.
+            subtalker_fused:
+                Run the sub-talker with its own decode loop and static cache instead of a nested `generate()` per
+                frame. Same sampling distribution, much lower per-frame overhead.
+            static_decode:
+                Decode the talker into preallocated static caches with shape-stable steps.
+            compile_decode:
+                `torch.compile` the talker decode step (CUDA graphs on GPU); implies `static_decode` and
+                `subtalker_fused`. The first call pays the compilation cost.
+            shrink_finished:
+                Drop finished samples from the talker batch instead of decoding them until the longest one stops.
+                Greedy results are unchanged; sampled results follow the same distribution.
+            max_batch_tokens:
+                Padded prompt-token budget of one batch, see `_generate_bucket_codes`. Consumed by this wrapper.
+            pipeline_decode:
+                Decode each `max_batch_tokens` bucket on a background worker while the talker generates the next
+                one. Consumed by this wrapper; see `Qwen3TTSPipeline` to overlap separate calls.
             **kwargs:
                 Other arguments forwarded to model.generate().
 
@@ -326,7 +459,13 @@ class Qwen3TTSModel:
             subtalker_top_k=50,
             subtalker_top_p=1.0,
             subtalker_temperature=0.9,
+            subtalker_fused=False,
+            static_decode=False,
+            compile_decode=False,
+            shrink_finished=False,
             max_new_tokens=2048,
+            max_batch_tokens=None,
+            pipeline_decode=False,
         )
 
         def pick(name: str, user_val: Any) -> Any:
@@ -347,7 +486,13 @@ class Qwen3TTSModel:
             subtalker_top_k=pick("subtalker_top_k", subtalker_top_k),
             subtalker_top_p=pick("subtalker_top_p", subtalker_top_p),
             subtalker_temperature=pick("subtalker_temperature", subtalker_temperature),
+            subtalker_fused=pick("subtalker_fused", subtalker_fused),
+            static_decode=pick("static_decode", static_decode),
+            compile_decode=pick("compile_decode", compile_decode),
+            shrink_finished=pick("shrink_finished", shrink_finished),
             max_new_tokens=pick("max_new_tokens", max_new_tokens),
+            max_batch_tokens=pick("max_batch_tokens", max_batch_tokens),
+            pipeline_decode=pick("pipeline_decode", pipeline_decode),
         )
         return merged
 
@@ -379,11 +524,16 @@ class Qwen3TTSModel:
           - str: local wav path / URL / base64
           - (np.ndarray, sr): waveform + sampling rate
 
+        Caching:
+          - If `self.prompt_cache` (a `VoiceClonePromptCache`) is set, items are looked up by audio content hash +
+            ref_text + x_vector_only_mode first, and only the misses are loaded and encoded.
+
         Args:
             ref_audio:
                 Reference audio(s) used to extract:
                   - ref_code via `model.speech_tokenizer.encode(...)`
-                  - ref_spk_embedding via `model.extract_speaker_embedding(...)` (resampled to 24k)
+                  - ref_spk_embedding via `model.extract_speaker_embeddings(...)` (resampled to 24k, batched by
+                    `self.speaker_batch_size` clips of similar length)
             ref_text:
                 Reference transcript(s). Required when x_vector_only_mode=False (ICL mode).
             x_vector_only_mode:
@@ -415,6 +565,38 @@ class Qwen3TTSModel:
                 f"Batch size mismatch: ref_audio={len(ref_audio_list)}, ref_text={len(ref_text_list)}, x_vector_only_mode={len(xvec_list)}"
             )
 
+        for i, (rtext, xvec_only) in enumerate(zip(ref_text_list, xvec_list)):
+            if not xvec_only:
+                if rtext is None or rtext == "":
+                    raise ValueError(f"ref_text is required when x_vector_only_mode=False (ICL mode). Bad index={i}")
+
+        if self.prompt_cache is None:
+            return self._build_voice_clone_prompt_items(ref_audio_list, ref_text_list, xvec_list)
+
+        namespace = self._prompt_cache_namespace()
+        keys = [
+            VoiceClonePromptCache.make_key(self._audio_digest(a), rtext, xvec_only, namespace)
+            for a, rtext, xvec_only in zip(ref_audio_list, ref_text_list, xvec_list)
+        ]
+        items: List[Optional[VoiceClonePromptItem]] = [self.prompt_cache.get(k) for k in keys]
+        miss = [i for i, it in enumerate(items) if it is None]
+        if miss:
+            built = self._build_voice_clone_prompt_items(
+                [ref_audio_list[i] for i in miss],
+                [ref_text_list[i] for i in miss],
+                [xvec_list[i] for i in miss],
+            )
+            for i, it in zip(miss, built):
+                self.prompt_cache.put(keys[i], it)
+                items[i] = it
+        return items
+
+    def _build_voice_clone_prompt_items(
+        self,
+        ref_audio_list: List[AudioLike],
+        ref_text_list: List[Optional[str]],
+        xvec_list: List[bool],
+    ) -> List[VoiceClonePromptItem]:
         normalized = self._normalize_audio_inputs(ref_audio_list)
 
         ref_wavs_for_code: List[np.ndarray] = []
@@ -431,21 +613,13 @@ class Qwen3TTSModel:
             for wav, sr in normalized:
                 ref_codes.append(self.model.speech_tokenizer.encode(wav, sr=sr).audio_codes[0])
 
-        items: List[VoiceClonePromptItem] = []
-        for i, ((wav, sr), code, rtext, xvec_only) in enumerate(zip(normalized, ref_codes, ref_text_list, xvec_list)):
-            if not xvec_only:
-                if rtext is None or rtext == "":
-                    raise ValueError(f"ref_text is required when x_vector_only_mode=False (ICL mode). Bad index={i}")
-
-            wav_resample = wav
-            if sr != self.model.speaker_encoder_sample_rate:
-                wav_resample = librosa.resample(y=wav_resample.astype(np.float32), 
-                                           orig_sr=int(sr), 
-                                           target_sr=self.model.speaker_encoder_sample_rate)
-
-            spk_emb = self.model.extract_speaker_embedding(audio=wav_resample,
-                                                           sr=self.model.speaker_encoder_sample_rate)
+        wavs_for_spk = load_audios(normalized, target_sr=self.model.speaker_encoder_sample_rate)
+        spk_embs = self.model.extract_speaker_embeddings(
+            wavs_for_spk, sr=self.model.speaker_encoder_sample_rate, batch_size=self.speaker_batch_size
+        )
 
+        items: List[VoiceClonePromptItem] = []
+        for code, spk_emb, rtext, xvec_only in zip(ref_codes, spk_embs, ref_text_list, xvec_list):
             items.append(
                 VoiceClonePromptItem(
                     ref_code=None if xvec_only else code,
@@ -465,6 +639,361 @@ class Qwen3TTSModel:
             icl_mode=[it.icl_mode for it in items],
         )
 
+    def _check_model_type(self, expected: str, method_name: str) -> None:
+        if self.model.tts_model_type != expected:
+            raise ValueError(
+                f"model with \ntokenizer_type: {self.model.tokenizer_type}\n"
+                f"tts_model_size: {self.model.tts_model_size}\n"
+                f"tts_model_type: {self.model.tts_model_type}\n"
+                f"does not support {method_name}, Please check Model Card or Readme for more details."
+            )
+
+    def _prepare_voice_clone_inputs(
+        self,
+        text: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        ref_audio: Optional[Union[AudioLike, List[AudioLike]]] = None,
+        ref_text: Optional[Union[str, List[Optional[str]]]] = None,
+        x_vector_only_mode: Union[bool, List[bool]] = False,
+        voice_clone_prompt: Optional[Union[Dict[str, Any], List[VoiceClonePromptItem]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Validate voice-clone inputs and turn them into `model.generate(...)` keyword arguments.
+
+        Returns:
+            Dict[str, Any]:
+                `input_ids`, `ref_ids`, `voice_clone_prompt` and `languages`.
+        """
+        texts = self._ensure_list(text)
+        languages = self._ensure_list(language) if isinstance(language, list) else ([language] * len(texts) if language is not None else ["Auto"] * len(texts))
+        if len(languages) == 1 and len(texts) > 1:
+            languages = languages * len(texts)
+        if len(texts) != len(languages):
+            raise ValueError(f"Batch size mismatch: text={len(texts)}, language={len(languages)}")
+
+        self._validate_languages(languages)
+
+        if voice_clone_prompt is None:
+            if ref_audio is None:
+                raise ValueError("Either `voice_clone_prompt` or `ref_audio` must be provided.")
+            prompt_items = self.create_voice_clone_prompt(ref_audio=ref_audio, ref_text=ref_text, x_vector_only_mode=x_vector_only_mode)
+            if len(prompt_items) == 1 and len(texts) > 1:
+                prompt_items = prompt_items * len(texts)
+            if len(prompt_items) != len(texts):
+                raise ValueError(f"Batch size mismatch: prompt={len(prompt_items)}, text={len(texts)}")
+            voice_clone_prompt_dict = self._prompt_items_to_voice_clone_prompt(prompt_items)
+            ref_texts_for_ids = [it.ref_text for it in prompt_items]
+        else:
+            if isinstance(voice_clone_prompt, list):
+                prompt_items = voice_clone_prompt
+                if len(prompt_items) == 1 and len(texts) > 1:
+                    prompt_items = prompt_items * len(texts)
+                if len(prompt_items) != len(texts):
+                    raise ValueError(f"Batch size mismatch: prompt={len(prompt_items)}, text={len(texts)}")
+                voice_clone_prompt_dict = self._prompt_items_to_voice_clone_prompt(prompt_items)
+                ref_texts_for_ids = [it.ref_text for it in prompt_items]
+            else:
+                voice_clone_prompt_dict = voice_clone_prompt
+                ref_texts_for_ids = None
+
+        input_texts = [self._build_assistant_text(t) for t in texts]
+        input_ids = self._tokenize_texts(input_texts)
+
+        ref_ids = None
+        if ref_texts_for_ids is not None:
+            ref_ids = []
+            for i, rt in enumerate(ref_texts_for_ids):
+                if rt is None or rt == "":
+                    ref_ids.append(None)
+                else:
+                    ref_tok = self._tokenize_texts([self._build_ref_text(rt)])[0]
+                    ref_ids.append(ref_tok)
+
+        return dict(
+            input_ids=input_ids,
+            ref_ids=ref_ids,
+            voice_clone_prompt=voice_clone_prompt_dict,
+            languages=languages,
+        )
+
+    def _prepare_voice_design_inputs(
+        self,
+        text: Union[str, List[str]],
+        instruct: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Validate voice-design inputs and turn them into `model.generate(...)` keyword arguments.
+
+        Returns:
+            Dict[str, Any]:
+                `input_ids`, `instruct_ids` and `languages`.
+        """
+        texts = self._ensure_list(text)
+        languages = self._ensure_list(language) if isinstance(language, list) else ([language] * len(texts) if language is not None else ["Auto"] * len(texts))
+        instructs = self._ensure_list(instruct)
+
+        if len(languages) == 1 and len(texts) > 1:
+            languages = languages * len(texts)
+        if len(instructs) == 1 and len(texts) > 1:
+            instructs = instructs * len(texts)
+
+        if not (len(texts) == len(languages) == len(instructs)):
+            raise ValueError(f"Batch size mismatch: text={len(texts)}, language={len(languages)}, instruct={len(instructs)}")
+
+        self._validate_languages(languages)
+
+        input_ids = self._tokenize_texts([self._build_assistant_text(t) for t in texts])
+
+        instruct_ids: List[Optional[torch.Tensor]] = []
+        for ins in instructs:
+            if ins is None or ins == "":
+                instruct_ids.append(None)
+            else:
+                instruct_ids.append(self._tokenize_texts([self._build_instruct_text(ins)])[0])
+
+        return dict(
+            input_ids=input_ids,
+            instruct_ids=instruct_ids,
+            languages=languages,
+        )
+
+    def _prepare_custom_voice_inputs(
+        self,
+        text: Union[str, List[str]],
+        speaker: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        instruct: Optional[Union[str, List[str]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Validate custom-voice inputs and turn them into `model.generate(...)` keyword arguments.
+
+        Returns:
+            Dict[str, Any]:
+                `input_ids`, `instruct_ids`, `languages` and `speakers`.
+        """
+        texts = self._ensure_list(text)
+        languages = self._ensure_list(language) if isinstance(language, list) else ([language] * len(texts) if language is not None else ["Auto"] * len(texts))
+        speakers = self._ensure_list(speaker)
+        if self.model.tts_model_size in "0b6": # for 0b6 model, instruct is not supported
+            instruct = None
+        instructs = self._ensure_list(instruct) if isinstance(instruct, list) else ([instruct] * len(texts) if instruct is not None else [""] * len(texts))
+
+        if len(languages) == 1 and len(texts) > 1:
+            languages = languages * len(texts)
+        if len(speakers) == 1 and len(texts) > 1:
+            speakers = speakers * len(texts)
+        if len(instructs) == 1 and len(texts) > 1:
+            instructs = instructs * len(texts)
+
+        if not (len(texts) == len(languages) == len(speakers) == len(instructs)):
+            raise ValueError(
+                f"Batch size mismatch: text={len(texts)}, language={len(languages)}, speaker={len(speakers)}, instruct={len(instructs)}"
+            )
+
+        self._validate_languages(languages)
+        self._validate_speakers(speakers)
+
+        input_ids = self._tokenize_texts([self._build_assistant_text(t) for t in texts])
+
+        instruct_ids: List[Optional[torch.Tensor]] = []
+        for ins in instructs:
+            if ins is None or ins == "":
+                instruct_ids.append(None)
+            else:
+                instruct_ids.append(self._tokenize_texts([self._build_instruct_text(ins)])[0])
+
+        return dict(
+            input_ids=input_ids,
+            instruct_ids=instruct_ids,
+            languages=languages,
+            speakers=speakers,
+        )
+
+    def _estimate_prompt_lengths(self, generate_inputs: Dict[str, Any]) -> List[int]:
+        """
+        Estimate the talker prompt length of every sample: text, instruct and reference text tokens plus the
+        reference codec frames of ICL voice clone prompts.
+        """
+        lengths = [int(x.shape[-1]) for x in generate_inputs["input_ids"]]
+        for key in ("instruct_ids", "ref_ids"):
+            ids = generate_inputs.get(key)
+            if ids is None:
+                continue
+            for i, x in enumerate(ids):
+                if x is not None:
+                    lengths[i] += int(x.shape[-1])
+        voice_clone_prompt = generate_inputs.get("voice_clone_prompt")
+        if voice_clone_prompt is not None and voice_clone_prompt.get("ref_code") is not None:
+            for i, (code, icl) in enumerate(zip(voice_clone_prompt["ref_code"], voice_clone_prompt["icl_mode"])):
+                if code is not None and icl:
+                    lengths[i] += int(code.shape[0])
+        return lengths
+
+    def _length_buckets(self, generate_inputs: Dict[str, Any], max_batch_tokens: int) -> List[List[int]]:
+        """
+        Split sample indices into buckets of similar prompt length whose padded size
+        (`len(bucket) * longest prompt in bucket`) does not exceed `max_batch_tokens`.
+
+        A batch that already fits is returned as a single bucket in its original order.
+        """
+        lengths = self._estimate_prompt_lengths(generate_inputs)
+        if len(lengths) * max(lengths) <= max_batch_tokens:
+            return [list(range(len(lengths)))]
+
+        buckets: List[List[int]] = []
+        current: List[int] = []
+        for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            # sorted ascending, so the new sample is the longest of the bucket
+            if current and (len(current) + 1) * lengths[i] > max_batch_tokens:
+                buckets.append(current)
+                current = []
+            current.append(i)
+        buckets.append(current)
+        return buckets
+
+    def _select_generate_inputs(self, generate_inputs: Dict[str, Any], indices: List[int]) -> Dict[str, Any]:
+        def _pick(v: Any) -> Any:
+            if isinstance(v, list):
+                return [v[i] for i in indices]
+            if isinstance(v, dict):
+                return {k: _pick(x) for k, x in v.items()}
+            return v
+
+        return {k: _pick(v) for k, v in generate_inputs.items()}
+
+    def _generate_bucket_codes(
+        self,
+        generate_inputs: Dict[str, Any],
+        gen_kwargs: Dict[str, Any],
+        non_streaming_mode: bool,
+    ) -> Iterator[Tuple[List[int], List[torch.Tensor], Optional[List[Optional[torch.Tensor]]]]]:
+        """
+        Run `model.generate(...)`, bucket by bucket when `max_batch_tokens` is set.
+
+        Rows of one `generate` call are padded to the longest prompt and decoded until the longest sample stops,
+        so mixing very different lengths wastes compute. Buckets of similar length avoid that.
+
+        Yields:
+            Tuple[List[int], List[torch.Tensor], Optional[List[Optional[torch.Tensor]]]]:
+                (input indices of the bucket, talker codes, reference codes for decoding)
+        """
+        gen_kwargs = dict(gen_kwargs)
+        max_batch_tokens = gen_kwargs.pop("max_batch_tokens", None)
+        gen_kwargs.pop("pipeline_decode", None)
+        batch_size = len(generate_inputs["input_ids"])
+        if max_batch_tokens is None:
+            buckets = [list(range(batch_size))]
+        else:
+            buckets = self._length_buckets(generate_inputs, max_batch_tokens)
+
+        for bucket in buckets:
+            inputs = generate_inputs if len(buckets) == 1 else self._select_generate_inputs(generate_inputs, bucket)
+            talker_codes_list, _ = self.model.generate(
+                non_streaming_mode=non_streaming_mode,
+                **inputs,
+                **gen_kwargs,
+            )
+            ref_code_list = None
+            if inputs.get("voice_clone_prompt") is not None:
+                ref_code_list = inputs["voice_clone_prompt"].get("ref_code", None)
+            yield bucket, talker_codes_list, ref_code_list
+
+    def _generate_talker_codes(
+        self,
+        generate_inputs: Dict[str, Any],
+        gen_kwargs: Dict[str, Any],
+        non_streaming_mode: bool,
+    ) -> Tuple[List[torch.Tensor], Optional[List[Optional[torch.Tensor]]]]:
+        """
+        Generate the talker codes of every sample without decoding them.
+
+        Returns:
+            Tuple[List[torch.Tensor], Optional[List[Optional[torch.Tensor]]]]:
+                (talker codes, reference codes for decoding), in the input order.
+        """
+        batch_size = len(generate_inputs["input_ids"])
+        talker_codes_list: List[Optional[torch.Tensor]] = [None] * batch_size
+        ref_code_list: Optional[List[Optional[torch.Tensor]]] = None
+        for bucket, codes, refs in self._generate_bucket_codes(generate_inputs, gen_kwargs, non_streaming_mode):
+            if refs is not None and ref_code_list is None:
+                ref_code_list = [None] * batch_size
+            for j, i in enumerate(bucket):
+                talker_codes_list[i] = codes[j]
+                if refs is not None:
+                    ref_code_list[i] = refs[j]
+        return talker_codes_list, ref_code_list
+
+    def _generate_and_decode(
+        self,
+        generate_inputs: Dict[str, Any],
+        gen_kwargs: Dict[str, Any],
+        non_streaming_mode: bool,
+    ) -> Tuple[List[np.ndarray], int]:
+        """
+        Generate the talker codes and decode them into waveforms, returned in the original input order.
+
+        With `pipeline_decode`, each bucket is decoded on a `Qwen3TTSDecodeWorker` while the talker already generates
+        the next one.
+
+        Returns:
+            Tuple[List[np.ndarray], int]:
+                (wavs, sample_rate)
+        """
+        buckets = self._generate_bucket_codes(generate_inputs, gen_kwargs, non_streaming_mode)
+        wavs: List[Optional[np.ndarray]] = [None] * len(generate_inputs["input_ids"])
+        fs = None
+        if gen_kwargs.get("pipeline_decode", False):
+            with Qwen3TTSDecodeWorker(self) as worker:
+                pending = [(bucket, worker.submit(codes, refs)) for bucket, codes, refs in buckets]
+                for bucket, future in pending:
+                    bucket_wavs, fs = future.result()
+                    for i, wav in zip(bucket, bucket_wavs):
+                        wavs[i] = wav
+            return wavs, fs
+
+        for bucket, codes, refs in buckets:
+            bucket_wavs, fs = self._decode_talker_codes(codes, refs)
+            for i, wav in zip(bucket, bucket_wavs):
+                wavs[i] = wav
+        return wavs, fs
+
+    def _decode_talker_codes(
+        self,
+        talker_codes_list: List[torch.Tensor],
+        ref_code_list: Optional[List[Optional[torch.Tensor]]] = None,
+    ) -> Tuple[List[np.ndarray], int]:
+        """
+        Decode talker codes into waveforms.
+
+        When a reference code is given for a sample (voice clone ICL mode), it is prepended as decoder context and
+        the matching part of the waveform is cut off again.
+
+        Returns:
+            Tuple[List[np.ndarray], int]:
+                (wavs, sample_rate)
+        """
+        codes_for_decode = []
+        for i, codes in enumerate(talker_codes_list):
+            if ref_code_list is not None and ref_code_list[i] is not None:
+                codes_for_decode.append(torch.cat([ref_code_list[i].to(codes.device), codes], dim=0))
+            else:
+                codes_for_decode.append(codes)
+
+        wavs_all, fs = self.model.speech_tokenizer.decode([{"audio_codes": c} for c in codes_for_decode])
+
+        wavs_out: List[np.ndarray] = []
+        for i, wav in enumerate(wavs_all):
+            if ref_code_list is not None and ref_code_list[i] is not None:
+                ref_len = int(ref_code_list[i].shape[0])
+                total_len = int(codes_for_decode[i].shape[0])
+                cut = int(ref_len / max(total_len, 1) * wav.shape[0])
+                wavs_out.append(wav[cut:])
+            else:
+                wavs_out.append(wav)
+
+        return wavs_out, fs
+
     # voice clone model
     @torch.no_grad()
     def generate_voice_clone(
@@ -533,6 +1062,11 @@ class Qwen3TTSModel:
                 Temperature for sub-talker sampling (only valid for qwen3-tts-tokenizer-v2).
             max_new_tokens:
                 Maximum number of new codec tokens to generate.
+            max_batch_tokens:
+                If set, list inputs are sorted by estimated prompt length and generated in buckets whose padded
+                size (`len(bucket) * longest prompt`) stays within this budget. Results keep the input order.
+            pipeline_decode:
+                Decode each bucket in the background while the talker generates the next one.
             **kwargs:
                 Any other keyword arguments supported by HuggingFace Transformers `generate()` can be passed.
                 They will be forwarded to the underlying `Qwen3TTSForConditionalGeneration.generate(...)`.
@@ -545,92 +1079,19 @@ class Qwen3TTSModel:
             ValueError:
                 If batch sizes mismatch or required prompt inputs are missing.
         """
-        if self.model.tts_model_type != "base":
-            raise ValueError(
-                f"model with \ntokenizer_type: {self.model.tokenizer_type}\n"
-                f"tts_model_size: {self.model.tts_model_size}\n"
-                f"tts_model_type: {self.model.tts_model_type}\n"
-                "does not support generate_voice_clone, Please check Model Card or Readme for more details."
-            )
-        
-        texts = self._ensure_list(text)
-        languages = self._ensure_list(language) if isinstance(language, list) else ([language] * len(texts) if language is not None else ["Auto"] * len(texts))
-        if len(languages) == 1 and len(texts) > 1:
-            languages = languages * len(texts)
-        if len(texts) != len(languages):
-            raise ValueError(f"Batch size mismatch: text={len(texts)}, language={len(languages)}")
-
-        self._validate_languages(languages)
-
-        if voice_clone_prompt is None:
-            if ref_audio is None:
-                raise ValueError("Either `voice_clone_prompt` or `ref_audio` must be provided.")
-            prompt_items = self.create_voice_clone_prompt(ref_audio=ref_audio, ref_text=ref_text, x_vector_only_mode=x_vector_only_mode)
-            if len(prompt_items) == 1 and len(texts) > 1:
-                prompt_items = prompt_items * len(texts)
-            if len(prompt_items) != len(texts):
-                raise ValueError(f"Batch size mismatch: prompt={len(prompt_items)}, text={len(texts)}")
-            voice_clone_prompt_dict = self._prompt_items_to_voice_clone_prompt(prompt_items)
-            ref_texts_for_ids = [it.ref_text for it in prompt_items]
-        else:
-            if isinstance(voice_clone_prompt, list):
-                prompt_items = voice_clone_prompt
-                if len(prompt_items) == 1 and len(texts) > 1:
-                    prompt_items = prompt_items * len(texts)
-                if len(prompt_items) != len(texts):
-                    raise ValueError(f"Batch size mismatch: prompt={len(prompt_items)}, text={len(texts)}")
-                voice_clone_prompt_dict = self._prompt_items_to_voice_clone_prompt(prompt_items)
-                ref_texts_for_ids = [it.ref_text for it in prompt_items]
-            else:
-                voice_clone_prompt_dict = voice_clone_prompt
-                ref_texts_for_ids = None
-
-        input_texts = [self._build_assistant_text(t) for t in texts]
-        input_ids = self._tokenize_texts(input_texts)
-
-        ref_ids = None
-        if ref_texts_for_ids is not None:
-            ref_ids = []
-            for i, rt in enumerate(ref_texts_for_ids):
-                if rt is None or rt == "":
-                    ref_ids.append(None)
-                else:
-                    ref_tok = self._tokenize_texts([self._build_ref_text(rt)])[0]
-                    ref_ids.append(ref_tok)
-
-        gen_kwargs = self._merge_generate_kwargs(**kwargs)
-
-        talker_codes_list, _ = self.model.generate(
-            input_ids=input_ids,
-            ref_ids=ref_ids,
-            voice_clone_prompt=voice_clone_prompt_dict,
-            languages=languages,
-            non_streaming_mode=non_streaming_mode,
-            **gen_kwargs,
+        self._check_model_type("base", "generate_voice_clone")
+        generate_inputs = self._prepare_voice_clone_inputs(
+            text=text,
+            language=language,
+            ref_audio=ref_audio,
+            ref_text=ref_text,
+            x_vector_only_mode=x_vector_only_mode,
+            voice_clone_prompt=voice_clone_prompt,
         )
 
-        codes_for_decode = []
-        for i, codes in enumerate(talker_codes_list):
-            ref_code_list = voice_clone_prompt_dict.get("ref_code", None)
-            if ref_code_list is not None and ref_code_list[i] is not None:
-                codes_for_decode.append(torch.cat([ref_code_list[i].to(codes.device), codes], dim=0))
-            else:
-                codes_for_decode.append(codes)
-
-        wavs_all, fs = self.model.speech_tokenizer.decode([{"audio_codes": c} for c in codes_for_decode])
-
-        wavs_out: List[np.ndarray] = []
-        for i, wav in enumerate(wavs_all):
-            ref_code_list = voice_clone_prompt_dict.get("ref_code", None)
-            if ref_code_list is not None and ref_code_list[i] is not None:
-                ref_len = int(ref_code_list[i].shape[0])
-                total_len = int(codes_for_decode[i].shape[0])
-                cut = int(ref_len / max(total_len, 1) * wav.shape[0])
-                wavs_out.append(wav[cut:])
-            else:
-                wavs_out.append(wav)
+        gen_kwargs = self._merge_generate_kwargs(**kwargs)
 
-        return wavs_out, fs
+        return self._generate_and_decode(generate_inputs, gen_kwargs, non_streaming_mode)
 
     # voice design model
     @torch.no_grad()
@@ -675,6 +1136,11 @@ class Qwen3TTSModel:
                 Temperature for sub-talker sampling (only valid for qwen3-tts-tokenizer-v2).
             max_new_tokens:
                 Maximum number of new codec tokens to generate.
+            max_batch_tokens:
+                If set, list inputs are sorted by estimated prompt length and generated in buckets whose padded
+                size (`len(bucket) * longest prompt`) stays within this budget. Results keep the input order.
+            pipeline_decode:
+                Decode each bucket in the background while the talker generates the next one.
             **kwargs:
                 Any other keyword arguments supported by HuggingFace Transformers `generate()` can be passed.
                 They will be forwarded to the underlying `Qwen3TTSForConditionalGeneration.generate(...)`.
@@ -683,49 +1149,12 @@ class Qwen3TTSModel:
             Tuple[List[np.ndarray], int]:
                 (wavs, sample_rate)
         """
-        if self.model.tts_model_type != "voice_design":
-            raise ValueError(
-                f"model with \ntokenizer_type: {self.model.tokenizer_type}\n"
-                f"tts_model_size: {self.model.tts_model_size}\n"
-                f"tts_model_type: {self.model.tts_model_type}\n"
-                "does not support generate_voice_design, Please check Model Card or Readme for more details."
-            )
-        
-        texts = self._ensure_list(text)
-        languages = self._ensure_list(language) if isinstance(language, list) else ([language] * len(texts) if language is not None else ["Auto"] * len(texts))
-        instructs = self._ensure_list(instruct)
-
-        if len(languages) == 1 and len(texts) > 1:
-            languages = languages * len(texts)
-        if len(instructs) == 1 and len(texts) > 1:
-            instructs = instructs * len(texts)
-
-        if not (len(texts) == len(languages) == len(instructs)):
-            raise ValueError(f"Batch size mismatch: text={len(texts)}, language={len(languages)}, instruct={len(instructs)}")
-
-        self._validate_languages(languages)
-
-        input_ids = self._tokenize_texts([self._build_assistant_text(t) for t in texts])
-
-        instruct_ids: List[Optional[torch.Tensor]] = []
-        for ins in instructs:
-            if ins is None or ins == "":
-                instruct_ids.append(None)
-            else:
-                instruct_ids.append(self._tokenize_texts([self._build_instruct_text(ins)])[0])
+        self._check_model_type("voice_design", "generate_voice_design")
+        generate_inputs = self._prepare_voice_design_inputs(text=text, instruct=instruct, language=language)
 
         gen_kwargs = self._merge_generate_kwargs(**kwargs)
 
-        talker_codes_list, _ = self.model.generate(
-            input_ids=input_ids,
-            instruct_ids=instruct_ids,
-            languages=languages,
-            non_streaming_mode=non_streaming_mode,
-            **gen_kwargs,
-        )
-
-        wavs, fs = self.model.speech_tokenizer.decode([{"audio_codes": c} for c in talker_codes_list])
-        return wavs, fs
+        return self._generate_and_decode(generate_inputs, gen_kwargs, non_streaming_mode)
 
     # custom voice model
     @torch.no_grad()
@@ -773,6 +1202,11 @@ class Qwen3TTSModel:
                 Temperature for sub-talker sampling (only valid for qwen3-tts-tokenizer-v2).
             max_new_tokens:
                 Maximum number of new codec tokens to generate.
+            max_batch_tokens:
+                If set, list inputs are sorted by estimated prompt length and generated in buckets whose padded
+                size (`len(bucket) * longest prompt`) stays within this budget. Results keep the input order.
+            pipeline_decode:
+                Decode each bucket in the background while the talker generates the next one.
             **kwargs:
                 Any other keyword arguments supported by HuggingFace Transformers `generate()` can be passed.
                 They will be forwarded to the underlying `Qwen3TTSForConditionalGeneration.generate(...)`.
@@ -785,58 +1219,276 @@ class Qwen3TTSModel:
             ValueError:
                 If any speaker/language is unsupported or batch sizes mismatch.
         """
-        if self.model.tts_model_type != "custom_voice":
-            raise ValueError(
-                f"model with \ntokenizer_type: {self.model.tokenizer_type}\n"
-                f"tts_model_size: {self.model.tts_model_size}\n"
-                f"tts_model_type: {self.model.tts_model_type}\n"
-                "does not support generate_custom_voice, Please check Model Card or Readme for more details."
-            )
+        self._check_model_type("custom_voice", "generate_custom_voice")
+        generate_inputs = self._prepare_custom_voice_inputs(text=text, speaker=speaker, language=language, instruct=instruct)
 
-        texts = self._ensure_list(text)
-        languages = self._ensure_list(language) if isinstance(language, list) else ([language] * len(texts) if language is not None else ["Auto"] * len(texts))
-        speakers = self._ensure_list(speaker)
-        if self.model.tts_model_size in "0b6": # for 0b6 model, instruct is not supported
-            instruct = None
-        instructs = self._ensure_list(instruct) if isinstance(instruct, list) else ([instruct] * len(texts) if instruct is not None else [""] * len(texts))
+        gen_kwargs = self._merge_generate_kwargs(**kwargs)
 
-        if len(languages) == 1 and len(texts) > 1:
-            languages = languages * len(texts)
-        if len(speakers) == 1 and len(texts) > 1:
-            speakers = speakers * len(texts)
-        if len(instructs) == 1 and len(texts) > 1:
-            instructs = instructs * len(texts)
+        return self._generate_and_decode(generate_inputs, gen_kwargs, non_streaming_mode)
 
-        if not (len(texts) == len(languages) == len(speakers) == len(instructs)):
-            raise ValueError(
-                f"Batch size mismatch: text={len(texts)}, language={len(languages)}, speaker={len(speakers)}, instruct={len(instructs)}"
-            )
+    @torch.no_grad()
+    def generate_custom_voice_codes(
+        self,
+        text: Union[str, List[str]],
+        speaker: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        instruct: Optional[Union[str, List[str]]] = None,
+        non_streaming_mode: bool = True,
+        **kwargs,
+    ) -> List[torch.Tensor]:
+        """
+        Same as `generate_custom_voice`, but return the talker codes instead of decoding them, e.g. to compare the
+        codes of two model configurations. `decode_codes` turns them into waveforms.
 
-        self._validate_languages(languages)
-        self._validate_speakers(speakers)
+        Returns:
+            List[torch.Tensor]:
+                (T, Q) codec ids of every sample, in the input order.
+        """
+        self._check_model_type("custom_voice", "generate_custom_voice_codes")
+        generate_inputs = self._prepare_custom_voice_inputs(text=text, speaker=speaker, language=language, instruct=instruct)
+        gen_kwargs = self._merge_generate_kwargs(**kwargs)
+        talker_codes_list, _ = self._generate_talker_codes(generate_inputs, gen_kwargs, non_streaming_mode)
+        return talker_codes_list
 
-        input_ids = self._tokenize_texts([self._build_assistant_text(t) for t in texts])
+    @torch.no_grad()
+    def decode_codes(self, talker_codes_list: List[torch.Tensor]) -> Tuple[List[np.ndarray], int]:
+        """
+        Decode talker codes, e.g. from `generate_custom_voice_codes`, into waveforms.
 
-        instruct_ids: List[Optional[torch.Tensor]] = []
-        for ins in instructs:
-            if ins is None or ins == "":
-                instruct_ids.append(None)
-            else:
-                instruct_ids.append(self._tokenize_texts([self._build_instruct_text(ins)])[0])
+        Returns:
+            Tuple[List[np.ndarray], int]:
+                (wavs, sample_rate)
+        """
+        return self._decode_talker_codes(talker_codes_list)
 
-        gen_kwargs = self._merge_generate_kwargs(**kwargs)
+    def _stream_talker_codes(self, generate_inputs: Dict[str, Any], gen_kwargs: Dict[str, Any]) -> Iterator[torch.Tensor]:
+        """
+        Run `model.generate(...)` on a worker thread and yield every codec frame as soon as the talker emits it.
 
-        talker_codes_list, _ = self.model.generate(
-            input_ids=input_ids,
-            instruct_ids=instruct_ids,
-            languages=languages,
-            speakers=speakers,
-            non_streaming_mode=non_streaming_mode,
-            **gen_kwargs,
+        Yields:
+            torch.Tensor:
+                (B, Q) codec ids of one decoding step. Rows that already finished carry the EOS id.
+        """
+        streamer = _CodecFrameStreamer()
+        # frames of the whole batch are streamed together, so length bucketing does not apply here
+        gen_kwargs = {k: v for k, v in gen_kwargs.items() if k not in ("max_batch_tokens", "pipeline_decode")}
+
+        def _run():
+            try:
+                self.model.generate(codec_streamer=streamer, **generate_inputs, **gen_kwargs)
+            except _StreamCancelled:
+                pass
+            except BaseException as e:
+                streamer.error = e
+            finally:
+                streamer.end()
+
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        try:
+            yield from streamer
+        finally:
+            streamer.cancel()
+            thread.join()
+
+    def _stream_decode(
+        self,
+        generate_inputs: Dict[str, Any],
+        gen_kwargs: Dict[str, Any],
+        chunk_size: Optional[int],
+    ) -> Iterator[Tuple[int, np.ndarray, int]]:
+        """
+        Incrementally decode talker frames into waveform chunks.
+
+        Every sample owns a streaming decoder state (see `Qwen3TTSTokenizer.decode_step`). Once `chunk_size` new
+        frames are available only those frames are decoded and their audio is yielded. For ICL voice clone the
+        reference code is pushed through the decoder first, so the generated audio is conditioned on it exactly
+        like the offline path.
+
+        With `chunk_size=None` every sample is decoded in one piece as soon as it reaches EOS (or the end of
+        generation), giving the same waveform as the `generate_*` methods; each sample index is yielded exactly once.
+        """
+        if chunk_size is None:
+            yield from self._stream_utterances(generate_inputs, gen_kwargs)
+            return
+        if self.model.speech_tokenizer.get_model_type() != "qwen3_tts_tokenizer_12hz":
+            raise ValueError("Streaming output is only supported by models using the 12Hz speech tokenizer.")
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be >= 1, got {chunk_size}")
+
+        speech_tokenizer = self.model.speech_tokenizer
+        fs = speech_tokenizer.get_output_sample_rate()
+        eos_token_id = self.model.config.talker_config.codec_eos_token_id
+        batch_size = len(generate_inputs["input_ids"])
+
+        ref_code_list = None
+        if generate_inputs.get("voice_clone_prompt") is not None:
+            ref_code_list = generate_inputs["voice_clone_prompt"].get("ref_code", None)
+
+        states: List[Any] = [None] * batch_size
+        for i in range(batch_size):
+            if ref_code_list is not None and ref_code_list[i] is not None:
+                _, states[i] = speech_tokenizer.decode_step(ref_code_list[i], None)
+        pending: List[List[torch.Tensor]] = [[] for _ in range(batch_size)]
+        finished = [False] * batch_size
+
+        def _flush(i: int) -> np.ndarray:
+            wav, states[i] = speech_tokenizer.decode_step(torch.stack(pending[i], dim=0), states[i])
+            pending[i] = []
+            return wav
+
+        for frame in self._stream_talker_codes(generate_inputs, gen_kwargs):
+            first_codes = frame[:, 0].tolist()
+            for i in range(batch_size):
+                if finished[i]:
+                    continue
+                if first_codes[i] == eos_token_id:
+                    finished[i] = True
+                    if pending[i]:
+                        yield i, _flush(i), fs
+                    states[i] = None
+                    continue
+                pending[i].append(frame[i])
+                if len(pending[i]) >= chunk_size:
+                    yield i, _flush(i), fs
+
+        for i in range(batch_size):
+            if not finished[i] and pending[i]:
+                yield i, _flush(i), fs
+
+    def _stream_utterances(
+        self,
+        generate_inputs: Dict[str, Any],
+        gen_kwargs: Dict[str, Any],
+    ) -> Iterator[Tuple[int, np.ndarray, int]]:
+        eos_token_id = self.model.config.talker_config.codec_eos_token_id
+        batch_size = len(generate_inputs["input_ids"])
+
+        ref_code_list = [None] * batch_size
+        if generate_inputs.get("voice_clone_prompt") is not None:
+            ref_code_list = generate_inputs["voice_clone_prompt"].get("ref_code", None) or ref_code_list
+
+        frames: List[List[torch.Tensor]] = [[] for _ in range(batch_size)]
+        finished = [False] * batch_size
+
+        def _finish(i: int) -> Tuple[int, np.ndarray, int]:
+            finished[i] = True
+            if not frames[i]:
+                return i, np.zeros(0, dtype=np.float32), self.model.speech_tokenizer.get_output_sample_rate()
+            wavs, fs = self._decode_talker_codes([torch.stack(frames[i], dim=0)], [ref_code_list[i]])
+            frames[i] = []
+            return i, wavs[0], fs
+
+        for frame in self._stream_talker_codes(generate_inputs, gen_kwargs):
+            first_codes = frame[:, 0].tolist()
+            for i in range(batch_size):
+                if finished[i]:
+                    continue
+                if first_codes[i] == eos_token_id:
+                    yield _finish(i)
+                else:
+                    frames[i].append(frame[i])
+
+        for i in range(batch_size):
+            if not finished[i]:
+                yield _finish(i)
+
+    @torch.no_grad()
+    def stream_voice_clone(
+        self,
+        text: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        ref_audio: Optional[Union[AudioLike, List[AudioLike]]] = None,
+        ref_text: Optional[Union[str, List[Optional[str]]]] = None,
+        x_vector_only_mode: Union[bool, List[bool]] = False,
+        voice_clone_prompt: Optional[Union[Dict[str, Any], List[VoiceClonePromptItem]]] = None,
+        non_streaming_mode: bool = False,
+        chunk_size: Optional[int] = 8,
+        **kwargs,
+    ) -> Iterator[Tuple[int, np.ndarray, int]]:
+        """
+        Streaming variant of `generate_voice_clone`: yields PCM chunks while the talker is still generating.
+
+        Generation runs on a background thread; every `chunk_size` codec frames (12.5 frames per second) are decoded
+        incrementally and yielded immediately. Concatenating the chunks of one sample gives its full waveform.
+        Closing the generator stops generation.
+
+        Args:
+            text, language, ref_audio, ref_text, x_vector_only_mode, voice_clone_prompt, non_streaming_mode:
+                Same as `generate_voice_clone`.
+            chunk_size:
+                Number of new codec frames decoded per chunk. Smaller values lower first-audio latency.
+                None yields every sample once, as a whole utterance, as soon as it finishes; this is the way to
+                render a batch and consume each result without waiting for the longest sample.
+            **kwargs:
+                Generation arguments, same as `generate_voice_clone`.
+
+        Yields:
+            Tuple[int, np.ndarray, int]:
+                (sample_index, wav_chunk, sample_rate)
+        """
+        self._check_model_type("base", "stream_voice_clone")
+        generate_inputs = self._prepare_voice_clone_inputs(
+            text=text,
+            language=language,
+            ref_audio=ref_audio,
+            ref_text=ref_text,
+            x_vector_only_mode=x_vector_only_mode,
+            voice_clone_prompt=voice_clone_prompt,
         )
+        gen_kwargs = self._merge_generate_kwargs(non_streaming_mode=non_streaming_mode, **kwargs)
+        yield from self._stream_decode(generate_inputs, gen_kwargs, chunk_size)
 
-        wavs, fs = self.model.speech_tokenizer.decode([{"audio_codes": c} for c in talker_codes_list])
-        return wavs, fs
+    @torch.no_grad()
+    def stream_voice_design(
+        self,
+        text: Union[str, List[str]],
+        instruct: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        non_streaming_mode: bool = True,
+        chunk_size: Optional[int] = 8,
+        **kwargs,
+    ) -> Iterator[Tuple[int, np.ndarray, int]]:
+        """
+        Streaming variant of `generate_voice_design`: yields PCM chunks while the talker is still generating.
+
+        See `stream_voice_clone` for the meaning of `chunk_size` and the yielded tuples.
+        All other arguments are the same as `generate_voice_design`.
+
+        Yields:
+            Tuple[int, np.ndarray, int]:
+                (sample_index, wav_chunk, sample_rate)
+        """
+        self._check_model_type("voice_design", "stream_voice_design")
+        generate_inputs = self._prepare_voice_design_inputs(text=text, instruct=instruct, language=language)
+        gen_kwargs = self._merge_generate_kwargs(non_streaming_mode=non_streaming_mode, **kwargs)
+        yield from self._stream_decode(generate_inputs, gen_kwargs, chunk_size)
+
+    @torch.no_grad()
+    def stream_custom_voice(
+        self,
+        text: Union[str, List[str]],
+        speaker: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        instruct: Optional[Union[str, List[str]]] = None,
+        non_streaming_mode: bool = True,
+        chunk_size: Optional[int] = 8,
+        **kwargs,
+    ) -> Iterator[Tuple[int, np.ndarray, int]]:
+        """
+        Streaming variant of `generate_custom_voice`: yields PCM chunks while the talker is still generating.
+
+        See `stream_voice_clone` for the meaning of `chunk_size` and the yielded tuples.
+        All other arguments are the same as `generate_custom_voice`.
+
+        Yields:
+            Tuple[int, np.ndarray, int]:
+                (sample_index, wav_chunk, sample_rate)
+        """
+        self._check_model_type("custom_voice", "stream_custom_voice")
+        generate_inputs = self._prepare_custom_voice_inputs(text=text, speaker=speaker, language=language, instruct=instruct)
+        gen_kwargs = self._merge_generate_kwargs(non_streaming_mode=non_streaming_mode, **kwargs)
+        yield from self._stream_decode(generate_inputs, gen_kwargs, chunk_size)
 
 
     def get_supported_speakers(self) -> Optional[List[str]]:
@@ -0,0 +1,308 @@
+# coding=utf-8
+# Copyright 2026 The Alibaba Qwen team.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import queue
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+
+if TYPE_CHECKING:
+    from .qwen3_tts_model import AudioLike, Qwen3TTSModel, VoiceClonePromptItem
+
+
+class Qwen3TTSDecodeWorker:
+    """
+    Background speech-tokenizer decoder fed through a bounded queue.
+
+    `submit()` hands the talker codes of one batch to a worker thread and returns a `Future` for `(wavs, sample_rate)`.
+    It blocks while `max_pending` batches are already waiting, so a producer that generates faster than the decoder
+    cannot run arbitrarily far ahead. When the codes live on a CUDA device the worker decodes on its own stream, so the
+    decoder kernels overlap with the talker running on the producer's stream.
+
+    Example:
+        with Qwen3TTSDecodeWorker(tts) as worker:
+            futures = [worker.submit(codes_list) for codes_list in batches]
+            results = [f.result() for f in futures]
+    """
+
+    def __init__(self, tts: "Qwen3TTSModel", max_pending: int = 2, use_cuda_stream: bool = True):
+        """
+        Args:
+            tts (Qwen3TTSModel):
+                Wrapper whose speech tokenizer decodes the codes.
+            max_pending (int):
+                Maximum number of submitted batches waiting for the decoder.
+            use_cuda_stream (bool):
+                Decode CUDA codes on a dedicated stream instead of the device's default stream.
+        """
+        if max_pending < 1:
+            raise ValueError(f"max_pending must be >= 1, got {max_pending}")
+        self.tts = tts
+        self.use_cuda_stream = use_cuda_stream
+        self._queue: "queue.Queue[Optional[Tuple[Any, ...]]]" = queue.Queue(maxsize=max_pending)
+        self._streams: Dict[torch.device, torch.cuda.Stream] = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="Qwen3TTSDecodeWorker", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        talker_codes_list: List[torch.Tensor],
+        ref_code_list: Optional[List[Optional[torch.Tensor]]] = None,
+    ) -> Future:
+        """
+        Queue talker codes for decoding, same arguments as `Qwen3TTSModel._decode_talker_codes`.
+
+        Returns:
+            Future:
+                Resolves to `(wavs, sample_rate)`.
+        """
+        if self._closed:
+            raise RuntimeError("Qwen3TTSDecodeWorker is closed.")
+        future: Future = Future()
+        event = None
+        device = talker_codes_list[0].device if talker_codes_list else torch.device("cpu")
+        if self.use_cuda_stream and device.type == "cuda":
+            # the worker stream must not read the codes before the producer's stream has written them
+            event = torch.cuda.Event()
+            event.record(torch.cuda.current_stream(device))
+        self._queue.put((talker_codes_list, ref_code_list, future, event))
+        return future
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the worker after the batches already submitted have been decoded."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+    def __enter__(self) -> "Qwen3TTSDecodeWorker":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _stream(self, device: torch.device) -> torch.cuda.Stream:
+        if device not in self._streams:
+            self._streams[device] = torch.cuda.Stream(device)
+        return self._streams[device]
+
+    def _decode(self, talker_codes_list, ref_code_list, event) -> Tuple[List[np.ndarray], int]:
+        if event is None:
+            return self.tts._decode_talker_codes(talker_codes_list, ref_code_list)
+        stream = self._stream(talker_codes_list[0].device)
+        stream.wait_event(event)
+        for codes in talker_codes_list:
+            # keep the caching allocator from handing these blocks to the producer while the worker reads them
+            codes.record_stream(stream)
+        with torch.cuda.stream(stream):
+            return self.tts._decode_talker_codes(talker_codes_list, ref_code_list)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            talker_codes_list, ref_code_list, future, event = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with torch.inference_mode():
+                    future.set_result(self._decode(talker_codes_list, ref_code_list, event))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+class Qwen3TTSPipeline:
+    """
+    Two-stage executor that overlaps talker generation with speech-tokenizer decoding across successive jobs.
+
+    Jobs are submitted like `Qwen3TTSModel.generate_*` calls and run in submission order on a producer thread, which
+    only runs the talker. Their codes go to a `Qwen3TTSDecodeWorker`, so job k is decoded while the talker already
+    generates job k + 1, and the caller's own post-processing of job k - 1 runs in parallel with both. Wall-clock time
+    approaches the slowest stage instead of the sum of all stages.
+
+    Example:
+        with Qwen3TTSPipeline(tts) as pipeline:
+            futures = [pipeline.submit_voice_design(line, instruct="A calm narrator.") for line in lines]
+            for future in futures:
+                wavs, sr = future.result()
+    """
+
+    def __init__(self, tts: "Qwen3TTSModel", max_pending: int = 2, use_cuda_stream: bool = True):
+        """
+        Args:
+            tts (Qwen3TTSModel):
+                Loaded wrapper; its underlying model is shared, not copied.
+            max_pending (int):
+                Maximum number of generated jobs waiting for the decoder before the talker pauses.
+            use_cuda_stream (bool):
+                Decode on a dedicated CUDA stream when the codes live on a GPU.
+        """
+        self.tts = tts
+        self.decode_worker = Qwen3TTSDecodeWorker(tts, max_pending=max_pending, use_cuda_stream=use_cuda_stream)
+        self._jobs: "queue.Queue[Optional[Tuple[Callable[[], Tuple[Any, ...]], Future]]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="Qwen3TTSPipeline", daemon=True)
+        self._thread.start()
+
+    def _submit(self, prepare: Callable[[], Tuple[Dict[str, Any], Dict[str, Any], bool]]) -> Future:
+        if self._closed:
+            raise RuntimeError("Qwen3TTSPipeline is closed.")
+        future: Future = Future()
+        self._jobs.put((prepare, future))
+        return future
+
+    def submit_voice_clone(
+        self,
+        text: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        ref_audio: Optional[Union["AudioLike", List["AudioLike"]]] = None,
+        ref_text: Optional[Union[str, List[Optional[str]]]] = None,
+        x_vector_only_mode: Union[bool, List[bool]] = False,
+        voice_clone_prompt: Optional[Union[Dict[str, Any], List["VoiceClonePromptItem"]]] = None,
+        non_streaming_mode: bool = False,
+        **kwargs,
+    ) -> Future:
+        """
+        Queue one `Qwen3TTSModel.generate_voice_clone` call.
+
+        Returns:
+            Future:
+                Resolves to `(wavs, sample_rate)`.
+        """
+
+        def prepare():
+            self.tts._check_model_type("base", "generate_voice_clone")
+            generate_inputs = self.tts._prepare_voice_clone_inputs(
+                text=text,
+                language=language,
+                ref_audio=ref_audio,
+                ref_text=ref_text,
+                x_vector_only_mode=x_vector_only_mode,
+                voice_clone_prompt=voice_clone_prompt,
+            )
+            return generate_inputs, self.tts._merge_generate_kwargs(**kwargs), non_streaming_mode
+
+        return self._submit(prepare)
+
+    def submit_voice_design(
+        self,
+        text: Union[str, List[str]],
+        instruct: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        non_streaming_mode: bool = True,
+        **kwargs,
+    ) -> Future:
+        """
+        Queue one `Qwen3TTSModel.generate_voice_design` call.
+
+        Returns:
+            Future:
+                Resolves to `(wavs, sample_rate)`.
+        """
+
+        def prepare():
+            self.tts._check_model_type("voice_design", "generate_voice_design")
+            generate_inputs = self.tts._prepare_voice_design_inputs(text=text, instruct=instruct, language=language)
+            return generate_inputs, self.tts._merge_generate_kwargs(**kwargs), non_streaming_mode
+
+        return self._submit(prepare)
+
+    def submit_custom_voice(
+        self,
+        text: Union[str, List[str]],
+        speaker: Union[str, List[str]],
+        language: Union[str, List[str]] = None,
+        instruct: Optional[Union[str, List[str]]] = None,
+        non_streaming_mode: bool = True,
+        **kwargs,
+    ) -> Future:
+        """
+        Queue one `Qwen3TTSModel.generate_custom_voice` call.
+
+        Returns:
+            Future:
+                Resolves to `(wavs, sample_rate)`.
+        """
+
+        def prepare():
+            self.tts._check_model_type("custom_voice", "generate_custom_voice")
+            generate_inputs = self.tts._prepare_custom_voice_inputs(
+                text=text, speaker=speaker, language=language, instruct=instruct
+            )
+            return generate_inputs, self.tts._merge_generate_kwargs(**kwargs), non_streaming_mode
+
+        return self._submit(prepare)
+
+    def close(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        Stop both stages after the jobs already submitted have been served.
+
+        With `cancel_pending`, jobs whose generation has not started yet are cancelled instead.
+        """
+        if cancel_pending:
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job[1].cancel()
+        if not self._closed:
+            self._closed = True
+            self._jobs.put(None)
+        if wait:
+            self._thread.join()
+            self.decode_worker.close()
+
+    def __enter__(self) -> "Qwen3TTSPipeline":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        # leaving early (error, or a consuming generator that was closed) drops the jobs nobody waits for
+        self.close(cancel_pending=exc_type is not None)
+
+    @staticmethod
+    def _chain(source: Future, target: Future) -> None:
+        def _done(f: Future) -> None:
+            if f.exception() is not None:
+                target.set_exception(f.exception())
+            else:
+                target.set_result(f.result())
+
+        source.add_done_callback(_done)
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            prepare, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with torch.inference_mode():
+                    generate_inputs, gen_kwargs, non_streaming_mode = prepare()
+                    talker_codes_list, ref_code_list = self.tts._generate_talker_codes(
+                        generate_inputs, gen_kwargs, non_streaming_mode
+                    )
+                self._chain(self.decode_worker.submit(talker_codes_list, ref_code_list), future)
+            except BaseException as e:
+                future.set_exception(e)
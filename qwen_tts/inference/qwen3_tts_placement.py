@@ -0,0 +1,294 @@
+# coding=utf-8
+# Copyright 2026 The Alibaba Qwen team.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Union
+
+import torch
+
+if TYPE_CHECKING:
+    from ..core.models import Qwen3TTSForConditionalGeneration
+
+
+@dataclass
+class Qwen3TTSStagePlacement:
+    """
+    Where one stage of the model runs.
+
+    Fields left as None keep what `from_pretrained` chose for that stage.
+    """
+    device: Optional[Union[str, torch.device]] = None
+    dtype: Optional[torch.dtype] = None
+    num_threads: Optional[int] = None              # intra-op CPU threads while the stage runs
+    quantize: Optional[str] = None                 # "int8": dynamic int8 linear layers (talker / code predictor, CPU)
+    gqa_attention: Optional[bool] = None           # attention without repeated keys / values, see `set_gqa_attention`
+
+
+@dataclass
+class Qwen3TTSPlacement:
+    """
+    Per-stage device / dtype / thread-count policy, passed as `Qwen3TTSModel.from_pretrained(..., placement=...)`.
+
+    Stages:
+      - talker: the autoregressive talker (text + codec embeddings, transformer, codec head)
+      - code_predictor: the residual code group predictor, follows the talker when unset
+      - speaker_encoder: x-vector extractor of the Base model
+      - tokenizer_encoder / tokenizer_decoder: the two halves of the speech tokenizer
+
+    Tensors crossing a stage boundary are moved to the receiving stage's device and dtype by the model, so stages
+    can be mixed freely, e.g. a bf16 talker on the GPU with the speaker encoder and the vocoder on the CPU in fp32.
+    Weights are cast from the dtype they were loaded in, so load with the widest dtype any stage needs.
+
+    Thread counts use `torch.set_num_threads` and are restored when the stage returns. They only matter for stages
+    on the CPU. `interop_threads` sets the process-wide inter-op pool once, which only works before torch first uses
+    it.
+
+    `quantize="int8"` replaces the `nn.Linear` layers of the talker / code predictor transformer with dynamically
+    quantized int8 ones (weights int8, activations quantized per call). Embeddings, norms and the codec heads stay in
+    float32. It needs the stage on the CPU in float32.
+
+    `gqa_attention=True` computes the grouped-query attention of the talker, code predictor and 12Hz tokenizer decoder
+    per key/value head instead of repeating the KV cache to every query head. Stages without such attention ignore it.
+
+    Example:
+        placement = Qwen3TTSPlacement.offload_audio("cuda:0", dtype=torch.bfloat16, num_threads=4)
+        tts = Qwen3TTSModel.from_pretrained(path, device_map="cuda:0", dtype=torch.float32, placement=placement)
+
+        # GPU-less hosts
+        tts = Qwen3TTSModel.from_pretrained(path, dtype=torch.float32, placement=Qwen3TTSPlacement.cpu(num_threads=8))
+    """
+    talker: Optional[Qwen3TTSStagePlacement] = None
+    code_predictor: Optional[Qwen3TTSStagePlacement] = None
+    speaker_encoder: Optional[Qwen3TTSStagePlacement] = None
+    tokenizer_encoder: Optional[Qwen3TTSStagePlacement] = None
+    tokenizer_decoder: Optional[Qwen3TTSStagePlacement] = None
+    interop_threads: Optional[int] = None
+
+    STAGES = ("talker", "code_predictor", "speaker_encoder", "tokenizer_encoder", "tokenizer_decoder")
+
+    @classmethod
+    def offload_audio(
+        cls,
+        device: Union[str, torch.device],
+        dtype: Optional[torch.dtype] = None,
+        num_threads: Optional[int] = None,
+    ) -> "Qwen3TTSPlacement":
+        """
+        Talker and code predictor on `device` in `dtype`; speaker encoder and speech tokenizer on the CPU in fp32.
+
+        Args:
+            device (Union[str, torch.device]):
+                Device of the talker and the code predictor.
+            dtype (Optional[torch.dtype]):
+                Dtype of the talker and the code predictor, None keeps the loaded dtype.
+            num_threads (Optional[int]):
+                CPU threads of the offloaded stages.
+
+        Returns:
+            Qwen3TTSPlacement
+        """
+        accelerator = Qwen3TTSStagePlacement(device=device, dtype=dtype)
+        cpu = Qwen3TTSStagePlacement(device="cpu", dtype=torch.float32, num_threads=num_threads)
+        return cls(
+            talker=accelerator,
+            code_predictor=accelerator,
+            speaker_encoder=cpu,
+            tokenizer_encoder=cpu,
+            tokenizer_decoder=cpu,
+        )
+
+    @classmethod
+    def cpu(
+        cls,
+        num_threads: Optional[int] = None,
+        interop_threads: Optional[int] = None,
+        quantize: Optional[str] = "int8",
+    ) -> "Qwen3TTSPlacement":
+        """
+        Every stage on the CPU in float32, with the talker and code predictor quantized and grouped-query attention
+        on the talker, code predictor and tokenizer decoder.
+
+        Args:
+            num_threads (Optional[int]):
+                Intra-op threads of every stage, None keeps torch's default.
+            interop_threads (Optional[int]):
+                Inter-op threads of the process, None keeps torch's default.
+            quantize (Optional[str]):
+                Quantization of the talker and code predictor, None runs them in float32.
+
+        Returns:
+            Qwen3TTSPlacement
+        """
+        cpu = Qwen3TTSStagePlacement(device="cpu", dtype=torch.float32, num_threads=num_threads)
+        autoregressive = Qwen3TTSStagePlacement(
+            device="cpu", dtype=torch.float32, num_threads=num_threads, quantize=quantize, gqa_attention=True
+        )
+        decoder = Qwen3TTSStagePlacement(device="cpu", dtype=torch.float32, num_threads=num_threads, gqa_attention=True)
+        return cls(
+            talker=autoregressive,
+            code_predictor=autoregressive,
+            speaker_encoder=cpu,
+            tokenizer_encoder=cpu,
+            tokenizer_decoder=decoder,
+            interop_threads=interop_threads,
+        )
+
+    def stage(self, name: str) -> Optional[Qwen3TTSStagePlacement]:
+        """Placement of stage `name`, None when it is left as loaded."""
+        if name not in self.STAGES:
+            raise ValueError(f"Unknown stage {name!r}, expected one of {self.STAGES}.")
+        return getattr(self, name)
+
+    @contextmanager
+    def stage_threads(self, name: str) -> Iterator[None]:
+        """Run the body with the thread count of stage `name`, if it sets one."""
+        placement = self.stage(name)
+        if placement is None or placement.num_threads is None:
+            yield
+            return
+        _push_num_threads(placement.num_threads)
+        try:
+            yield
+        finally:
+            _pop_num_threads()
+
+    def apply(self, model: "Qwen3TTSForConditionalGeneration") -> "Qwen3TTSForConditionalGeneration":
+        """
+        Move every placed stage of `model` to its device and dtype, quantize it if asked, select its attention path
+        and install its thread count.
+
+        The talker, code predictor and speaker encoder get their thread count from forward hooks; the speech
+        tokenizer halves are driven through `Qwen3TTSTokenizer`, which picks this placement up and applies it around
+        `encode` / `decode`.
+
+        Returns:
+            Qwen3TTSForConditionalGeneration:
+                The same model.
+        """
+        if self.interop_threads is not None and torch.get_num_interop_threads() != self.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError as e:
+                raise RuntimeError(
+                    "interop_threads can only be set before torch runs any inter-op parallel work; "
+                    "load the model with this placement first."
+                ) from e
+
+        modules = _stage_modules(model)
+        # talker first: moving it also moves the code predictor, which may then be overridden
+        for name in self.STAGES:
+            placement = self.stage(name)
+            module = modules[name]
+            if placement is None or module is None:
+                continue
+            _move_module(module, placement)
+            if placement.quantize is not None:
+                _quantize_stage(name, module, placement.quantize)
+            if placement.gqa_attention is not None:
+                _set_gqa_attention(name, module, placement.gqa_attention)
+            if placement.num_threads is not None and name in _STAGE_BODIES:
+                _install_thread_hooks(_STAGE_BODIES[name](module), placement.num_threads)
+
+        if model.speech_tokenizer is not None:
+            model.speech_tokenizer.placement = self
+        return model
+
+
+# module whose forward runs once per call of the stage
+_STAGE_BODIES = {
+    "talker": lambda talker: talker.model,
+    "code_predictor": lambda code_predictor: code_predictor.model,
+    "speaker_encoder": lambda speaker_encoder: speaker_encoder,
+}
+
+
+def _stage_modules(model: "Qwen3TTSForConditionalGeneration") -> Dict[str, Optional[torch.nn.Module]]:
+    speech_tokenizer = model.speech_tokenizer
+    tokenizer_model = speech_tokenizer.model if speech_tokenizer is not None else None
+    return {
+        "talker": model.talker,
+        "code_predictor": model.talker.code_predictor,
+        "speaker_encoder": model.speaker_encoder,
+        "tokenizer_encoder": tokenizer_model.encoder if tokenizer_model is not None else None,
+        "tokenizer_decoder": tokenizer_model.decoder if tokenizer_model is not None else None,
+    }
+
+
+def _move_module(module: torch.nn.Module, placement: Qwen3TTSStagePlacement) -> None:
+    if placement.device is None and placement.dtype is None:
+        return
+    # rotary frequencies stay in float32 like `from_pretrained` leaves them, only their device follows the stage
+    inv_freqs = {
+        name: buf for name, buf in module.named_buffers() if name.endswith("inv_freq") and buf.dtype == torch.float32
+    }
+    module.to(device=placement.device, dtype=placement.dtype)
+    for name, buf in inv_freqs.items():
+        owner_name, _, attr = name.rpartition(".")
+        owner = module.get_submodule(owner_name)
+        setattr(owner, attr, buf.to(getattr(owner, attr).device))
+        if getattr(owner, "original_inv_freq", None) is not None and attr == "inv_freq":
+            owner.original_inv_freq = owner.inv_freq
+
+
+def _quantize_stage(name: str, module: torch.nn.Module, quantize: str) -> None:
+    if quantize != "int8":
+        raise ValueError(f"Unsupported quantize={quantize!r}, expected 'int8' or None.")
+    if name not in ("talker", "code_predictor"):
+        raise ValueError(f"Only the talker and the code predictor can be quantized, got stage {name!r}.")
+    body = _STAGE_BODIES[name](module)
+    param = next(body.parameters())
+    if param.device.type != "cpu" or param.dtype != torch.float32:
+        raise ValueError(
+            f"int8 quantization of the {name} needs it on the CPU in float32, got {param.device} / {param.dtype}."
+        )
+    try:
+        from torch.ao.quantization import quantize_dynamic
+    except ImportError as e:
+        raise ImportError("int8 quantization needs a PyTorch build with torch.ao.quantization.") from e
+    quantize_dynamic(body, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _set_gqa_attention(name: str, module: torch.nn.Module, enabled: bool) -> None:
+    # the talker's own layers live in `talker.model`, its code predictor is a stage of its own
+    body = _STAGE_BODIES[name](module) if name in ("talker", "code_predictor") else module
+    set_gqa_attention = getattr(body, "set_gqa_attention", None)
+    if set_gqa_attention is not None:
+        set_gqa_attention(enabled)
+
+
+_thread_state = threading.local()
+
+
+def _push_num_threads(num_threads: int) -> None:
+    stack: List[int] = _thread_state.__dict__.setdefault("saved", [])
+    stack.append(torch.get_num_threads())
+    torch.set_num_threads(num_threads)
+
+
+def _pop_num_threads() -> None:
+    torch.set_num_threads(_thread_state.saved.pop())
+
+
+def _install_thread_hooks(module: torch.nn.Module, num_threads: int) -> None:
+    def _pre_hook(mod, args):
+        _push_num_threads(num_threads)
+
+    def _post_hook(mod, args, output):
+        _pop_num_threads()
+
+    module.register_forward_pre_hook(_pre_hook)
+    module.register_forward_hook(_post_hook, always_call=True)
@@ -0,0 +1,147 @@
+# coding=utf-8
+# Copyright 2026 The Alibaba Qwen team.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Registry of loaded `Qwen3TTSModel`s that keeps one copy of the submodules their checkpoints have in common.
+"""
+import hashlib
+import threading
+from typing import Dict, Optional
+
+import torch
+
+from .qwen3_tts_model import Qwen3TTSModel
+from .qwen3_tts_placement import Qwen3TTSPlacement
+
+
+def module_digest(module: torch.nn.Module, config=None) -> str:
+    """
+    Content hash of a module: its config and the name, dtype, shape, device and bytes of every state dict entry.
+
+    Two modules with the same digest compute the same function on the same device, so one can stand in for the other.
+    """
+    h = hashlib.sha256()
+    if config is not None:
+        h.update(config.to_json_string(use_diff=False).encode("utf-8"))
+    for name, tensor in sorted(module.state_dict().items()):
+        h.update(f"{name}\0{tensor.dtype}\0{tuple(tensor.shape)}\0{tensor.device}\0".encode("utf-8"))
+        h.update(tensor.detach().contiguous().cpu().reshape(-1).view(torch.uint8).numpy().data)
+    return h.hexdigest()
+
+
+def _module_bytes(module: torch.nn.Module) -> int:
+    return sum(t.numel() * t.element_size() for t in module.state_dict().values())
+
+
+class Qwen3TTSModelRegistry:
+    """
+    Loads several checkpoints and shares the speech tokenizer and the speaker encoder between them when their weights
+    are identical.
+
+    The VoiceDesign, CustomVoice and Base checkpoints of one release ship the same speech tokenizer, and Base
+    checkpoints of one size the same speaker encoder. Each `from_pretrained` loads its own copy; the registry hashes
+    the copy of every new model (`module_digest`) and swaps in the instance an earlier model already holds, so the
+    duplicate is released once loading returns.
+
+    Placement is part of the key: modules are only shared between models that put them on the same device, in the
+    same dtype and with the same thread count. A shared module is shared for good, e.g. `set_decoder_backend` on
+    the speech tokenizer of one model switches it for every model holding it.
+
+    Example:
+        registry = Qwen3TTSModelRegistry()
+        design = registry.load("Qwen/Qwen3-TTS-12Hz-1.7B-VoiceDesign", device_map="cuda:0", dtype=torch.bfloat16)
+        base = registry.load("Qwen/Qwen3-TTS-12Hz-1.7B-Base", device_map="cuda:0", dtype=torch.bfloat16)
+        assert design.model.speech_tokenizer is base.model.speech_tokenizer
+    """
+
+    def __init__(self):
+        self._speech_tokenizers: Dict[str, object] = {}
+        self._speaker_encoders: Dict[str, torch.nn.Module] = {}
+        self._lock = threading.Lock()
+        self.shared_bytes = 0  # weight bytes released by sharing
+
+    def load(
+        self,
+        pretrained_model_name_or_path: str,
+        placement: Optional[Qwen3TTSPlacement] = None,
+        **kwargs,
+    ) -> Qwen3TTSModel:
+        """
+        `Qwen3TTSModel.from_pretrained(...)`, then `share` the result.
+
+        Args:
+            pretrained_model_name_or_path (str):
+                HuggingFace repo id or local directory of the model.
+            placement (Optional[Qwen3TTSPlacement]):
+                Per-stage placement, see `Qwen3TTSModel.from_pretrained`.
+            **kwargs:
+                Forwarded as-is into `Qwen3TTSModel.from_pretrained(...)`.
+
+        Returns:
+            Qwen3TTSModel:
+                The loaded model, holding the registry's speech tokenizer / speaker encoder where they match.
+        """
+        tts = Qwen3TTSModel.from_pretrained(pretrained_model_name_or_path, placement=placement, **kwargs)
+        return self.share(tts)
+
+    def share(self, tts: Qwen3TTSModel) -> Qwen3TTSModel:
+        """
+        Replace the speech tokenizer and speaker encoder of an already loaded model by the registered instances with
+        the same content and placement, and register the ones seen for the first time.
+
+        Returns:
+            Qwen3TTSModel:
+                The same wrapper.
+        """
+        model = tts.model
+        speech_tokenizer = model.speech_tokenizer
+        # `Qwen3TTSPlacement.apply` hands the placement to the speech tokenizer, the one record of it on the model
+        placement = getattr(speech_tokenizer, "placement", None)
+
+        with self._lock:
+            if speech_tokenizer is not None:
+                key = self._key(
+                    module_digest(speech_tokenizer.model, speech_tokenizer.model.config),
+                    placement,
+                    ("tokenizer_encoder", "tokenizer_decoder"),
+                )
+                shared = self._speech_tokenizers.setdefault(key, speech_tokenizer)
+                if shared is not speech_tokenizer:
+                    self.shared_bytes += _module_bytes(speech_tokenizer.model)
+                    model.load_speech_tokenizer(shared)
+
+            if model.speaker_encoder is not None:
+                key = self._key(
+                    module_digest(model.speaker_encoder, model.config.speaker_encoder_config),
+                    placement,
+                    ("speaker_encoder",),
+                )
+                shared = self._speaker_encoders.setdefault(key, model.speaker_encoder)
+                if shared is not model.speaker_encoder:
+                    self.shared_bytes += _module_bytes(model.speaker_encoder)
+                    model.speaker_encoder = shared
+        return tts
+
+    @staticmethod
+    def _key(digest: str, placement: Optional[Qwen3TTSPlacement], stages) -> str:
+        stage_placements = [None if placement is None else placement.stage(name) for name in stages]
+        return f"{digest}:{stage_placements!r}"
+
+    def clear(self) -> None:
+        """Forget the registered modules; models already loaded keep the instances they hold."""
+        with self._lock:
+            self._speech_tokenizers.clear()
+            self._speaker_encoders.clear()
+            self.shared_bytes = 0
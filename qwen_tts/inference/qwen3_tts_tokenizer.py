@@ -13,15 +13,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import base64
-import io
-import urllib.request
-from typing import List, Optional, Tuple, Union
-from urllib.parse import urlparse
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 
-import librosa
 import numpy as np
-import soundfile as sf
 import torch
 from torch.nn.utils.rnn import pad_sequence
 from transformers import AutoConfig, AutoFeatureExtractor, AutoModel
@@ -32,6 +27,10 @@ from ..core import (
     Qwen3TTSTokenizerV2Config,
     Qwen3TTSTokenizerV2Model,
 )
+from .qwen3_tts_audio import load_audios, read_audio, resample_audio
+
+if TYPE_CHECKING:
+    from .qwen3_tts_placement import Qwen3TTSPlacement
 
 AudioInput = Union[
     str,  # wav path, or base64 string
@@ -48,6 +47,7 @@ class Qwen3TTSTokenizer:
     - from_pretrained(): loads speech tokenizer model via AutoModel and feature_extractor via AutoFeatureExtractor.
     - encode(): supports wav path(s), base64 audio string(s), numpy array(s).
     - decode(): accepts either the raw model encode output, or a minimal dict/list-of-dicts.
+    - export_onnx_decoder() / set_decoder_backend(): 12Hz decoding through ONNX Runtime on the CPU.
 
     Notes:
     - For numpy array input, you must pass `sr` so the audio can be resampled to model sample rate.
@@ -59,6 +59,8 @@ class Qwen3TTSTokenizer:
         self.feature_extractor = None
         self.config = None
         self.device = None
+        # set by `Qwen3TTSPlacement.apply` when the encoder / decoder run on their own device, dtype or threads
+        self.placement: Optional["Qwen3TTSPlacement"] = None
 
     @classmethod
     def from_pretrained(cls, pretrained_model_name_or_path: str, **kwargs) -> "Qwen3TTSTokenizer":
@@ -87,6 +89,9 @@ class Qwen3TTSTokenizer:
         inst.feature_extractor = AutoFeatureExtractor.from_pretrained(pretrained_model_name_or_path)
         inst.model = AutoModel.from_pretrained(pretrained_model_name_or_path, **kwargs)
         inst.config = inst.model.config
+        if inst.get_model_type() == "qwen3_tts_tokenizer_12hz":
+            # the decoder gathers from projected codebook tables instead of projecting every quantizer per call
+            inst.model.decoder.quantizer.fold()
 
         inst.device = getattr(inst.model, "device", None)
         if inst.device is None:
@@ -98,26 +103,19 @@ class Qwen3TTSTokenizer:
 
         return inst
 
-    def _is_probably_base64(self, s: str) -> bool:
-        if s.startswith("data:audio"):
-            return True
-        # Heuristic: no filesystem path separators and long enough.
-        if ("/" not in s and "\\" not in s) and len(s) > 256:
-            return True
-        return False
-    
-    def _is_url(self, s: str) -> bool:
+    def _stage_device_dtype(self, stage: str) -> Tuple[torch.device, torch.dtype]:
+        """Device and dtype of the encoder (`stage="tokenizer_encoder"`) or the decoder, which may differ."""
+        module = self.model.encoder if stage == "tokenizer_encoder" else self.model.decoder
         try:
-            u = urlparse(s)
-            return u.scheme in ("http", "https") and bool(u.netloc)
-        except Exception:
-            return False
+            param = next(module.parameters())
+        except StopIteration:
+            return self.device, self.model.dtype
+        return param.device, param.dtype
 
-    def _decode_base64_to_wav_bytes(self, b64: str) -> bytes:
-        # Accept both "data:audio/wav;base64,...." and raw base64
-        if "," in b64 and b64.strip().startswith("data:"):
-            b64 = b64.split(",", 1)[1]
-        return base64.b64decode(b64)
+    def _stage_threads(self, stage: str):
+        if self.placement is None:
+            return nullcontext()
+        return self.placement.stage_threads(stage)
 
     def load_audio(
         self,
@@ -137,25 +135,8 @@ class Qwen3TTSTokenizer:
             np.ndarray:
                 1-D float32 waveform at target_sr.
         """
-        if self._is_url(x):
-            with urllib.request.urlopen(x) as resp:
-                audio_bytes = resp.read()
-            with io.BytesIO(audio_bytes) as f:
-                audio, sr = sf.read(f, dtype="float32", always_2d=False)
-        elif self._is_probably_base64(x):
-            wav_bytes = self._decode_base64_to_wav_bytes(x)
-            with io.BytesIO(wav_bytes) as f:
-                audio, sr = sf.read(f, dtype="float32", always_2d=False)
-        else:
-            audio, sr = librosa.load(x, sr=None, mono=True)
-
-        if audio.ndim > 1:
-            audio = np.mean(audio, axis=-1)
-
-        if sr != target_sr:
-            audio = librosa.resample(y=audio, orig_sr=sr, target_sr=target_sr)
-
-        return audio.astype(np.float32)
+        audio, sr = read_audio(x)
+        return resample_audio(audio, sr, target_sr)
 
     def _normalize_audio_inputs(
         self,
@@ -176,7 +157,8 @@ class Qwen3TTSTokenizer:
 
         Returns:
             List[np.ndarray]:
-                List of float32 waveforms resampled to model input SR.
+                List of float32 waveforms resampled to model input SR, with one batched resampler call per
+                source rate.
         """
         target_sr = int(self.feature_extractor.sampling_rate)
 
@@ -188,22 +170,14 @@ class Qwen3TTSTokenizer:
 
         if isinstance(audios[0], str):
             # wav path list or base64 list
-            return [self.load_audio(x, target_sr=target_sr) for x in audios]  # type: ignore[arg-type]
+            return load_audios(list(audios), target_sr=target_sr)
 
         # numpy list
         if sr is None:
             raise ValueError("For numpy waveform input, you must provide `sr` (original sampling rate).")
-
-        out: List[np.ndarray] = []
-        for a in audios:  # type: ignore[assignment]
-            if not isinstance(a, np.ndarray):
-                raise TypeError("Mixed input types are not supported. Use all paths/base64 or all numpy arrays.")
-            if a.ndim > 1:
-                a = np.mean(a, axis=-1)
-            if int(sr) != target_sr:
-                a = librosa.resample(y=a.astype(np.float32), orig_sr=int(sr), target_sr=target_sr)
-            out.append(a.astype(np.float32))
-        return out
+        if not all(isinstance(a, np.ndarray) for a in audios):
+            raise TypeError("Mixed input types are not supported. Use all paths/base64 or all numpy arrays.")
+        return load_audios(list(audios), target_sr=target_sr, sr=int(sr))
 
     def encode(
         self,
@@ -245,9 +219,10 @@ class Qwen3TTSTokenizer:
             sampling_rate=int(self.feature_extractor.sampling_rate),
             return_tensors="pt",
         )
-        inputs = inputs.to(self.device).to(self.model.dtype)
+        device, dtype = self._stage_device_dtype("tokenizer_encoder")
+        inputs = inputs.to(device).to(dtype)
 
-        with torch.inference_mode():
+        with torch.inference_mode(), self._stage_threads("tokenizer_encoder"):
             # model.encode expects (B, T) and (B, T)
             enc = self.model.encode(
                 inputs["input_values"].squeeze(1),
@@ -284,6 +259,7 @@ class Qwen3TTSTokenizer:
                 - sample_rate: int, model output sampling rate
         """
         model_type = self.model.get_model_type()
+        device, dtype = self._stage_device_dtype("tokenizer_decoder")
 
         def _to_tensor(x, dtype=None):
             if isinstance(x, torch.Tensor):
@@ -322,13 +298,13 @@ class Qwen3TTSTokenizer:
             elif t.dim() == 2:
                 # 12Hz single sample: (C, Q) -> (1, C, Q)
                 t = t.unsqueeze(0)
-            audio_codes_padded = t.to(self.device)
+            audio_codes_padded = t.to(device)
         else:
             # List[Tensor/np]
             audio_codes_list = [_to_tensor(c, dtype=torch.long) for c in audio_codes_list]
-            audio_codes_padded = pad_sequence(audio_codes_list, batch_first=True, padding_value=-1).to(self.device)
+            audio_codes_padded = pad_sequence(audio_codes_list, batch_first=True, padding_value=-1).to(device)
 
-        with torch.inference_mode():
+        with torch.inference_mode(), self._stage_threads("tokenizer_decoder"):
             if model_type == "qwen3_tts_tokenizer_25hz":
                 if xvectors_list is None or ref_mels_list is None:
                     raise ValueError("25Hz decode requires `xvectors` and `ref_mels`.")
@@ -337,19 +313,19 @@ class Qwen3TTSTokenizer:
                     xvectors_batch = xvectors_list
                     if xvectors_batch.dim() == 1:  # (D,) -> (1, D)
                         xvectors_batch = xvectors_batch.unsqueeze(0)
-                    xvectors_batch = xvectors_batch.to(self.device).to(self.model.dtype)
+                    xvectors_batch = xvectors_batch.to(device).to(dtype)
                 else:
                     xvectors_list = [_to_tensor(x, dtype=torch.float32) for x in xvectors_list]
-                    xvectors_batch = torch.stack(xvectors_list, dim=0).to(self.device).to(self.model.dtype)
+                    xvectors_batch = torch.stack(xvectors_list, dim=0).to(device).to(dtype)
 
                 if isinstance(ref_mels_list, torch.Tensor):
                     ref_mels_padded = ref_mels_list
                     if ref_mels_padded.dim() == 2:  # (T, M) -> (1, T, M)
                         ref_mels_padded = ref_mels_padded.unsqueeze(0)
-                    ref_mels_padded = ref_mels_padded.to(self.device).to(self.model.dtype)
+                    ref_mels_padded = ref_mels_padded.to(device).to(dtype)
                 else:
                     ref_mels_list = [_to_tensor(m, dtype=torch.float32) for m in ref_mels_list]
-                    ref_mels_padded = pad_sequence(ref_mels_list, batch_first=True, padding_value=0).to(self.device).to(self.model.dtype)
+                    ref_mels_padded = pad_sequence(ref_mels_list, batch_first=True, padding_value=0).to(device).to(dtype)
 
                 dec = self.model.decode(audio_codes_padded, xvectors_batch, ref_mels_padded, return_dict=True)
                 wav_tensors = dec.audio_values
@@ -364,6 +340,80 @@ class Qwen3TTSTokenizer:
         wavs = [w.to(torch.float32).detach().cpu().numpy() for w in wav_tensors]
         return wavs, int(self.model.get_output_sample_rate())
 
+    def decode_step(self, audio_codes: torch.Tensor, state=None) -> Tuple[np.ndarray, object]:
+        """
+        Incrementally decode the next frames of a 12Hz code stream.
+
+        The decoder carries its causal convolution buffers and transformer KV cache in `state`, so only the new
+        frames are processed on every call. Concatenating the returned waveforms gives the waveform of the whole
+        stream.
+
+        Args:
+            audio_codes (torch.Tensor):
+                (T, Q) new codes of one sample.
+            state:
+                State returned by the previous call, or None to start a new stream.
+
+        Returns:
+            Tuple[np.ndarray, Qwen3TTSTokenizerV2DecoderState]:
+                float32 waveform of the new frames, and the state to pass to the next call.
+        """
+        if self.get_model_type() != "qwen3_tts_tokenizer_12hz":
+            raise ValueError("decode_step is only supported by the 12Hz tokenizer.")
+
+        device, _ = self._stage_device_dtype("tokenizer_decoder")
+        codes = torch.clamp(torch.as_tensor(audio_codes, dtype=torch.long).to(device), min=0)
+        with torch.inference_mode(), self._stage_threads("tokenizer_decoder"):
+            wav, state = self.model.decoder.decode_step(codes.transpose(0, 1).unsqueeze(0), state)
+        return wav[0, 0].to(torch.float32).detach().cpu().numpy(), state
+
+    def export_onnx_decoder(self, path: str, opset_version: int = 17) -> str:
+        """
+        Export the 12Hz decoder to an ONNX graph with dynamic batch and frame axes.
+
+        Export from a float32 decoder; the graph is what `set_decoder_backend("onnx", ...)` runs.
+
+        Args:
+            path (str):
+                Output `.onnx` file.
+            opset_version (int):
+                ONNX opset of the exported graph.
+
+        Returns:
+            str: `path`.
+        """
+        if self.get_model_type() != "qwen3_tts_tokenizer_12hz":
+            raise ValueError("ONNX export is only supported by the 12Hz tokenizer.")
+        return self.model.export_onnx_decoder(path, opset_version=opset_version)
+
+    def set_decoder_backend(self, backend: str, onnx_path: Optional[str] = None, num_threads: Optional[int] = None) -> None:
+        """
+        Switch `decode` between the PyTorch decoder and ONNX Runtime's CPU provider.
+
+        `decode_step` (streaming) always runs the PyTorch decoder.
+
+        Args:
+            backend (str):
+                "torch" or "onnx".
+            onnx_path (Optional[str]):
+                Graph written by `export_onnx_decoder`, required for "onnx".
+            num_threads (Optional[int]):
+                ONNX Runtime intra-op threads. Defaults to the decoder thread count of the placement, if any.
+        """
+        if backend == "torch":
+            if self.get_model_type() == "qwen3_tts_tokenizer_12hz":
+                self.model.load_onnx_decoder(None)
+            return
+        if backend != "onnx":
+            raise ValueError(f"Unknown decoder backend {backend!r}, expected 'torch' or 'onnx'.")
+        if self.get_model_type() != "qwen3_tts_tokenizer_12hz":
+            raise ValueError("The ONNX decoder backend is only supported by the 12Hz tokenizer.")
+        if onnx_path is None:
+            raise ValueError("onnx_path is required for the 'onnx' decoder backend.")
+        if num_threads is None and self.placement is not None and self.placement.tokenizer_decoder is not None:
+            num_threads = self.placement.tokenizer_decoder.num_threads
+        self.model.load_onnx_decoder(onnx_path, num_threads=num_threads)
+
     def get_model_type(self) -> str:
         """
         Get the underlying tokenizer model type.
@@ -0,0 +1,270 @@
+# coding=utf-8
+# Copyright 2026 The Alibaba Qwen team.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Memory-mapped voice bank: a single file holding any number of `VoiceClonePromptItem`s.
+
+File layout (little endian, sections aligned to 64 bytes):
+  - header: 8-byte magic and the byte size of the index;
+  - index: UTF-8 JSON with the names, `ref_text`s and flags of the voices and where their data lives;
+  - speaker embeddings: float32 matrix of shape (num_voices, dim);
+  - reference codes: the `ref_code`s of all voices flattened and packed back to back as int16.
+"""
+import json
+import math
+import os
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import torch
+
+from .qwen3_tts_model import VoiceClonePromptItem
+
+_MAGIC = b"QTTSVBK1"
+_HEADER = struct.Struct("<8sQ")
+_ALIGNMENT = 64
+
+
+def _align(n: int) -> int:
+    return -(-n // _ALIGNMENT) * _ALIGNMENT
+
+
+class Qwen3TTSVoiceBank:
+    """
+    Read-only view of a voice bank file written by `Qwen3TTSVoiceBank.write`.
+
+    Opening a bank parses the index and maps the file; no tensor data is read. `bank[key]` returns one voice as views
+    of the mapping, so only the pages of that voice are touched, and `get_items(keys, device)` moves a batch of voices
+    to the device with a single host-to-device copy.
+
+    Voices are addressed by position or by name.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str):
+                Voice bank file.
+
+        Raises:
+            ValueError: If the file is not a voice bank.
+        """
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} is not a voice bank file.")
+            magic, index_size = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a voice bank file.")
+            index = json.loads(f.read(index_size).decode("utf-8"))
+
+        self.path = path
+        self._voices: List[Dict] = index["voices"]
+        self._name_to_index: Dict[str, int] = {v["name"]: i for i, v in enumerate(self._voices)}
+
+        data = np.memmap(path, dtype=np.uint8, mode="c")
+        num_voices, dim = len(self._voices), int(index["dim"])
+        emb_offset, code_offset = int(index["embedding_offset"]), int(index["code_offset"])
+        self._embeddings = data[emb_offset : emb_offset + num_voices * dim * 4].view("<f4").reshape(num_voices, dim)
+        self._codes = data[code_offset : code_offset + int(index["num_codes"]) * 2].view("<i2")
+
+    @staticmethod
+    def is_voice_bank(path: str) -> bool:
+        """Whether `path` starts with the voice bank magic."""
+        try:
+            with open(path, "rb") as f:
+                return f.read(len(_MAGIC)) == _MAGIC
+        except OSError:
+            return False
+
+    @classmethod
+    def write(
+        cls,
+        path: str,
+        items: Sequence[VoiceClonePromptItem],
+        names: Optional[Sequence[str]] = None,
+    ) -> "Qwen3TTSVoiceBank":
+        """
+        Write `items` to a new voice bank at `path` (atomically replacing an existing file) and open it.
+
+        Args:
+            path (str):
+                Output file.
+            items (Sequence[VoiceClonePromptItem]):
+                Voices, e.g. from `Qwen3TTSModel.create_voice_clone_prompt`.
+            names (Optional[Sequence[str]]):
+                Unique name of each voice. Defaults to "0", "1", ...
+
+        Returns:
+            Qwen3TTSVoiceBank:
+                The written bank.
+
+        Raises:
+            ValueError: If `items` is empty, names are not unique, speaker embeddings differ in size, or codes do not
+                fit in int16.
+        """
+        items = list(items)
+        if not items:
+            raise ValueError("A voice bank needs at least one voice.")
+        names = [str(i) for i in range(len(items))] if names is None else [str(n) for n in names]
+        if len(names) != len(items):
+            raise ValueError(f"Got {len(names)} names for {len(items)} voices.")
+        if len(set(names)) != len(names):
+            raise ValueError("Voice names must be unique.")
+
+        rows = [it.ref_spk_embedding.detach().to("cpu", torch.float32).reshape(-1).numpy() for it in items]
+        if len({row.shape[0] for row in rows}) != 1:
+            raise ValueError("All speaker embeddings must have the same size.")
+        embeddings = np.stack(rows)
+
+        voices, codes, num_codes = [], [], 0
+        for name, it in zip(names, items):
+            code_shape = None
+            if it.ref_code is not None:
+                code = it.ref_code.detach().cpu()
+                if code.numel() and (int(code.min()) < -0x8000 or int(code.max()) > 0x7FFF):
+                    raise ValueError(f"Codes of voice {name!r} do not fit in int16.")
+                code_shape = list(code.shape)
+                codes.append(code.to(torch.int16).reshape(-1).numpy())
+            voices.append(
+                dict(
+                    name=name,
+                    ref_text=it.ref_text,
+                    x_vector_only_mode=bool(it.x_vector_only_mode),
+                    icl_mode=bool(it.icl_mode),
+                    code_start=num_codes,
+                    code_shape=code_shape,
+                )
+            )
+            if code_shape is not None:
+                num_codes += math.prod(code_shape)
+
+        # the index records the section offsets, which depend on its own size: grow it until they are stable
+        index = dict(dim=embeddings.shape[1], num_codes=num_codes, embedding_offset=0, code_offset=0, voices=voices)
+        while True:
+            index_bytes = json.dumps(index, ensure_ascii=False).encode("utf-8")
+            emb_offset = _align(_HEADER.size + len(index_bytes))
+            code_offset = _align(emb_offset + embeddings.nbytes)
+            if (index["embedding_offset"], index["code_offset"]) == (emb_offset, code_offset):
+                break
+            index["embedding_offset"], index["code_offset"] = emb_offset, code_offset
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(index_bytes)))
+            f.write(index_bytes)
+            f.seek(emb_offset)
+            f.write(embeddings.astype("<f4").tobytes())
+            f.seek(code_offset)
+            for code in codes:
+                f.write(code.astype("<i2").tobytes())
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self._voices)
+
+    @property
+    def names(self) -> List[str]:
+        return [v["name"] for v in self._voices]
+
+    def _index(self, key: Union[int, str]) -> int:
+        if isinstance(key, str):
+            if key not in self._name_to_index:
+                raise KeyError(f"No voice named {key!r} in {self.path}.")
+            return self._name_to_index[key]
+        index = int(key)
+        if not -len(self._voices) <= index < len(self._voices):
+            raise IndexError(f"Voice index {index} out of range for a bank of {len(self._voices)} voices.")
+        return index % len(self._voices)
+
+    def _item(self, voice: Dict, ref_code: Optional[torch.Tensor], ref_spk_embedding: torch.Tensor) -> VoiceClonePromptItem:
+        return VoiceClonePromptItem(
+            ref_code=ref_code,
+            ref_spk_embedding=ref_spk_embedding,
+            x_vector_only_mode=voice["x_vector_only_mode"],
+            icl_mode=voice["icl_mode"],
+            ref_text=voice["ref_text"],
+        )
+
+    def __getitem__(self, key: Union[int, str]) -> VoiceClonePromptItem:
+        """
+        One voice on the CPU. The speaker embedding is a view of the mapped file; `ref_code` is widened to int64,
+        which copies that voice's codes only.
+        """
+        index = self._index(key)
+        voice = self._voices[index]
+        ref_code = None
+        if voice["code_shape"] is not None:
+            start, n = voice["code_start"], math.prod(voice["code_shape"])
+            ref_code = torch.from_numpy(self._codes[start : start + n]).long().view(voice["code_shape"])
+        return self._item(voice, ref_code, torch.from_numpy(self._embeddings[index]))
+
+    def get_items(
+        self,
+        keys: Optional[Iterable[Union[int, str]]] = None,
+        device: Optional[Union[str, torch.device]] = None,
+    ) -> List[VoiceClonePromptItem]:
+        """
+        Read a batch of voices and move them to `device`.
+
+        The embeddings and codes of all requested voices are gathered into one (pinned, for CUDA) staging buffer,
+        which is copied to the device at once; the returned tensors are views of that copy.
+
+        Args:
+            keys (Optional[Iterable[Union[int, str]]]):
+                Positions or names of the voices; all voices if None.
+            device (Optional[Union[str, torch.device]]):
+                Target device; CPU if None.
+
+        Returns:
+            List[VoiceClonePromptItem]:
+                The voices, in the order of `keys`, with int64 `ref_code` and float32 `ref_spk_embedding`.
+        """
+        indices = list(range(len(self._voices))) if keys is None else [self._index(k) for k in keys]
+        device = torch.device("cpu") if device is None else torch.device(device)
+        voices = [self._voices[i] for i in indices]
+        spans = [
+            (v["code_start"], math.prod(v["code_shape"])) if v["code_shape"] is not None else (0, 0) for v in voices
+        ]
+
+        dim = self._embeddings.shape[1]
+        emb_bytes = len(indices) * dim * 4
+        num_codes = sum(n for _, n in spans)
+        pin = device.type == "cuda" and torch.cuda.is_available()
+        staging = torch.empty(emb_bytes + num_codes * 2, dtype=torch.uint8, pin_memory=pin)
+        staging_np = staging.numpy()
+        np.take(self._embeddings, indices, axis=0, out=staging_np[:emb_bytes].view("<f4").reshape(len(indices), dim))
+        codes_np = staging_np[emb_bytes:].view("<i2")
+        pos = 0
+        for start, n in spans:
+            codes_np[pos : pos + n] = self._codes[start : start + n]
+            pos += n
+
+        moved = staging.to(device, non_blocking=pin)
+        embeddings = moved[:emb_bytes].view(torch.float32).view(len(indices), dim)
+        codes = moved[emb_bytes:].view(torch.int16).long()
+
+        items: List[VoiceClonePromptItem] = []
+        pos = 0
+        for j, (voice, (_, n)) in enumerate(zip(voices, spans)):
+            ref_code = None
+            if voice["code_shape"] is not None:
+                ref_code = codes[pos : pos + n].view(voice["code_shape"])
+                pos += n
+            items.append(self._item(voice, ref_code, embeddings[j]))
+        return items